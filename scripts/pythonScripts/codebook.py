@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Codebook - Compiled and Cached Codebook with Indexed Lookups
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Compiled codebook (cb.json) shared by all the project scripts. The JSON file is parsed once per process, and the
+# compiled object (entries, lookup indexes and precomputed views) is cached next to it in binary (pickle) form. The
+# binary cache is rebuilt whenever the size or modification time of cb.json changes. The Codebook object behaves as
+# the original dictionary (varName -> entry), so existing code such as `codebook[f]["label"]` is unchanged, and
+# `f in codebook` is a hash lookup.
+
+import os, json, pickle, tempfile
+from collections.abc import Mapping
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Extension of the binary cache file (written next to cb.json)
+CACHE_EXTENSION = ".pickle"
+
+# Version of the binary cache layout (bump to invalidate the existing cache files)
+CACHE_VERSION = 2
+
+# Codebook membership flags of the tables and feature classes
+TABLE_FLAGS = {
+    "crashes": "inCrashes",
+    "parties": "inParties",
+    "victims": "inVictims",
+    "collisions": "inCollisions",
+    "cities": "inCities",
+    "roads": "inRoads",
+    "blocks": "inBlocks",
+}
+
+# Time series aggregation functions of the tsAggr entries
+TS_FUNCTIONS = ["fSum", "fProd", "fMean", "fMedian", "fMode", "fVar", "fSd", "fMin", "fMax", "fNth", "fFirst", "fLast", "fNobs", "fNdistinct"]
+
+# Codebooks already loaded in this process (path -> Codebook)
+_loaded = {}
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Codebook
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class Codebook(Mapping):
+    """Compiled codebook with O(1) lookups by varName, rawName and varOrder, and precomputed variable views
+    Args:
+        entries (dict): the JSON codebook (varName -> entry)
+    """
+
+    def __init__(self, entries):
+        self._entries = dict(entries)
+
+        # Lookup indexes
+        self._byRawName = {v["rawName"]: name for name, v in self._entries.items() if v.get("rawName")}
+        self._byOrder = {v["varOrder"]: name for name, v in self._entries.items() if v.get("varOrder") is not None}
+
+        # Variables of each table or feature class (in varOrder)
+        ordered = sorted(self._entries, key=lambda name: self._entries[name].get("varOrder") or 0)
+        self.fields = {table: [name for name in ordered if self._entries[name].get(flag) == 1] for table, flag in TABLE_FLAGS.items()}
+
+        # Raw data variables of each table (rawName -> varName, part1ImportRawData.R section 4.1)
+        self.rawNames = {
+            table: {self._entries[name]["rawName"]: name for name in names if self._entries[name]["rawData"] == 1 and self._entries[name]["rawName"]}
+            for table, names in self.fields.items()
+        }
+
+        # Labeled factor variables
+        self.labeledFactors = [name for name in ordered if self._entries[name].get("isLabeled") == 1]
+
+        # Raw data columns of the labeled factor variables (raw codes, read as text and converted by the recode; the
+        # labels of the numeric variables only mark their missing values)
+        self.rawCodes = {
+            self._entries[name]["rawName"] for name in self.labeledFactors
+            if self._entries[name]["varType"] == "factor" and self._entries[name]["rawData"] == 1 and self._entries[name]["rawName"]
+        }
+
+        # Variables of each time series aggregation function (the tsAggr entry is not a dictionary for some variables)
+        self.aggregations = {
+            func: [name for name in ordered if isinstance(self._entries[name].get("tsAggr"), dict) and self._entries[name]["tsAggr"].get(func) == 1]
+            for func in TS_FUNCTIONS
+        }
+
+    # Dictionary interface (varName -> entry)
+    def __getitem__(self, name):
+        return self._entries[name]
+
+    def __contains__(self, name):
+        return name in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def byRawName(self, rawName):
+        """Return the entry of a raw data column name (None if it is not in the codebook)"""
+        name = self._byRawName.get(rawName)
+        return None if name is None else self._entries[name]
+
+    def byOrder(self, varOrder):
+        """Return the entry with a variable order number (None if it is not in the codebook)"""
+        name = self._byOrder.get(varOrder)
+        return None if name is None else self._entries[name]
+
+    def label(self, name, default=None):
+        """Return the label (field alias) of a variable"""
+        entry = self._entries.get(name)
+        return default if entry is None else entry["label"]
+
+    @property
+    def sumColumns(self):
+        """Variables summed in the time series aggregations (tsAggr fSum)"""
+        return self.aggregations["fSum"]
+
+    @classmethod
+    def load(cls, codebookPath, cache=True):
+        """Load a compiled codebook, once per process, from its binary cache or from the JSON file
+        Args:
+            codebookPath (str): path to the JSON codebook (cb.json)
+            cache (bool): read and write the binary cache file next to the JSON codebook
+        Returns:
+            Codebook: the compiled codebook
+        """
+        path = os.path.abspath(codebookPath)
+        info = os.stat(path)
+        stamp = (CACHE_VERSION, info.st_size, info.st_mtime_ns)
+        loaded = _loaded.get(path)
+        if loaded is not None and loaded[0] == stamp:
+            return loaded[1]
+
+        # Binary cache (valid if it was compiled from the current JSON file)
+        cachePath = os.path.splitext(path)[0] + CACHE_EXTENSION
+        codebook = None
+        if cache and os.path.exists(cachePath):
+            try:
+                with open(cachePath, "rb") as f:
+                    cachedStamp, cached = pickle.load(f)
+                if cachedStamp == stamp:
+                    codebook = cached
+            except (OSError, pickle.UnpicklingError, EOFError, ValueError, AttributeError):
+                codebook = None
+
+        # Compile from the JSON file and refresh the binary cache (a failed write only skips the cache)
+        if codebook is None:
+            with open(path, "r") as f:
+                codebook = cls(json.load(f))
+            if cache:
+                # Unique temporary file, so that concurrent loaders (e.g., the ingest worker processes) never share it
+                tmpPath = None
+                try:
+                    handle, tmpPath = tempfile.mkstemp(dir=os.path.dirname(cachePath), prefix=os.path.basename(cachePath) + ".", suffix=".tmp")
+                    with os.fdopen(handle, "wb") as f:
+                        pickle.dump((stamp, codebook), f, protocol=pickle.HIGHEST_PROTOCOL)
+                    os.replace(tmpPath, cachePath)
+                except OSError:
+                    if tmpPath is not None and os.path.exists(tmpPath):
+                        os.remove(tmpPath)
+
+        _loaded[path] = (stamp, codebook)
+        return codebook
+
+# endregion
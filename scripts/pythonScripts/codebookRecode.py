@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Codebook Recode - Vectorized Recode Engine for the Factor Variables
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Codebook-driven recode of the labeled factor variables (part1ImportRawData.R sections 9-11). The recodeOriginal and
+# labels entries of cb.json are compiled into lookup arrays, and all the labeled columns of a table are recoded in one
+# vectorized pass: the raw values of the whole column block are factorized once, and a (column x unique value) lookup
+# table gives the integer codes. Raw values that are not in the codebook become missing (the R recode .default = NA).
+# The factor variables without a recodeOriginal list (e.g., chpShift, beatType, victimRole) already carry their codes in
+# the raw data, so their code dictionaries map the text of each label code to the code itself. The labeled variables
+# that cannot be recoded (the numeric variables, whose labels only mark missing values) are listed and reported. The
+# code dictionaries are shared by all the tables that carry the same variable.
+
+import warnings
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Recode Engine
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Integer code used in the lookup arrays for values that are not in the codebook
+MISSING_CODE = -1
+
+# Data type of the recoded columns
+CODE_DTYPE = "Int16"
+
+
+class RecodeEngine:
+    """Compiled codebook recodes for the labeled factor variables
+    Args:
+        codebook (dict): the JSON codebook (cb.json)
+    """
+
+    def __init__(self, codebook):
+        # Shared code dictionaries: varName -> {"raw": raw values, "codes": integer codes, "source": source table}
+        self.categories = {}
+        # Labeled raw data variables without a code dictionary (left as they are)
+        self.skipped = []
+        for var in codebook.values():
+            recodeOriginal, labels = var["recodeOriginal"], var["labels"]
+            if not var["rawData"] or not var["rawName"] or not var["isLabeled"]:
+                continue
+            if isinstance(recodeOriginal, list) and isinstance(labels, list):
+                # Raw values and codes are paired in order (extra labels without a raw value are ignored)
+                pairs = list(zip(recodeOriginal, labels))
+            elif var["varType"] == "factor" and isinstance(labels, list):
+                # Raw values that already are the codes
+                pairs = [(code, code) for code in labels]
+            else:
+                self.skipped.append(var["varName"])
+                continue
+            self.categories[var["varName"]] = {
+                "raw": np.array([str(raw) for raw, _ in pairs], dtype=object),
+                "codes": np.array([code for _, code in pairs], dtype=np.int16),
+                "source": var["hasSource"],
+            }
+        if self.skipped:
+            warnings.warn(f"Labeled variables without a code dictionary are not recoded: {', '.join(self.skipped)}", stacklevel=2)
+
+    def columnsFor(self, df, table=None):
+        """Return the labeled columns of a data frame that are recoded (optionally only those sourced from a table)"""
+        return [name for name, cat in self.categories.items() if name in df.columns and (table is None or cat["source"] == table)]
+
+    def recode(self, df, table=None, columns=None):
+        """Recode all the labeled columns of a data frame in one vectorized pass
+        Args:
+            df (pandas.DataFrame): table with the raw (renamed) columns
+            table (str): source table ('crashes', 'parties', 'victims', ...); only the variables sourced from this table are recoded
+            columns (list): optional explicit list of columns to recode
+        Returns:
+            pandas.DataFrame: the data frame with the recoded integer code columns
+        """
+        if columns is None:
+            columns = self.columnsFor(df, table)
+        if not columns:
+            return df
+        n, k = len(df), len(columns)
+
+        # Factorize the raw values of the whole column block at once (missing raw values match the '' codebook entry)
+        block = np.empty((n, k), dtype=object)
+        for j, name in enumerate(columns):
+            block[:, j] = df[name].astype("string").fillna("").to_numpy(dtype=object)
+        uniqueIndex, uniques = pd.factorize(pd.Series(block.ravel(order="F"), dtype="string").str.strip())
+        uniques = pd.Index(uniques, dtype=object)
+
+        # Lookup table: (column, unique raw value) -> integer code (last slot for factorize's missing sentinel)
+        lookup = np.full((k, len(uniques) + 1), MISSING_CODE, dtype=np.int16)
+        for j, name in enumerate(columns):
+            cat = self.categories[name]
+            positions = uniques.get_indexer(cat["raw"])
+            found = positions >= 0
+            lookup[j, positions[found]] = cat["codes"][found]
+
+        # Gather the codes for every cell of the block
+        columnIndex = np.repeat(np.arange(k), n)
+        codes = lookup[columnIndex, uniqueIndex].reshape((k, n))
+
+        # Store the results as nullable integer code columns
+        recoded = {name: pd.arrays.IntegerArray(codes[j], codes[j] == MISSING_CODE) for j, name in enumerate(columns)}
+        return df.assign(**recoded)
+
+    def labels(self, name):
+        """Return the code dictionary (raw value -> code) of a recoded variable"""
+        cat = self.categories[name]
+        return dict(zip(cat["raw"], cat["codes"].tolist()))
+
+# endregion
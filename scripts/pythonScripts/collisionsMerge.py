@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Collisions Merge - Sorted-Key Merge of Crashes, Parties and Victims
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Merge engine for the collisions table (part1ImportRawData.R section 14.2: crashes outer join parties on caseId, then
+# outer join victims on caseId and partyNumber). Each table is sorted once by its keys, the matching row ranges are
+# found with binary searches (integer offset arrays), and the collisions rows are produced by indexed gathers of the
+# source columns. Peak memory is the size of the output plus the key and index arrays.
+
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Join Indexes
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Index value for a missing (unmatched) row
+NO_ROW = -1
+
+
+def _keyArray(series):
+    """Return the values of a key column as int64, with missing values set to -1"""
+    return pd.to_numeric(series, errors="coerce").fillna(-1).to_numpy(dtype=np.int64)
+
+
+def _gatherIndex(values, index):
+    """Gather an int64 array by index (-1 gives -1; an empty array is never indexed)"""
+    result = np.full(len(index), NO_ROW, dtype=np.int64)
+    valid = index >= 0
+    result[valid] = values[index[valid]]
+    return result
+
+
+def _compositeKey(caseId, partyNumber, base):
+    """Combine the case identifier and the party number into a single sortable int64 key"""
+    key = caseId * base + partyNumber
+    return np.where((caseId < 0) | (partyNumber < 0), -1, key)
+
+
+def outerJoinIndex(leftKeys, rightKeys, leftOrder=None, rightOrder=None):
+    """Compute the row indexes of a full outer join of two integer key arrays
+    Args:
+        leftKeys (numpy.ndarray): int64 keys of the left table (-1 = missing key, never matched)
+        rightKeys (numpy.ndarray): int64 keys of the right table (-1 = missing key, never matched)
+        leftOrder (numpy.ndarray): optional precomputed sort order of the left keys
+        rightOrder (numpy.ndarray): optional precomputed sort order of the right keys
+    Returns:
+        tuple: (left row indexes, right row indexes) of the joined rows in key order, -1 where a side is unmatched
+    """
+    # Sort both tables once by their keys
+    if leftOrder is None:
+        leftOrder = np.argsort(leftKeys, kind="stable")
+    if rightOrder is None:
+        rightOrder = np.argsort(rightKeys, kind="stable")
+    leftSorted = leftKeys[leftOrder]
+    rightSorted = rightKeys[rightOrder]
+
+    # Offsets of the matching right range for every (sorted) left key
+    lo = np.searchsorted(rightSorted, leftSorted, side="left")
+    hi = np.searchsorted(rightSorted, leftSorted, side="right")
+    counts = np.where(leftSorted < 0, 0, hi - lo)
+
+    # Each left row produces max(count, 1) rows
+    rowsPerLeft = np.maximum(counts, 1)
+    leftIndex = np.repeat(leftOrder, rowsPerLeft)
+    offsets = np.cumsum(rowsPerLeft) - rowsPerLeft
+    within = np.arange(len(leftIndex)) - np.repeat(offsets, rowsPerLeft)
+    rightPos = np.minimum(np.repeat(lo, rowsPerLeft) + within, max(len(rightOrder) - 1, 0))
+    rightIndex = np.where(np.repeat(counts, rowsPerLeft) > 0, rightOrder[rightPos] if len(rightOrder) else NO_ROW, NO_ROW)
+
+    # Right rows without a left match (outer join), appended in key order
+    found = np.searchsorted(leftSorted, rightSorted, side="left")
+    matched = (found < len(leftSorted)) & (leftSorted[np.minimum(found, max(len(leftSorted) - 1, 0))] == rightSorted) if len(leftSorted) else np.zeros(len(rightSorted), dtype=bool)
+    orphans = rightOrder[~matched | (rightSorted < 0)]
+
+    leftIndex = np.concatenate([leftIndex, np.full(len(orphans), NO_ROW)])
+    rightIndex = np.concatenate([rightIndex, orphans])
+    return leftIndex, rightIndex
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Gathers
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def gatherColumn(series, index):
+    """Gather the rows of a column by index (-1 gives a missing value), keeping integer columns as nullable integers"""
+    values = series.array
+    if (index < 0).any() and series.dtype.kind in "iub" and not isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+        values = pd.array(series.to_numpy())
+    return pd.Series(values.take(index, allow_fill=True), copy=False)
+
+
+def _coalesce(*columns):
+    """Return the first non-missing value across columns (used for the join keys)"""
+    result = columns[0]
+    for col in columns[1:]:
+        result = result.fillna(col)
+    return result
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Collisions Merge
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def mergeCollisions(crashes, parties, victims, caseKey="caseId", partyKey="partyNumber", victimKey="victimNumber", addTags=True):
+    """Build the collisions table from the crashes, parties and victims tables by sorted-key indexed gathers
+    Args:
+        crashes (pandas.DataFrame): crashes table
+        parties (pandas.DataFrame): parties table
+        victims (pandas.DataFrame): victims table
+        caseKey (str): case identifier column
+        partyKey (str): party number column
+        victimKey (str): victim number column (sort order of the victims within a party)
+        addTags (bool): update the crashTag, partyTag and victimTag columns (first row of each crash, party and victim)
+    Returns:
+        pandas.DataFrame: collisions table (one row per victim, or per party without victims, or per crash without parties)
+    """
+    # Step 1: crashes and parties on the case identifier
+    crashCase = _keyArray(crashes[caseKey])
+    partyCase = _keyArray(parties[caseKey])
+    partyNumber = _keyArray(parties[partyKey])
+    partyOrder = np.lexsort((partyNumber, partyCase))
+    crashIndex, partyIndex = outerJoinIndex(crashCase, partyCase, rightOrder=partyOrder)
+
+    # Step 2: the (crash, party) rows and the victims on the case identifier and the party number
+    victimCase = _keyArray(victims[caseKey])
+    victimParty = _keyArray(victims[partyKey])
+    base = int(max(partyNumber.max(initial=0), victimParty.max(initial=0))) + 1
+    rowCase = _gatherIndex(partyCase, partyIndex)
+    rowParty = _gatherIndex(partyNumber, partyIndex)
+    rowKeys = _compositeKey(rowCase, rowParty, base)
+    rowOrder = np.arange(len(rowKeys)) if np.all(rowKeys[1:] >= rowKeys[:-1]) else None
+    victimOrder = np.lexsort((_keyArray(victims[victimKey]), victimParty, victimCase)) if victimKey in victims.columns else None
+    rowIndex, victimIndex = outerJoinIndex(rowKeys, _compositeKey(victimCase, victimParty, base), leftOrder=rowOrder, rightOrder=victimOrder)
+    crashIndex = _gatherIndex(crashIndex, rowIndex)
+    partyIndex = _gatherIndex(partyIndex, rowIndex)
+
+    # Gather the output columns (keys coalesced across the three tables)
+    columns = {}
+    columns[caseKey] = _coalesce(gatherColumn(crashes[caseKey], crashIndex), gatherColumn(parties[caseKey], partyIndex), gatherColumn(victims[caseKey], victimIndex))
+    columns[partyKey] = _coalesce(gatherColumn(parties[partyKey], partyIndex), gatherColumn(victims[partyKey], victimIndex))
+    for df, index, suffix in ((crashes, crashIndex, ""), (parties, partyIndex, "Parties"), (victims, victimIndex, "Victims")):
+        for name in df.columns:
+            if name in (caseKey, partyKey):
+                continue
+            outName = name if name not in columns else name + suffix
+            columns[outName] = gatherColumn(df[name], index)
+    collisions = pd.DataFrame(columns, copy=False)
+
+    # Tags for the first row of each crash, party and victim (part1ImportRawData.R section 14.4)
+    if addTags:
+        for tag, index, size in (("crashTag", crashIndex, len(crashes)), ("partyTag", partyIndex, len(parties)), ("victimTag", victimIndex, len(victims))):
+            # First output position of every source row (reverse-order scatter: the smallest position is written last)
+            valid = np.flatnonzero(index >= 0)
+            firstPos = np.full(size, -1, dtype=np.int64)
+            firstPos[index[valid][::-1]] = valid[::-1]
+            first = np.zeros(len(index), dtype=np.int8)
+            first[firstPos[firstPos >= 0]] = 1
+            collisions[tag] = first
+    return collisions
+
+# endregion
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Datetime Features - Vectorized Date, Time, DST and Rush Hour Columns
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Vectorized derivation of the date and time columns of the crashes table (part1ImportRawData.R sections 6.2-6.5).
+# All the calendar, daylight savings time and time interval columns are computed from datetime64 arrays in a single
+# pass. The daylight savings time flag is computed from the US Pacific transition rules for each year (no per-row
+# time zone conversion), and the local datetimes can then be localized in bulk using that flag.
+
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Local time zone of the collision datetimes
+TIME_ZONE = "America/Los_Angeles"
+
+# UTC offsets (hours) of the Pacific standard and daylight savings times (dtZone codes)
+ZONE_PST = -8
+ZONE_PDT = -7
+
+# Hour of the local daylight savings time transitions
+DST_HOUR = 2
+
+# Rush hour intervals on weekdays (inclusive hours, part1ImportRawData.R section 6.5)
+RUSH_HOURS_AM = (7, 10)
+RUSH_HOURS_PM = (16, 19)
+
+# Output column order (after the collision date and time columns)
+DATETIME_COLUMNS = [
+    "dateDatetime", "dateYear", "dateQuarter", "dateMonth", "dateWeek", "dateDay",
+    "dtYear", "dtQuarter", "dtMonth", "dtYearWeek", "dtWeekDay", "dtMonthDay", "dtYearDay", "dtHour", "dtMinute",
+    "dtDst", "dtZone", "collTimeIntervals", "rushHours", "rushHoursBin",
+]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Calendar Helpers
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _weekDay(days):
+    """Day of the week of datetime64[D] values (0 = Sunday, ..., 6 = Saturday); 01/01/1970 was a Thursday"""
+    return (days.astype(np.int64) + 4) % 7
+
+
+def _nthSunday(years, month, n):
+    """Date of the n-th Sunday of a month (n = -1 for the last Sunday) for datetime64[Y] values"""
+    if n > 0:
+        first = (years.astype("datetime64[M]") + (month - 1)).astype("datetime64[D]")
+        return first + (7 - _weekDay(first)) % 7 + 7 * (n - 1)
+    last = (years.astype("datetime64[M]") + month).astype("datetime64[D]") - 1
+    return last - _weekDay(last)
+
+
+def dstBounds(years):
+    """Local start and end instants of the Pacific daylight savings time for datetime64[Y] values
+    (second Sunday of March to first Sunday of November since 2007, first Sunday of April to last Sunday of October before)
+    """
+    recent = years.astype(np.int64) + 1970 >= 2007
+    start = np.where(recent, _nthSunday(years, 3, 2), _nthSunday(years, 4, 1))
+    end = np.where(recent, _nthSunday(years, 11, 1), _nthSunday(years, 10, -1))
+    offset = np.timedelta64(DST_HOUR, "h")
+    return start.astype("datetime64[s]") + offset, end.astype("datetime64[s]") + offset
+
+
+def collisionDatetime(collDate, collTime):
+    """Combine the collision date and the HHMM collision time into local datetimes (part1ImportRawData.R section 6.2)
+    Times of 2400 or later are set to midnight, and times with invalid minutes are missing.
+    """
+    days = pd.to_datetime(collDate).to_numpy(dtype="datetime64[D]")
+    time = pd.to_numeric(pd.Series(collTime), errors="coerce").to_numpy(dtype="float64")
+    time = np.where(time >= 2400, 0, time)
+    hours, minutes = np.floor_divide(time, 100), np.remainder(time, 100)
+    valid = ~np.isnan(time) & (minutes < 60) & ~np.isnat(days)
+    result = days.astype("datetime64[m]") + (np.where(valid, hours * 60 + minutes, 0)).astype("timedelta64[m]")
+    return np.where(valid, result, np.datetime64("NaT")).astype("datetime64[ns]")
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Datetime Stage
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def datetimeColumns(local):
+    """Compute all the date, time, DST and time interval columns from local datetime64 values
+    Args:
+        local (numpy.ndarray): local (wall clock) collision datetimes
+    Returns:
+        dict: column name -> array (nullable integer arrays for the dt* columns)
+    """
+    local = np.asarray(local, dtype="datetime64[s]")
+    missing = np.isnat(local)
+
+    # Calendar floors
+    year = local.astype("datetime64[Y]")
+    month = local.astype("datetime64[M]")
+    day = local.astype("datetime64[D]")
+    monthNumber = (month - year.astype("datetime64[M]")).astype(np.int64) + 1
+    quarter = (monthNumber - 1) // 3 + 1
+    weekDay = _weekDay(day)
+    yearDay = (day - year.astype("datetime64[D]")).astype(np.int64)
+    minutes = (local - day.astype("datetime64[s]")).astype(np.int64) // 60
+    hour, minute = minutes // 60, minutes % 60
+
+    # Daylight savings time (wall clock between the transitions of the year)
+    dstStart, dstEnd = dstBounds(year)
+    dst = (local >= dstStart) & (local < dstEnd)
+
+    # Time intervals (1: 00-06, 2: 07-12, 3: 13-18, 4: 19-24) and rush hours (1: AM, 2: PM, 0: other) on weekdays
+    intervals = np.select([hour <= 6, hour <= 12, hour <= 18], [1, 2, 3], 4)
+    weekdays = (weekDay >= 1) & (weekDay <= 5)
+    rushAm = weekdays & (hour >= RUSH_HOURS_AM[0]) & (hour <= RUSH_HOURS_AM[1])
+    rushPm = weekdays & (hour >= RUSH_HOURS_PM[0]) & (hour <= RUSH_HOURS_PM[1])
+    rushHours = np.select([rushAm, rushPm], [1, 2], 0)
+
+    def nullable(values):
+        return pd.arrays.IntegerArray(np.where(missing, 0, values).astype(np.int32), missing.copy())
+
+    quarterStart = year.astype("datetime64[M]") + (quarter - 1) * 3
+    return {
+        "dateDatetime": local.astype("datetime64[ns]"),
+        "dateYear": year.astype("datetime64[ns]"),
+        "dateQuarter": np.where(missing, np.datetime64("NaT"), quarterStart.astype("datetime64[ns]")),
+        "dateMonth": month.astype("datetime64[ns]"),
+        "dateWeek": (day - weekDay).astype("datetime64[ns]"),
+        "dateDay": day.astype("datetime64[ns]"),
+        "dtYear": nullable(year.astype(np.int64) + 1970),
+        "dtQuarter": nullable(quarter),
+        "dtMonth": nullable(monthNumber),
+        "dtYearWeek": nullable(yearDay // 7 + 1),
+        "dtWeekDay": nullable(weekDay + 1),
+        "dtMonthDay": nullable((day - month.astype("datetime64[D]")).astype(np.int64) + 1),
+        "dtYearDay": nullable(yearDay + 1),
+        "dtHour": nullable(hour),
+        "dtMinute": nullable(minute),
+        "dtDst": nullable(dst.astype(np.int64)),
+        "dtZone": nullable(np.where(dst, ZONE_PDT, ZONE_PST)),
+        "collTimeIntervals": nullable(intervals),
+        "rushHours": nullable(rushHours),
+        "rushHoursBin": nullable((rushHours > 0).astype(np.int64)),
+    }
+
+
+def addDatetimeColumns(crashes, dateColumn="collDate", timeColumn="collTime"):
+    """Add the date and time columns to the crashes table in a single vectorized pass
+    Args:
+        crashes (pandas.DataFrame): crashes table with the collision date and HHMM time columns
+        dateColumn (str): collision date column
+        timeColumn (str): collision time column
+    Returns:
+        pandas.DataFrame: the crashes table with the new columns
+    """
+    local = collisionDatetime(crashes[dateColumn], crashes[timeColumn])
+    columns = datetimeColumns(local)
+    return crashes.assign(**{name: columns[name] for name in DATETIME_COLUMNS})
+
+
+def localizeDatetimes(local, dst):
+    """Localize the local collision datetimes to the Pacific time zone in bulk, using the DST flag for the ambiguous hour"""
+    return pd.DatetimeIndex(local).tz_localize(TIME_ZONE, ambiguous=np.asarray(dst, dtype=bool), nonexistent="shift_forward")
+
+# endregion
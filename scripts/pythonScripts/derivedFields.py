@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Derived Fields - Declarative Vectorized Field Calculations
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Bulk replacement of the arcpy.management.CalculateField calls with Python code blocks (e.g. the sevbin code block of
+# the severityBin field in part1Features.py), which run the code block once per row. The derived fields are declared
+# in derivedFields.json next to the codebook: each field has a label, a field type and an ordered list of rules, each
+# rule a list of [column, operator, value] conditions (all must hold) and the value of the rows that match it first
+# (the if/elif chain of a code block), with a default for the rows that match no rule. The conditions are evaluated
+# over whole columns, and the derived columns are written back in one batch by a table writer: ArcpyWriter updates a
+# feature class or table with a single update cursor pass, and LocalWriter updates a pandas data frame.
+
+import os, json
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Default path to the derived field rules (codebook folder, next to cb.json)
+DERIVED_RULES_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "codebook", "derivedFields.json")
+
+# Pandas data types of the geodatabase field types
+FIELD_DTYPES = {"SHORT": "Int16", "LONG": "Int32", "FLOAT": "Float32", "DOUBLE": "Float64", "TEXT": "string"}
+
+# Condition operators: operator -> function of the column and the rule value (missing values never match, except for
+# the isnull operator: the results of the other operators are restricted to the non-missing values)
+OPERATORS = {
+    "==": lambda column, value: column == value,
+    "!=": lambda column, value: column != value,
+    "<": lambda column, value: column < value,
+    "<=": lambda column, value: column <= value,
+    ">": lambda column, value: column > value,
+    ">=": lambda column, value: column >= value,
+    "in": lambda column, value: column.isin(value),
+    "not in": lambda column, value: ~column.isin(value),
+    "isnull": lambda column, value: column.isna(),
+    "notnull": lambda column, value: column.notna(),
+}
+
+# Operators that test the missing values themselves
+NULL_OPERATORS = {"isnull", "notnull"}
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Derived Field Rules
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def loadRules(rulesPath=DERIVED_RULES_PATH):
+    """Load and validate the derived field rules
+    Args:
+        rulesPath (str): path to the derived field rules (derivedFields.json)
+    Returns:
+        dict: field name -> field specification (label, description, fieldType, rules, default)
+    """
+    with open(rulesPath, "r") as f:
+        rules = json.load(f)
+    for name, spec in rules.items():
+        if spec["fieldType"] not in FIELD_DTYPES:
+            raise ValueError(f"Unsupported field type {spec['fieldType']} for {name}")
+        for rule in spec["rules"]:
+            for column, operator, _ in rule["when"]:
+                if operator not in OPERATORS:
+                    raise ValueError(f"Unsupported operator {operator} on {column} for {name}")
+    return rules
+
+
+def sourceColumns(rules, fields=None):
+    """Return the source columns of the conditions of the derived fields (in order of first use)"""
+    columns = []
+    for name in fields or list(rules):
+        for rule in rules[name]["rules"]:
+            for column, _, _ in rule["when"]:
+                if column not in columns:
+                    columns.append(column)
+    return columns
+
+
+def computeField(df, spec):
+    """Compute a derived field over whole columns
+    Args:
+        df (pandas.DataFrame): table with the source columns
+        spec (dict): field specification (see loadRules)
+    Returns:
+        pandas.Series: the derived column (nullable field type; rows that match no rule get the default)
+    """
+    n = len(df)
+    dtype = pd.api.types.pandas_dtype(FIELD_DTYPES[spec["fieldType"]])
+    numeric = spec["fieldType"] != "TEXT"
+    values = np.zeros(n, dtype=dtype.numpy_dtype) if numeric else np.full(n, None, dtype=object)
+    assigned = np.zeros(n, dtype=bool)
+    # The first matching rule sets the value of a row (if/elif)
+    for rule in spec["rules"]:
+        match = ~assigned
+        for column, operator, value in rule["when"]:
+            match &= pd.Series(OPERATORS[operator](df[column], value)).to_numpy(dtype=bool, na_value=False)
+            if operator not in NULL_OPERATORS:
+                match &= df[column].notna().to_numpy()
+        values[match] = rule["value"]
+        assigned |= match
+    default = spec.get("default")
+    if default is not None:
+        values[~assigned] = default
+        assigned[:] = True
+    if numeric:
+        # Masked (nullable) array: the rows without a value are missing
+        return pd.Series(dtype.construct_array_type()(values, ~assigned), index=df.index, copy=False)
+    return pd.Series(pd.array(values, dtype=dtype), index=df.index)
+
+
+def computeFields(df, rules, fields=None):
+    """Compute several derived fields
+    Args:
+        df (pandas.DataFrame): table with the source columns
+        rules (dict): derived field rules (see loadRules)
+        fields (list): derived fields to compute (all the fields of the rules if None)
+    Returns:
+        pandas.DataFrame: the derived columns
+    """
+    return pd.DataFrame({name: computeField(df, rules[name]) for name in fields or list(rules)}, index=df.index)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Table Writers
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class LocalWriter:
+    """Table writer over a pandas data frame (derived columns are added to, or replaced in, the data frame)
+    Args:
+        df (pandas.DataFrame): the table
+    """
+
+    def __init__(self, df):
+        self.df = df
+        self.batches = 0
+
+    def read(self, columns):
+        """Return the source columns of the table"""
+        return self.df[columns]
+
+    def write(self, derived, rules):
+        """Write the derived columns to the table in one batch"""
+        for name in derived.columns:
+            self.df[name] = derived[name].array
+        self.batches += 1
+
+
+class ArcpyWriter:
+    """Table writer over a geodatabase feature class or table (rows are matched by object id)
+    Args:
+        table (str): path to the feature class or table
+    """
+
+    def __init__(self, table):
+        self.table = table
+
+    def read(self, columns):
+        """Return the source columns of the table (indexed by object id)"""
+        import arcpy
+        with arcpy.da.SearchCursor(self.table, ["OID@", *columns]) as cursor:
+            rows = list(cursor)
+        return pd.DataFrame(rows, columns=["OID@", *columns]).set_index("OID@")
+
+    def write(self, derived, rules):
+        """Add the missing derived fields and write all the derived columns in a single update cursor pass"""
+        import arcpy
+        existing = {field.name for field in arcpy.ListFields(self.table)}
+        for name in derived.columns:
+            if name not in existing:
+                arcpy.management.AddField(self.table, name, rules[name]["fieldType"], field_alias=rules[name].get("label"))
+        names = list(derived.columns)
+        values = dict(zip(derived.index, derived.astype(object).where(derived.notna(), None).itertuples(index=False, name=None)))
+        with arcpy.da.UpdateCursor(self.table, ["OID@", *names]) as cursor:
+            for row in cursor:
+                if row[0] in values:
+                    cursor.updateRow([row[0], *values[row[0]]])
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Derived Fields
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def deriveFields(writer, fields=None, rules=None, rulesPath=DERIVED_RULES_PATH):
+    """Compute derived fields from the rules and write them back through a table writer in one batch
+    Args:
+        writer (LocalWriter or ArcpyWriter): table writer (any object with read(columns) and write(derived, rules))
+        fields (list): derived fields to compute (all the fields of the rules if None)
+        rules (dict): derived field rules (loaded from rulesPath if None)
+        rulesPath (str): path to the derived field rules
+    Returns:
+        pandas.DataFrame: the derived columns
+    """
+    if rules is None:
+        rules = loadRules(rulesPath)
+    derived = computeFields(writer.read(sourceColumns(rules, fields)), rules, fields)
+    writer.write(derived, rules)
+    return derived
+
+# endregion
@@ -0,0 +1,343 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Exploratory Regression - All Subsets OLS Search with Gram Matrix Reuse
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# All subsets search of the arcpy.stats.ExploratoryRegression call of part1Features.py section 2.4 (severityBin on the
+# crash candidate variables, 1 to 5 explanatory variables), with the same search criteria (adjusted R2, coefficient
+# p-values, VIF, Jarque-Bera and residual spatial autocorrelation). The cross products of the centered candidates and
+# dependent variable are computed once. The subsets are enumerated depth first (each subset extends its prefix by one
+# variable), and the Cholesky factor of a subset, its inverse and the solution of the normal equations are bordered
+# updates of the prefix factors (one row each), so a subset model costs a few products of k x k blocks: the
+# explained sum of squares is |L^-1 X'y|^2, and the coefficient variances and VIFs are the diagonal of the inverse.
+# The third and fourth moments of the residuals (Jarque-Bera test) are contractions of the third and fourth order
+# cross moments of the centered [y, X] with the vector [1, -b], so these moments are also computed once (two matrix
+# products over blocks of rows) and no model needs the data. The subtrees of the first variables run in worker
+# processes, and the residual Moran's I (8 nearest neighbors, row standardized, as in the tool without a weights
+# file) is computed only for the models that pass all the other criteria.
+#
+# On Windows (spawn start method) the parallel runs must be called from an importable module or under a
+# `if __name__ == "__main__":` guard.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy import sparse, stats
+from scipy.spatial import cKDTree
+
+from incrementalAutocorrelation import moransStatistics
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Dependent and candidate explanatory variables of the exploratory regression (part1Features.py)
+DEPENDENT_VARIABLE = "severityBin"
+CANDIDATE_VARIABLES = [
+    "accidentYear", "collSeverityNum", "collSeverityRankNum", "partyCount", "victimCount", "numberKilled", "numberInj",
+    "countSevereInj", "countVisibleInj", "countComplaintPain", "countCarKilled", "countCarInj", "countPedKilled",
+    "countPedInj", "countBicKilled", "countBicInj", "countMcKilled", "countMcInj",
+]
+
+# Search criteria of the exploratory regression (part1Features.py)
+SEARCH_CRITERIA = {
+    "minVariables": 1,
+    "maxVariables": 5,
+    "minAdjR2": 0.5,
+    "maxCoefP": 0.05,
+    "maxVIF": 7.5,
+    "minJBP": 0.1,
+    "minSAP": 0.1,
+}
+
+# Number of nearest neighbors of the residual spatial autocorrelation test
+SA_NEIGHBORS = 8
+
+# Number of rows per block of the cross moment products
+MOMENT_ROWS = 16_384
+
+# Relative pivot tolerance of the Cholesky updates (a smaller pivot is a collinear subset)
+PIVOT_TOLERANCE = 1e-10
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Subset Models
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Cross moments of the search workers (set by the pool initializer, or directly for serial runs)
+_workerData = {}
+
+
+def crossMoments(x, y, rows=MOMENT_ROWS):
+    """Second, third and fourth order cross moments (sums of products) of the centered [y, X]
+    Args:
+        x (numpy.ndarray): (n x p) centered explanatory variables
+        y (numpy.ndarray): centered dependent variable
+        rows (int): number of rows per block
+    Returns:
+        dict: n, the (q x q) second moments, the (q^2 x q) third moments and the (q^2 x q^2) fourth moments (q = p + 1,
+            with the dependent variable first)
+    """
+    v = np.column_stack([y, x])
+    n, q = v.shape
+    m3 = np.zeros((q * q, q))
+    m4 = np.zeros((q * q, q * q))
+    for start in range(0, n, rows):
+        block = v[start:start + rows]
+        pairs = (block[:, :, None] * block[:, None, :]).reshape(len(block), q * q)
+        m3 += pairs.T @ block
+        m4 += pairs.T @ pairs
+    return {"n": n, "m2": v.T @ v, "m3": m3, "m4": m4}
+
+
+def _initSearch(moments, minVariables, maxVariables):
+    """Worker process initializer: keep the cross moments and the model sizes"""
+    _workerData.update(moments, minVariables=minVariables, maxVariables=maxVariables)
+
+
+def subsetModels(first):
+    """Fit all the subset models whose first (lowest) variable is a given candidate
+    Args:
+        first (int): index of the first variable
+    Returns:
+        list: model rows (variables, adjusted R2, AICc, coefficients, p-values, VIFs and Jarque-Bera p-value)
+    """
+    m2, n = _workerData["m2"], _workerData["n"]
+    gram, xy, yy, p = m2[1:, 1:], m2[1:, 0], float(m2[0, 0]), len(m2) - 1
+    minVariables, maxVariables = _workerData["minVariables"], _workerData["maxVariables"]
+    models = []
+
+    def extend(variables, inverse, z):
+        # Bordered Cholesky update: L_new = [[L, 0], [l', d]], with l = L^-1 a and d^2 = a_jj - l'l
+        j = variables[-1]
+        column = gram[variables[:-1], j]
+        l = inverse @ column
+        pivot = gram[j, j] - l @ l
+        if pivot <= PIVOT_TOLERANCE * gram[j, j] or gram[j, j] <= 0:
+            return None
+        d = np.sqrt(pivot)
+        k = len(variables)
+        bordered = np.zeros((k, k))
+        bordered[:-1, :-1] = inverse
+        bordered[-1, :-1] = -(l @ inverse) / d
+        bordered[-1, -1] = 1.0 / d
+        return bordered, np.append(z, (xy[j] - l @ z) / d)
+
+    def visit(variables, inverse, z):
+        k = len(variables)
+        if k >= minVariables:
+            model = fitModel(variables, inverse, z, gram, yy, n)
+            model["JBP"] = jarqueBeraP(variables, model["coefficients"], _workerData)
+            models.append(model)
+        if k < maxVariables:
+            for j in range(variables[-1] + 1, p):
+                update = extend(variables + [j], inverse, z)
+                if update is not None:
+                    visit(variables + [j], *update)
+
+    root = extend([first], np.zeros((0, 0)), np.zeros(0))
+    if root is not None:
+        visit([first], *root)
+    return models
+
+
+def fitModel(variables, inverse, z, gram, yy, n):
+    """Statistics of a subset model from its inverse Cholesky factor and the solution z = L^-1 X'y
+    Args:
+        variables (list): indexes of the variables
+        inverse (numpy.ndarray): inverse of the Cholesky factor of the cross products of the variables
+        z (numpy.ndarray): L^-1 X'y
+        gram (numpy.ndarray): cross products of the centered candidates
+        yy (float): sum of squares of the centered dependent variable
+        n (int): number of observations
+    Returns:
+        dict: model row
+    """
+    k = len(variables)
+    sse = max(yy - z @ z, 0.0)
+    df = n - k - 1
+    coefficients = inverse.T @ z
+    inverseDiagonal = (inverse * inverse).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = coefficients / np.sqrt(sse / df * inverseDiagonal)
+    r2 = 1.0 - sse / yy
+    parameters = k + 1
+    return {
+        "variables": tuple(variables),
+        "k": k,
+        "AdjR2": 1.0 - (1.0 - r2) * (n - 1) / df,
+        "AICc": n * np.log(sse / n) + n * np.log(2 * np.pi) + n * (n + parameters) / (n - 2 - parameters),
+        "coefficients": coefficients,
+        "pValues": 2.0 * stats.t.sf(np.abs(t), df),
+        "VIF": inverseDiagonal * gram[variables, variables],
+    }
+
+
+def jarqueBeraP(variables, coefficients, moments):
+    """Jarque-Bera p-value of the residuals of a model, from the cross moments (see crossMoments)
+    Args:
+        variables (list): indexes of the variables
+        coefficients (numpy.ndarray): coefficients of the variables
+        moments (dict): cross moments of the centered [y, X]
+    Returns:
+        float: p-value
+    """
+    q = len(moments["m2"])
+    index = np.array([0] + [j + 1 for j in variables])
+    c = np.append(1.0, -coefficients)
+    pairs = (index[:, None] * q + index[None, :]).ravel()
+    cc = np.outer(c, c).ravel()
+    n = moments["n"]
+    m2 = c @ moments["m2"][np.ix_(index, index)] @ c / n
+    m3 = cc @ moments["m3"][np.ix_(pairs, index)] @ c / n
+    m4 = cc @ moments["m4"][np.ix_(pairs, pairs)] @ cc / n
+    if m2 <= 0:
+        return np.nan
+    jb = n / 6.0 * (m3 * m3 / m2 ** 3 + (m4 / (m2 * m2) - 3.0) ** 2 / 4.0)
+    return float(stats.chi2.sf(jb, 2))
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Residual Spatial Autocorrelation
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def knnWeights(xy, k=SA_NEIGHBORS):
+    """Row standardized k nearest neighbor weights and their Moran's I weight sums
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        k (int): number of neighbors
+    Returns:
+        tuple: (n x n) CSR weights, and the S0, S1 and S2 sums of the weights
+    """
+    n = len(xy)
+    _, neighbors = cKDTree(xy).query(xy, k=k + 1)
+    weights = sparse.csr_matrix((np.full(n * k, 1.0 / k), neighbors[:, 1:].ravel(), np.arange(0, n * k + 1, k)), shape=(n, n))
+    symmetric = weights + weights.T
+    s1 = 0.5 * float(symmetric.multiply(symmetric).sum())
+    s2 = float(((np.asarray(weights.sum(axis=1)).ravel() + np.asarray(weights.sum(axis=0)).ravel()) ** 2).sum())
+    return weights, (float(n), s1, s2)
+
+
+def residualMoransP(model, x, y, weights, sums):
+    """p-value of the global Moran's I of the residuals of a model"""
+    residuals = y - x[:, list(model["variables"])] @ model["coefficients"]
+    z = residuals - residuals.mean()
+    return float(moransStatistics(z, float(z @ (weights @ z)), *sums)[4])
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Exploratory Regression
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def exploratoryRegression(data, dependent=DEPENDENT_VARIABLE, candidates=CANDIDATE_VARIABLES, criteria=SEARCH_CRITERIA, xColumn=None, yColumn=None, maxWorkers=None):
+    """All subsets OLS search with the exploratory regression criteria
+    Args:
+        data (pandas.DataFrame): table with the dependent and candidate variables (rows with missing values are left out)
+        dependent (str): dependent variable
+        candidates (list): candidate explanatory variables
+        criteria (dict): search criteria (see SEARCH_CRITERIA)
+        xColumn, yColumn (str): coordinate columns for the residual spatial autocorrelation test (skipped if None, and
+            then left out of Passed)
+        maxWorkers (int): number of worker processes (defaults to one per CPU; 1 runs serially)
+    Returns:
+        pandas.DataFrame: one row per subset model (Variables, K, AdjR2, AICc, MaxCoefP, MaxVIF, JBP, SAP, the
+            Coefficients and PValues of the variables, the pass flags of the criteria and Passed), sorted by number of
+            variables and adjusted R2
+    """
+    criteria = {**SEARCH_CRITERIA, **criteria}
+    columns = [dependent, *candidates] + ([xColumn, yColumn] if xColumn else [])
+    table = data[columns].apply(pd.to_numeric, errors="coerce").dropna()
+    x = table[candidates].to_numpy(dtype=np.float64)
+    y = table[dependent].to_numpy(dtype=np.float64)
+    x = x - x.mean(axis=0)
+    y = y - y.mean()
+
+    # Subtrees of the first variables (the largest subtrees first)
+    firsts = list(range(len(candidates)))
+    if maxWorkers is None:
+        maxWorkers = os.cpu_count() or 1
+    initArgs = (crossMoments(x, y), criteria["minVariables"], criteria["maxVariables"])
+    if maxWorkers <= 1:
+        _initSearch(*initArgs)
+        models = [model for first in firsts for model in subsetModels(first)]
+        _workerData.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=maxWorkers, initializer=_initSearch, initargs=initArgs) as executor:
+            models = [model for subtree in executor.map(subsetModels, firsts) for model in subtree]
+
+    results = pd.DataFrame({
+        "Variables": [" + ".join(candidates[j] for j in model["variables"]) for model in models],
+        "K": [model["k"] for model in models],
+        "AdjR2": [model["AdjR2"] for model in models],
+        "AICc": [model["AICc"] for model in models],
+        "MaxCoefP": [float(model["pValues"].max()) for model in models],
+        "MaxVIF": [float(model["VIF"].max()) for model in models],
+        "JBP": [model["JBP"] for model in models],
+        "SAP": np.nan,
+        "Coefficients": [tuple(model["coefficients"]) for model in models],
+        "PValues": [tuple(model["pValues"]) for model in models],
+    })
+    results["PassAdjR2"] = results["AdjR2"] >= criteria["minAdjR2"]
+    results["PassCoefP"] = results["MaxCoefP"] <= criteria["maxCoefP"]
+    results["PassVIF"] = results["MaxVIF"] <= criteria["maxVIF"]
+    results["PassJB"] = results["JBP"] >= criteria["minJBP"]
+
+    # Residual spatial autocorrelation of the models that pass all the other criteria
+    candidatesPassed = np.flatnonzero(results[["PassAdjR2", "PassCoefP", "PassVIF", "PassJB"]].all(axis=1).to_numpy())
+    if xColumn and len(candidatesPassed):
+        weights, sums = knnWeights(table[[xColumn, yColumn]].to_numpy(dtype=np.float64))
+        for i in candidatesPassed:
+            results.loc[i, "SAP"] = residualMoransP(models[i], x, y, weights, sums)
+    # Without coordinates the test is not run, and the models pass on the other criteria
+    results["PassSA"] = results["SAP"] >= criteria["minSAP"] if xColumn else True
+    results["Passed"] = results[["PassAdjR2", "PassCoefP", "PassVIF", "PassJB", "PassSA"]].all(axis=1)
+    return results.sort_values(["K", "AdjR2"], ascending=[True, False], kind="stable").reset_index(drop=True)
+
+
+def criteriaSummary(results, criteria=SEARCH_CRITERIA):
+    """Percentage of the search criteria passed (as in the exploratory regression report); the spatial autocorrelation
+    criterion is reported as not run when no model was tested"""
+    criteria = {**SEARCH_CRITERIA, **criteria}
+    tested = results["SAP"].notna()
+    rows = [
+        ["Min Adjusted R-Squared", criteria["minAdjR2"], results["PassAdjR2"]],
+        ["Max Coefficient p-value", criteria["maxCoefP"], results["PassCoefP"]],
+        ["Max VIF Value", criteria["maxVIF"], results["PassVIF"]],
+        ["Min Jarque-Bera p-value", criteria["minJBP"], results["PassJB"]],
+        ["Min Spatial Autocorrelation p-value" + ("" if tested.any() else " (not run)"), criteria["minSAP"], results["PassSA"][tested]],
+    ]
+    return pd.DataFrame(
+        [[name, cutoff, int(passed.sum()), len(passed), 100.0 * passed.mean() if len(passed) else np.nan] for name, cutoff, passed in rows],
+        columns=["Search Criterion", "Cutoff", "Trials Passed", "Trials", "% Passed"],
+    )
+
+
+def variableSignificance(results, candidates=CANDIDATE_VARIABLES, criteria=SEARCH_CRITERIA):
+    """Summary of variable significance (as in the exploratory regression report): the percentage of the models of
+    each variable in which it is significant, and the percentages of negative and positive coefficients"""
+    criteria = {**SEARCH_CRITERIA, **criteria}
+    position = {name: i for i, name in enumerate(candidates)}
+    counts = np.zeros((len(candidates), 4))
+    for names, coefficients, pValues in zip(results["Variables"], results["Coefficients"], results["PValues"]):
+        variables = [position[name] for name in names.split(" + ")]
+        counts[variables, 0] += 1
+        counts[variables, 1] += np.asarray(pValues) <= criteria["maxCoefP"]
+        counts[variables, 2] += np.asarray(coefficients) < 0
+        counts[variables, 3] += np.asarray(coefficients) > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        shares = 100.0 * counts[:, 1:] / counts[:, :1]
+    summary = pd.DataFrame({"Variable": candidates, "% Significant": shares[:, 0], "% Negative": shares[:, 1], "% Positive": shares[:, 2]})
+    return summary.sort_values("% Significant", ascending=False, kind="stable").reset_index(drop=True)
+
+# endregion
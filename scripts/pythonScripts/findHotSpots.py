@@ -0,0 +1,220 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Find Hot Spots - Shared Grid Multi-Scale Hot Spot Sweep of Binned Crashes
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Multi-scale equivalent of the arcpy.gapro.FindHotSpots runs of part1Features.py section 2.5 (100 m bins with 1 km
+# neighbors, 150 m / 2 km and 100 m / 5 km over all the crashes, and 500 ft / 1 mile over the crashes within 500 feet
+# from major roads), which rebin the same crashes at every run. The scale sets are per point layer: one findHotSpots
+# call per layer reproduces the runs of that layer. The points
+# are binned once on a base grid of square bins, with absolute bin indices (floor(x / size)), so a bin size that is an
+# integer multiple of the base size is an aggregation of the base bins (floor(i / k)). The Gi* statistic of the bin
+# counts needs, for every bin, the sum of the counts and the number of analysis bins within the neighborhood radius
+# (distance between the bin centers). Both are computed on the dense grid of each bin size with a row summed-area
+# table (cumulative sums along the rows): the circular neighborhood is a set of row spans, so each radius costs one
+# pass over the grid per row of the neighborhood, whatever the number of points. All the radii of a bin size share the
+# table, and the z-scores use the Gi* formula of hotSpots.py.
+
+import math
+import numpy as np
+import pandas as pd
+
+from hotSpots import GI_FIELDS, giBins, giStatistics
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Conversion of meters, kilometers and miles to the projected units of the crash coordinates (feet)
+FEET_PER_METER = 1 / 0.3048
+FEET_PER_MILE = 5280.0
+
+# Bin size and neighborhood radius of the FindHotSpots runs of the crashes (feet): name -> (bin size, neighborhood radius)
+FIND_HOT_SPOTS_SCALES = {
+    "100m1km": (100 * FEET_PER_METER, 1000 * FEET_PER_METER),
+    "150m2km": (150 * FEET_PER_METER, 2000 * FEET_PER_METER),
+    "100m5km": (100 * FEET_PER_METER, 5000 * FEET_PER_METER),
+}
+
+# Bin size and neighborhood radius of the FindHotSpots runs of the crashes within 500 feet from major roads (the
+# crashes500ftFromMajorRoads layer; these scales are not equivalent over all the crashes)
+MAJOR_ROADS_SCALES = {
+    "500ft1mi": (500.0, FEET_PER_MILE),
+}
+
+# Base bin size of the sweep (50 m: the 100 m and 150 m bins are aggregations of the base bins)
+BASE_BIN_SIZE = 50 * FEET_PER_METER
+
+# Relative tolerance of the bin size multiples and of the neighborhood distances
+SCALE_TOLERANCE = 1e-9
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Binning
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def binPoints(x, y, size):
+    """Count the points in square bins with absolute indices (bin (i, j) covers [i * size, (i + 1) * size))
+    Args:
+        x, y (numpy.ndarray): point coordinates
+        size (float): bin size
+    Returns:
+        tuple: column and row indices of the occupied bins and their point counts
+    """
+    column = np.floor(np.asarray(x, dtype=np.float64) / size).astype(np.int64)
+    row = np.floor(np.asarray(y, dtype=np.float64) / size).astype(np.int64)
+    return _countBins(column, row, np.ones(len(column), dtype=np.int64))
+
+
+def coarsenBins(column, row, counts, factor):
+    """Aggregate occupied bins into bins of an integer multiple of their size
+    Args:
+        column, row (numpy.ndarray): absolute bin indices
+        counts (numpy.ndarray): point counts of the bins
+        factor (int): size multiple of the coarse bins
+    Returns:
+        tuple: column and row indices of the occupied coarse bins and their point counts
+    """
+    return _countBins(np.floor_divide(column, factor), np.floor_divide(row, factor), counts)
+
+
+def _countBins(column, row, counts):
+    """Sum the counts of identical bins"""
+    if len(column) == 0:
+        return column, row, counts
+    c0, r0 = column.min(), row.min()
+    width = int(column.max() - c0) + 1
+    key = (row - r0) * width + (column - c0)
+    order = np.argsort(key, kind="stable")
+    key = key[order]
+    starts = np.flatnonzero(np.diff(key, prepend=-1) != 0)
+    return c0 + key[starts] % width, r0 + key[starts] // width, np.add.reduceat(counts[order], starts)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Neighborhood Sums
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class BinGrid:
+    """Dense grid of bin counts with a row summed-area table for circular neighborhood sums
+    Args:
+        column, row (numpy.ndarray): absolute indices of the occupied bins
+        counts (numpy.ndarray): point counts of the bins
+        size (float): bin size
+    """
+
+    def __init__(self, column, row, counts, size):
+        self.size = size
+        self.column0, self.row0 = int(column.min()), int(row.min())
+        self.shape = (int(row.max()) - self.row0 + 1, int(column.max()) - self.column0 + 1)
+        self.column = column - self.column0
+        self.row = row - self.row0
+        self.counts = counts
+        grid = np.zeros(self.shape, dtype=np.int64)
+        grid[self.row, self.column] = counts
+
+        # Cumulative sums along the rows (with a leading zero column) of the counts and of the occupied bins
+        self.countTable = np.zeros((self.shape[0], self.shape[1] + 1), dtype=np.int64)
+        np.cumsum(grid, axis=1, out=self.countTable[:, 1:])
+        self.binTable = np.zeros((self.shape[0], self.shape[1] + 1), dtype=np.int64)
+        np.cumsum(grid > 0, axis=1, out=self.binTable[:, 1:])
+
+    def rowSpans(self, radius):
+        """Half widths (in bins) of the row spans of a circular neighborhood, for the row offsets -k..k"""
+        reach = radius / self.size * (1 + SCALE_TOLERANCE)
+        k = int(math.floor(reach))
+        offsets = np.arange(-k, k + 1)
+        return offsets, np.floor(np.sqrt(np.maximum(reach * reach - offsets * offsets, 0.0))).astype(np.int64)
+
+    def neighborhoodSums(self, radius):
+        """Sums of the counts and numbers of occupied bins within a radius of each occupied bin (itself included)
+        Args:
+            radius (float): neighborhood radius (distance between the bin centers)
+        Returns:
+            tuple: count sums and occupied bin counts of the occupied bins
+        """
+        counts = np.zeros(len(self.counts), dtype=np.int64)
+        bins = np.zeros(len(self.counts), dtype=np.int64)
+        offsets, halfWidths = self.rowSpans(radius)
+        width = self.shape[1]
+        for dy, half in zip(offsets, halfWidths):
+            row = self.row + dy
+            inside = (row >= 0) & (row < self.shape[0])
+            r = row[inside]
+            lo = np.clip(self.column[inside] - half, 0, width)
+            hi = np.clip(self.column[inside] + half + 1, 0, width)
+            counts[inside] += self.countTable[r, hi] - self.countTable[r, lo]
+            bins[inside] += self.binTable[r, hi] - self.binTable[r, lo]
+        return counts, bins
+
+    def centers(self):
+        """Coordinates of the centers of the occupied bins"""
+        return (self.column + self.column0 + 0.5) * self.size, (self.row + self.row0 + 0.5) * self.size
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Hot Spot Sweep
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def binGiStar(grid, radius):
+    """Gi* hot spots of the point counts of the occupied bins of a grid, with a neighborhood radius
+    Args:
+        grid (BinGrid): binned points
+        radius (float): neighborhood radius
+    Returns:
+        pandas.DataFrame: bin centers (binX, binY), pointCount and the Gi* fields (GiZScore, GiPValue, NNeighbors, Gi_Bin)
+    """
+    localSums, neighbors = grid.neighborhoodSums(radius)
+    values = grid.counts.astype(np.float64)
+    z, p = giStatistics(values, localSums.astype(np.float64), neighbors.astype(np.float64), neighbors.astype(np.float64))
+    x, y = grid.centers()
+    return pd.DataFrame({"binX": x, "binY": y, "pointCount": grid.counts, **dict(zip(GI_FIELDS, [z, p, neighbors, giBins(z, p)]))})
+
+
+def findHotSpots(points, scales=FIND_HOT_SPOTS_SCALES, baseSize=BASE_BIN_SIZE, xColumn="pointX", yColumn="pointY"):
+    """Hot spots of the binned points at several bin sizes and neighborhood radii in one call
+    The points are binned once on the base grid, and every bin size that is an integer multiple of the base size is
+    aggregated from it; other bin sizes are binned once from the points. The Gi* analysis uses the occupied bins.
+    Points without finite coordinates are left out.
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns
+        scales (dict): name -> (bin size, neighborhood radius), in the units of the coordinates (FIND_HOT_SPOTS_SCALES
+            for the crashes, MAJOR_ROADS_SCALES for the crashes within 500 feet from major roads)
+        baseSize (float): base bin size (default: BASE_BIN_SIZE; None for the smallest bin size of the scales)
+        xColumn, yColumn (str): coordinate columns of the point table
+    Returns:
+        dict: name -> bin table of the scale (see binGiStar)
+    """
+    x = points[xColumn].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = points[yColumn].to_numpy(dtype=np.float64, na_value=np.nan)
+    keep = np.isfinite(x) & np.isfinite(y)
+    x, y = x[keep], y[keep]
+    if baseSize is None:
+        baseSize = min(size for size, _ in scales.values())
+    base = binPoints(x, y, baseSize)
+
+    # One grid (with its summed-area tables) per bin size
+    grids = {}
+    for size, _ in scales.values():
+        if size in grids:
+            continue
+        factor = size / baseSize
+        if abs(factor - round(factor)) <= SCALE_TOLERANCE * factor:
+            bins = coarsenBins(*base, int(round(factor)))
+        else:
+            bins = binPoints(x, y, size)
+        grids[size] = BinGrid(*bins, size)
+
+    return {name: binGiStar(grids[size], radius) for name, (size, radius) in scales.items()}
+
+# endregion
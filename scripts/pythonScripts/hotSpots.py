@@ -0,0 +1,200 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Hot Spots - KD-Tree Getis-Ord Gi* Hot Spot Analysis
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Native Getis-Ord Gi* hot spot analysis, equivalent to the arcpy.stats.HotSpots runs of part1Features.py section
+# 2.5 (FIXED_DISTANCE_BAND, EUCLIDEAN_DISTANCE, ROW standardization, collSeverityNum) on the crashes and on the
+# crashes500ftFromMajorRoads points. The neighbors within the distance band are found with a KD-tree
+# (scipy.spatial.cKDTree), and the binary weights (each point is its own neighbor in Gi*) are held as a CSR sparse
+# matrix, so the local sums of the statistic are sparse matrix-vector products. For millions of points the weights are
+# built and consumed in chunks of rows (in KD-tree leaf order, so each chunk is spatially compact) without keeping
+# the full matrix. Row standardization rescales every weight of a row by the same factor, which leaves the Gi*
+# z-scores unchanged, so the binary weights give the z-scores of the ROW runs. The output fields follow the HotSpots
+# tool (GiZScore, GiPValue, NNeighbors and Gi_Bin, with the -3..3 confidence bins of the current symbology).
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+from scipy.special import ndtr
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Gi_Bin classes: (maximum p-value, bin) from the highest confidence (99%, 95% and 90%)
+GI_BINS = [(0.01, 3), (0.05, 2), (0.10, 1)]
+
+# Output fields of the hot spot analysis (as in the HotSpots tool output)
+GI_FIELDS = ["GiZScore", "GiPValue", "NNeighbors", "Gi_Bin"]
+
+# Number of weight matrix rows per chunk
+CHUNK_ROWS = 50_000
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Spatial Weights
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def defaultDistanceBand(xy, tree=None):
+    """Default distance band of the HotSpots tool: the smallest distance that gives every point at least one neighbor
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        tree (cKDTree): prebuilt KD-tree of the points (built if None)
+    Returns:
+        float: the largest nearest neighbor distance
+    """
+    tree = cKDTree(xy) if tree is None else tree
+    distances, _ = tree.query(xy, k=2)
+    return float(distances[:, 1].max())
+
+
+def weightChunks(xy, distance, tree=None, chunkRows=CHUNK_ROWS):
+    """Rows of the binary distance band weights (self included), in chunks
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        distance (float): distance band (neighbors at a distance <= band)
+        tree (cKDTree): prebuilt KD-tree of the points (built if None)
+        chunkRows (int): number of rows per chunk
+    Yields:
+        tuple: row indexes of the chunk and their weights (CSR matrix, chunk rows x n)
+    """
+    tree = cKDTree(xy) if tree is None else tree
+    order = tree.indices
+    for start in range(0, len(order), chunkRows):
+        rows = order[start:start + chunkRows]
+        pairs = cKDTree(xy[rows]).sparse_distance_matrix(tree, distance, output_type="ndarray")
+        # The pairs include each point with itself and the coincident points (distance 0)
+        yield rows, sparse.csr_matrix((np.ones(len(pairs)), (pairs["i"], pairs["j"])), shape=(len(rows), len(xy)))
+
+
+def distanceBandWeights(xy, distance, tree=None, chunkRows=CHUNK_ROWS):
+    """Binary distance band weights of all the points as one CSR matrix (self included)
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        distance (float): distance band
+        tree (cKDTree): prebuilt KD-tree of the points (built if None)
+        chunkRows (int): number of rows per chunk of the construction
+    Returns:
+        scipy.sparse.csr_matrix: (n x n) weights
+    """
+    blocks, order = [], []
+    for rows, weights in weightChunks(xy, distance, tree, chunkRows):
+        blocks.append(weights)
+        order.append(rows)
+    weights = sparse.vstack(blocks, format="csr")
+    inverse = np.empty(len(xy), dtype=np.int64)
+    inverse[np.concatenate(order)] = np.arange(len(xy))
+    return weights[inverse]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Getis-Ord Gi*
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def giStatistics(values, localSums, weightSums, weightSquares):
+    """Gi* z-scores from the local sums of the values and of the weights
+    Args:
+        values (numpy.ndarray): values of all the points (or an (n x t) matrix of t analyses of the same points)
+        localSums (numpy.ndarray): sum of the weighted neighbor values of each point
+        weightSums (numpy.ndarray): sum of the weights of each point (a column (n x 1) for a matrix of values)
+        weightSquares (numpy.ndarray): sum of the squared weights of each point (a column for a matrix of values)
+    Returns:
+        tuple: z-scores and two-sided p-values
+    """
+    n = len(values)
+    mean = values.mean(axis=0)
+    s = np.sqrt((values * values).mean(axis=0) - mean * mean)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (localSums - mean * weightSums) / (s * np.sqrt((n * weightSquares - weightSums * weightSums) / (n - 1)))
+    return z, 2.0 * ndtr(-np.abs(z))
+
+
+def giStar(values, weights):
+    """Gi* z-scores and p-values with a weights matrix (sparse matrix-vector products)
+    Args:
+        values (numpy.ndarray): values of the points
+        weights (scipy.sparse.csr_matrix): (n x n) spatial weights (self included)
+    Returns:
+        tuple: z-scores, p-values and number of neighbors of each point
+    """
+    values = np.asarray(values, dtype=np.float64)
+    weightSums = np.asarray(weights.sum(axis=1)).ravel()
+    weightSquares = np.asarray(weights.multiply(weights).sum(axis=1)).ravel()
+    z, p = giStatistics(values, weights @ values, weightSums, weightSquares)
+    return z, p, np.diff(weights.indptr)
+
+
+def giBins(z, p, bins=GI_BINS):
+    """Gi_Bin confidence classes (-3 to 3: cold and hot spots at 99%, 95% and 90% confidence, 0 not significant)
+    Args:
+        z (numpy.ndarray): z-scores
+        p (numpy.ndarray): p-values
+        bins (list): (maximum p-value, bin) classes, from the highest confidence
+    Returns:
+        numpy.ndarray: bin of each point
+    """
+    result = np.zeros(len(z), dtype=np.int64)
+    for threshold, level in reversed(bins):
+        result[p <= threshold] = level
+    return np.where(np.isnan(z), 0, np.sign(z).astype(np.int64) * result)
+
+
+def validPoints(points, field, xColumn="pointX", yColumn="pointY"):
+    """Values of the analysis field and coordinates of a point table, and the points with a value and finite coordinates
+    Returns:
+        tuple: values (numpy.ndarray, NaN if missing), valid point mask, and (n x 2) coordinates of all the points
+    """
+    values = pd.to_numeric(points[field], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+    xy = np.column_stack([points[column].to_numpy(dtype=np.float64, na_value=np.nan) for column in (xColumn, yColumn)])
+    return values, ~np.isnan(values) & np.isfinite(xy).all(axis=1), xy
+
+
+def hotSpots(points, field, distance=None, xColumn="pointX", yColumn="pointY", chunkRows=CHUNK_ROWS, weights=None):
+    """Getis-Ord Gi* hot spot analysis of a point field with a fixed distance band (HotSpots tool equivalent)
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the analysis field
+        field (str): analysis field (e.g. collSeverityNum); points with missing values or coordinates are left out
+        distance (float): distance band (default: the smallest band that gives every point a neighbor)
+        xColumn, yColumn (str): coordinate columns of the point table
+        chunkRows (int): number of weight rows per chunk
+        weights (scipy.sparse.csr_matrix): prebuilt weights of the points with values at the distance band (the
+            neighbor search is skipped, see weightsCache.cachedWeights)
+    Returns:
+        tuple: the point table with the GiZScore, GiPValue, NNeighbors and Gi_Bin columns, and the distance band
+    """
+    values, valid, xy = validPoints(points, field, xColumn, yColumn)
+    valid = np.flatnonzero(valid)
+    xy, values = xy[valid], values[valid]
+    if weights is not None:
+        z, p, neighbors = giStar(values, weights)
+    else:
+        tree = cKDTree(xy)
+        if distance is None:
+            distance = defaultDistanceBand(xy, tree)
+
+        # Local sums of the values and of the binary weights, one chunk of weight rows at a time
+        localSums = np.empty(len(valid))
+        neighbors = np.empty(len(valid), dtype=np.int64)
+        for rows, chunk in weightChunks(xy, distance, tree, chunkRows):
+            localSums[rows] = chunk @ values
+            neighbors[rows] = np.diff(chunk.indptr)
+        z, p = giStatistics(values, localSums, neighbors.astype(np.float64), neighbors.astype(np.float64))
+
+    result = points.copy()
+    for column, data, missing in [("GiZScore", z, np.nan), ("GiPValue", p, np.nan), ("NNeighbors", neighbors, 0), ("Gi_Bin", giBins(z, p), 0)]:
+        full = np.full(len(points), missing, dtype=data.dtype)
+        full[valid] = data
+        result[column] = full
+    return result, distance
+
+# endregion
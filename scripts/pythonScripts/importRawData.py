@@ -148,3 +148,53 @@ partiesPath = os.path.join(projectPath, "RawData", "Parties.csv")
 victimsPath = os.path.join(projectPath, "RawData", "Victims.csv")
 
 
+
+
+# RAW DATA SCHEMA ---------------------------------------------------------------------------------------------------
+
+# Parse the schema.ini column definitions once and reuse them for all three raw data files (the files are read in fixed-size record batches with the schema.ini data types)
+from rawDataReader import parseSchemaIni
+
+rawSchema = parseSchemaIni()
+
+
+# CACHED RAW DATA TABLES --------------------------------------------------------------------------------------------
+
+# Load the parsed raw data tables from the columnar cache in the raw data folder (the csv files are only re-parsed when their contents or schema.ini sections change)
+from rawDataCache import loadRawTable
+
+crashes = loadRawTable(crashesPath, "crashes", schema=rawSchema)
+parties = loadRawTable(partiesPath, "parties", schema=rawSchema)
+victims = loadRawTable(victimsPath, "victims", schema=rawSchema)
+
+
+# INCREMENTAL QUARTERLY UPDATE --------------------------------------------------------------------------------------
+
+# Append the new quarter(s) of a TIMS extract, and its late-reported and revised crashes, to the raw data store (upsert by caseId) and update the coverage dates in SwitrsCoverage.json
+from incrementalUpdate import incrementalUpdate, loadStoreTable
+
+# Raw data store folder (one partition per update)
+rawStorePath = os.path.join(projectPath, "RawData", "store")
+
+# Run the incremental update when the incremental mode is enabled (the records of the new and revised cases, and the caseIds of the revised cases to retract from the derived data)
+incrementalMode = False
+if incrementalMode:
+    newRecords, revisedIds = incrementalUpdate({"crashes": crashesPath, "parties": partiesPath, "victims": victimsPath}, rawStorePath, metadataJson, schema=rawSchema)
+    crashes = loadStoreTable(rawStorePath, "crashes")
+    parties = loadStoreTable(rawStorePath, "parties")
+    victims = loadStoreTable(rawStorePath, "victims")
+
+
+# PARALLEL INGEST ---------------------------------------------------------------------------------------------------
+
+# Parse, rename and recode the crashes, parties and victims tables in separate worker processes, then merge them into the collisions table
+from parallelIngest import parallelIngest
+
+# Path to the JSON codebook used for the rename and recode stages
+cbPath = os.path.join(projectPath, "Scripts", "codebook", "cb.json")
+
+# Run the parallel ingest when the parallel mode is enabled
+parallelMode = False
+if parallelMode and __name__ == "__main__":
+    ingested = parallelIngest({"crashes": crashesPath, "parties": partiesPath, "victims": victimsPath}, cbPath)
+    crashes, parties, victims, collisions = ingested["crashes"], ingested["parties"], ingested["victims"], ingested["collisions"]
@@ -0,0 +1,225 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Incremental Autocorrelation - Global Moran's I Distance Band Search
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Incremental spatial autocorrelation search of the distance band used by the optimized hot spot analysis of
+# part1Features.py section 2.5 (OptimizedHotSpotAnalysis, with the 1000 m distance band set by hand). The global
+# Moran's I of a field is evaluated over an increasing sequence of distance bands (by default, as in the Incremental
+# Spatial Autocorrelation tool: 10 bands, starting at the smallest band that gives every point a neighbor, with the
+# average nearest neighbor distance as increment). The point pairs within the largest band are found once with a
+# KD-tree and ordered by distance ring, so each band adds the pairs of its distance ring to the running neighbor
+# counts and local sums of the previous band instead of searching the neighbors again. The peak band (the first band
+# where the z-score of Moran's I peaks) is the distance band of the optimized hot spot analysis (optimizedHotSpots).
+
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+from scipy.special import ndtr
+
+from hotSpots import CHUNK_ROWS, defaultDistanceBand, hotSpots, validPoints
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Number of distance bands of the default band sequence
+BAND_COUNT = 10
+
+# Conceptualization standardizations: ROW (weights 1/k of the k neighbors of a point) or NONE (binary weights)
+STANDARDIZATIONS = ["ROW", "NONE"]
+
+# Output fields of the band search (as in the Incremental Spatial Autocorrelation tool output)
+MORAN_FIELDS = ["Distance", "MoransI", "ExpectedI", "VarianceI", "ZScore", "PValue"]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Distance Bands
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def defaultBands(xy, tree=None, count=BAND_COUNT):
+    """Default distance bands: from the smallest band that gives every point a neighbor, in steps of the average
+    nearest neighbor distance
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        tree (cKDTree): prebuilt KD-tree of the points (built if None)
+        count (int): number of bands
+    Returns:
+        numpy.ndarray: distance bands
+    """
+    tree = cKDTree(xy) if tree is None else tree
+    distances, _ = tree.query(xy, k=2)
+    return defaultDistanceBand(xy, tree) + distances[:, 1].mean() * np.arange(count)
+
+
+def ringPairs(xy, bands, tree=None, chunkRows=CHUNK_ROWS):
+    """Point pairs (i < j) within the largest distance band, ordered by distance ring (the pairs of band k are the
+    first ends[k] pairs)
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        bands (numpy.ndarray): increasing distance bands
+        tree (cKDTree): prebuilt KD-tree of the points (built if None)
+        chunkRows (int): number of points per chunk of the neighbor search
+    Returns:
+        tuple: first points and second points of the pairs, and the number of pairs within each band
+    """
+    tree = cKDTree(xy) if tree is None else tree
+    first, second, rings = [], [], []
+    for start in range(0, len(xy), chunkRows):
+        pairs = cKDTree(xy[start:start + chunkRows]).sparse_distance_matrix(tree, bands[-1], output_type="ndarray")
+        i = pairs["i"] + start
+        keep = i < pairs["j"]
+        first.append(i[keep])
+        second.append(pairs["j"][keep])
+        rings.append(np.searchsorted(bands, pairs["v"][keep], side="left").astype(np.int16))
+    # Stable sort of the small ring numbers (radix sort) instead of a sort of the distances
+    rings = np.concatenate(rings)
+    order = np.argsort(rings, kind="stable")
+    ends = np.cumsum(np.bincount(rings, minlength=len(bands)))
+    return np.concatenate(first)[order], np.concatenate(second)[order], ends
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Moran's I
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def moransStatistics(z, crossProducts, s0, s1, s2):
+    """Global Moran's I, its expected value and variance (randomization), z-score and two-sided p-value
+    Args:
+        z (numpy.ndarray): deviations of the values from their mean
+        crossProducts (float): sum of the weighted cross products (sum of w_ij z_i z_j)
+        s0, s1, s2 (float): sums of the weights, of the squared symmetric weights and of the squared row and column sums
+    Returns:
+        tuple: Moran's I, expected I, variance of I, z-score and p-value
+    """
+    n = len(z)
+    m2 = (z * z).sum()
+    index = n / s0 * crossProducts / m2
+    expected = -1.0 / (n - 1)
+    b2 = n * (z ** 4).sum() / (m2 * m2)
+    a = n * ((n * n - 3 * n + 3) * s1 - n * s2 + 3 * s0 * s0)
+    b = b2 * ((n * n - n) * s1 - 2 * n * s2 + 6 * s0 * s0)
+    variance = (a - b) / ((n - 1) * (n - 2) * (n - 3) * s0 * s0) - expected * expected
+    zScore = (index - expected) / np.sqrt(variance)
+    return index, expected, variance, zScore, 2.0 * ndtr(-abs(zScore))
+
+
+def incrementalMoransI(values, xy, bands=None, standardization="ROW", tree=None, chunkRows=CHUNK_ROWS):
+    """Global Moran's I over a sequence of distance bands, adding the pairs of each distance ring to the previous band
+    Args:
+        values (numpy.ndarray): values of the points
+        xy (numpy.ndarray): (n x 2) point coordinates
+        bands (numpy.ndarray): increasing distance bands (default: see defaultBands)
+        standardization (str): ROW or NONE (binary weights)
+        tree (cKDTree): prebuilt KD-tree of the points (built if None)
+        chunkRows (int): number of points per chunk of the neighbor search
+    Returns:
+        pandas.DataFrame: Distance, MoransI, ExpectedI, VarianceI, ZScore and PValue of each band
+    """
+    if standardization not in STANDARDIZATIONS:
+        raise ValueError(f"Unsupported standardization {standardization}")
+    values = np.asarray(values, dtype=np.float64)
+    z = values - values.mean()
+    tree = cKDTree(xy) if tree is None else tree
+    bands = defaultBands(xy, tree) if bands is None else np.sort(np.asarray(bands, dtype=np.float64))
+    first, second, ends = ringPairs(xy, bands, tree, chunkRows)
+
+    # Running neighbor counts and neighbor sums of the deviations, updated with the pairs of each distance ring
+    n = len(z)
+    neighbors = np.zeros(n, dtype=np.int64)
+    localSums = np.zeros(n)
+    crossProducts = 0.0
+    rows = []
+    start = 0
+    for distance, end in zip(bands, ends):
+        i, j = first[start:end], second[start:end]
+        neighbors += np.bincount(i, minlength=n) + np.bincount(j, minlength=n)
+        localSums += np.bincount(i, weights=z[j], minlength=n) + np.bincount(j, weights=z[i], minlength=n)
+        crossProducts += 2.0 * (z[i] * z[j]).sum()
+        start = end
+        if standardization == "NONE":
+            # Binary symmetric weights: every pair contributes 2 to S0 and 4 to S1, and the row and column sums are k
+            s0 = float(neighbors.sum())
+            statistics = moransStatistics(z, crossProducts, s0, 2.0 * s0, 4.0 * float((neighbors * neighbors).sum()))
+        else:
+            # Row standardized weights (1/k): the weights of every point change with its neighbor count, so the
+            # symmetric weight sums are taken over all the pairs of the band
+            i, j = first[:end], second[:end]
+            inverse = np.where(neighbors > 0, 1.0 / np.maximum(neighbors, 1), 0.0)
+            s0 = float((neighbors > 0).sum())
+            s1 = float(((inverse[i] + inverse[j]) ** 2).sum())
+            columns = np.bincount(i, weights=inverse[j], minlength=n) + np.bincount(j, weights=inverse[i], minlength=n)
+            s2 = float(((np.where(neighbors > 0, 1.0, 0.0) + columns) ** 2).sum())
+            statistics = moransStatistics(z, float((z * localSums * inverse).sum()), s0, s1, s2)
+        rows.append([distance, *statistics])
+    return pd.DataFrame(rows, columns=MORAN_FIELDS)
+
+
+def peakBands(profile):
+    """First and maximum peak distances of a Moran's I band profile
+    Args:
+        profile (pandas.DataFrame): band search output (see incrementalMoransI)
+    Returns:
+        tuple: first peak distance (the first band with a z-score higher than the bands around it, or the band with the
+            highest z-score if no band peaks) and the distance of the highest z-score
+    """
+    scores = profile["ZScore"].to_numpy()
+    distances = profile["Distance"].to_numpy()
+    highest = distances[int(np.nanargmax(scores))]
+    for k in range(1, len(scores) - 1):
+        if scores[k] > scores[k - 1] and scores[k] >= scores[k + 1]:
+            return float(distances[k]), float(highest)
+    return float(highest), float(highest)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Optimized Hot Spots
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def peakDistance(points, field, bands=None, standardization="ROW", xColumn="pointX", yColumn="pointY", chunkRows=CHUNK_ROWS):
+    """Peak distance band of the spatial autocorrelation of a point field
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the analysis field
+        field (str): analysis field (points with missing values or coordinates are left out)
+        bands (numpy.ndarray): increasing distance bands (default: see defaultBands)
+        standardization (str): ROW or NONE
+        xColumn, yColumn (str): coordinate columns of the point table
+        chunkRows (int): number of points per chunk of the neighbor search
+    Returns:
+        tuple: the first peak distance and the band profile (see incrementalMoransI)
+    """
+    values, valid, xy = validPoints(points, field, xColumn, yColumn)
+    profile = incrementalMoransI(values[valid], xy[valid], bands, standardization, chunkRows=chunkRows)
+    return peakBands(profile)[0], profile
+
+
+def optimizedHotSpots(points, field, bands=None, distance=None, xColumn="pointX", yColumn="pointY", chunkRows=CHUNK_ROWS):
+    """Gi* hot spot analysis at the peak distance band of the spatial autocorrelation of the field
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the analysis field
+        field (str): analysis field
+        bands (numpy.ndarray): distance bands of the peak search (default: see defaultBands)
+        distance (float): distance band of a previous search (the search is skipped)
+        xColumn, yColumn (str): coordinate columns of the point table
+        chunkRows (int): number of points per chunk of the neighbor searches
+    Returns:
+        tuple: the hot spot table (see hotSpots.hotSpots), the distance band and the band profile (None if the distance
+            is given)
+    """
+    profile = None
+    if distance is None:
+        distance, profile = peakDistance(points, field, bands, xColumn=xColumn, yColumn=yColumn, chunkRows=chunkRows)
+    result, distance = hotSpots(points, field, distance, xColumn, yColumn, chunkRows)
+    return result, distance, profile
+
+# endregion
@@ -0,0 +1,293 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Incremental Update - Quarterly Ingestion Driven by SwitrsCoverage.json
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Incremental ingestion of a new TIMS extract. The coverage of the extract is compared with the coverage stored in
+# metadata/SwitrsCoverage.json, and only the crashes (and their parties and victims) of a trailing window before the
+# stored end date and after it are read, together with the crashes whose caseId is not in the store yet: new extracts
+# also carry late-reported crashes and revised records of the stored quarters. Every partition stores a content hash of
+# each of its cases (crash, party and victim rows), and of the re-read cases only the new ones and those whose hash
+# differs from the stored hash are kept. Each update is written as a new partition of the raw data store; when the
+# store is loaded, the records of a case are taken from the latest partition that contains it (upsert by caseId), so
+# the revised records replace the stored ones. The caseIds of the revised cases are returned with the new records, so
+# that the appenders of derived data (e.g., the rollup cubes) can retract their previous records. The coverage
+# manifest is then updated.
+
+import os, json, shutil
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from rawDataReader import SCHEMA_PATH, BATCH_SIZE, parseSchemaIni, readRawBatches
+from rawDataCache import writeCache, loadCache
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Coverage Manifest
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Date format used in the SwitrsCoverage.json manifest
+COVERAGE_DATE_FORMAT = "%m/%d/%Y"
+
+# Raw data column names used for the incremental selection
+CASE_ID = "CASE_ID"
+COLLISION_DATE = "COLLISION_DATE"
+
+# Name of the store partitions list
+STORE_PARTITIONS = "partitions.json"
+
+# Trailing window of the stored coverage that is re-read from every new extract (months before the coverage end date)
+REINGEST_MONTHS = 12
+
+# Raw data tables of an update, and the table of the case content hashes stored with them in every partition
+UPDATE_TABLES = ("crashes", "parties", "victims")
+CASE_HASHES = "caseHashes"
+CASE_HASH = "caseHash"
+
+
+def loadCoverage(metadataPath):
+    """Read the coverage start and end dates from the SwitrsCoverage.json manifest
+    Returns:
+        tuple: (metadata dictionary, coverage start datetime, coverage end datetime)
+    """
+    with open(metadataPath, "r") as f:
+        metadata = json.load(f)
+    coverage = metadata["Metadata"]["Coverage"]
+    start = datetime.strptime(coverage["StartDate"], COVERAGE_DATE_FORMAT)
+    end = datetime.strptime(coverage["EndDate"], COVERAGE_DATE_FORMAT)
+    return metadata, start, end
+
+
+def saveCoverage(metadataPath, metadata, start, end):
+    """Write the updated coverage dates (and the metadata update date) back to the SwitrsCoverage.json manifest"""
+    metadata["Metadata"]["Coverage"]["StartDate"] = start.strftime(COVERAGE_DATE_FORMAT)
+    metadata["Metadata"]["Coverage"]["EndDate"] = end.strftime(COVERAGE_DATE_FORMAT)
+    metadata["Metadata"]["Date"] = datetime.now().strftime(COVERAGE_DATE_FORMAT)
+    with open(metadataPath, "w") as f:
+        json.dump(metadata, f, indent=4)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Partitioned Raw Data Store
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def listPartitions(storeDir):
+    """Return the list of partitions in the raw data store (oldest first)"""
+    path = os.path.join(storeDir, STORE_PARTITIONS)
+    if not os.path.exists(path):
+        return []
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def appendPartition(storeDir, tables, start, end):
+    """Write the tables of a new update as a new partition of the raw data store
+    Args:
+        storeDir (str): raw data store folder
+        tables (dict): table name -> pandas.DataFrame
+        start (datetime): first collision date covered by the partition
+        end (datetime): last collision date covered by the partition
+    Returns:
+        str: the partition key
+    """
+    partitions = listPartitions(storeDir)
+    key = f"p{len(partitions):04d}-{start:%Y%m%d}-{end:%Y%m%d}"
+    for table, df in tables.items():
+        writeCache([df], storeDir, key, table)
+    partitions.append({"key": key, "start": start.strftime(COVERAGE_DATE_FORMAT), "end": end.strftime(COVERAGE_DATE_FORMAT), "tables": sorted(tables), "rows": {t: len(df) for t, df in tables.items()}})
+    with open(os.path.join(storeDir, STORE_PARTITIONS), "w") as f:
+        json.dump(partitions, f, indent=4)
+    return key
+
+
+def loadStoreTable(storeDir, table, keyColumn=CASE_ID):
+    """Load a table from the raw data store, upserting by caseId (the records of each case come from its latest partition)"""
+    frames = []
+    for i, partition in enumerate(listPartitions(storeDir)):
+        if table not in partition["tables"]:
+            continue
+        df = loadCache(storeDir, partition["key"], table)
+        if df is not None and len(df):
+            frames.append((i, df))
+    if not frames:
+        return pd.DataFrame()
+    if len(frames) == 1:
+        return frames[0][1]
+
+    # For each case, keep only the rows of the latest partition that contains it
+    combined = pd.concat([df for _, df in frames], ignore_index=True)
+    partitionIndex = np.concatenate([np.full(len(df), i) for i, df in frames])
+    latest = pd.Series(partitionIndex).groupby(combined[keyColumn].to_numpy()).transform("max").to_numpy()
+    return combined.loc[partitionIndex == latest].reset_index(drop=True)
+
+
+def storeCaseIds(storeDir, keyColumn=CASE_ID):
+    """Return the unique caseIds of the crashes in the raw data store (only the key column is read)"""
+    ids = []
+    for partition in listPartitions(storeDir):
+        if "crashes" not in partition["tables"]:
+            continue
+        df = loadCache(storeDir, partition["key"], "crashes", columns=[keyColumn])
+        if df is not None and len(df):
+            ids.append(df[keyColumn].dropna().to_numpy())
+    return pd.unique(np.concatenate(ids)) if ids else np.array([], dtype=np.int64)
+
+
+def storeCaseHashes(storeDir, keyColumn=CASE_ID):
+    """Return the content hashes of the latest records of the cases in the raw data store (caseId -> hash)"""
+    hashes = loadStoreTable(storeDir, CASE_HASHES, keyColumn)
+    if hashes.empty:
+        return pd.Series([], dtype=np.uint64)
+    return pd.Series(hashes[CASE_HASH].to_numpy(dtype=np.uint64), index=hashes[keyColumn].to_numpy())
+
+
+def caseHashes(tables, keyColumn=CASE_ID):
+    """Content hash of every case: the sum (modulo 2^64) of the row hashes of its crash, party and victim rows
+    Args:
+        tables (dict): table name -> pandas.DataFrame (UPDATE_TABLES)
+        keyColumn (str): case identifier column
+    Returns:
+        pandas.DataFrame: the caseIds (keyColumn) and their hashes (CASE_HASH), one row per case
+    """
+    keys, rowHashes = [], []
+    for i, table in enumerate(UPDATE_TABLES):
+        df = tables[table]
+        known = df[keyColumn].notna().to_numpy()
+        if not known.any():
+            continue
+        keys.append(df[keyColumn].to_numpy(dtype=np.int64, na_value=-1)[known])
+        # The row hashes of each table are scaled by a distinct odd factor (identical rows of two tables differ)
+        rowHashes.append(pd.util.hash_pandas_object(df.loc[known], index=False).to_numpy() * np.uint64(2 * i + 1))
+    if not keys:
+        return pd.DataFrame({keyColumn: np.array([], dtype=np.int64), CASE_HASH: np.array([], dtype=np.uint64)})
+    caseIndex, caseIds = pd.factorize(np.concatenate(keys))
+    hashes = np.zeros(len(caseIds), dtype=np.uint64)
+    np.add.at(hashes, caseIndex, np.concatenate(rowHashes))
+    return pd.DataFrame({keyColumn: np.asarray(caseIds, dtype=np.int64), CASE_HASH: hashes})
+
+
+def compactStore(storeDir, tables=UPDATE_TABLES + (CASE_HASHES,)):
+    """Rewrite the raw data store as a single partition (applying all the upserts)"""
+    partitions = listPartitions(storeDir)
+    if len(partitions) <= 1:
+        return
+    merged = {table: loadStoreTable(storeDir, table) for table in tables}
+    start = datetime.strptime(partitions[0]["start"], COVERAGE_DATE_FORMAT)
+    end = datetime.strptime(partitions[-1]["end"], COVERAGE_DATE_FORMAT)
+    # Write the compacted store into a new folder and swap it into place
+    tempDir = storeDir.rstrip(os.sep) + ".compact"
+    shutil.rmtree(tempDir, ignore_errors=True)
+    appendPartition(tempDir, merged, start, end)
+    shutil.rmtree(storeDir)
+    os.replace(tempDir, storeDir)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Incremental Update
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def readNewRecords(rawPaths, since, knownIds=None, schema=None, schemaPath=SCHEMA_PATH, batchSize=BATCH_SIZE):
+    """Stream a new extract and keep only the crashes after a date or not yet known, with their parties and victims
+    Args:
+        rawPaths (dict): paths to the raw csv files ('crashes', 'parties', 'victims')
+        since (datetime): keep the crashes with collision dates after this date (None keeps all)
+        knownIds (numpy.ndarray): caseIds already in the store (the other crashes are kept whatever their dates)
+        schema (dict): parsed schema.ini (optional)
+        schemaPath (str): path to the schema.ini file
+        batchSize (int): number of records per batch
+    Returns:
+        dict: table name -> pandas.DataFrame with the new records (the selected cases)
+    """
+    if schema is None:
+        schema = parseSchemaIni(schemaPath)
+
+    # Crashes: keep the records after the start of the re-read window, and the late-reported cases
+    crashBatches = []
+    for batch in readRawBatches(rawPaths["crashes"], "crashes", batchSize=batchSize, schema=schema):
+        if since is not None:
+            keep = (batch[COLLISION_DATE] > since).fillna(False).to_numpy()
+            if knownIds is not None:
+                keep = keep | ~batch[CASE_ID].isin(knownIds).to_numpy(dtype=bool, na_value=False)
+            batch = batch.loc[keep]
+        crashBatches.append(batch)
+    crashes = pd.concat(crashBatches, ignore_index=True)
+    caseIds = pd.unique(crashes[CASE_ID].dropna().to_numpy())
+
+    # Parties and victims: keep the records of the selected cases only
+    tables = {"crashes": crashes}
+    for table in ("parties", "victims"):
+        batches = [batch.loc[batch[CASE_ID].isin(caseIds).to_numpy()] for batch in readRawBatches(rawPaths[table], table, batchSize=batchSize, schema=schema)]
+        tables[table] = pd.concat(batches, ignore_index=True)
+    return tables
+
+
+def incrementalUpdate(rawPaths, storeDir, metadataPath, extractEnd=None, reingestMonths=REINGEST_MONTHS, schema=None, schemaPath=SCHEMA_PATH, batchSize=BATCH_SIZE):
+    """Append the new quarter(s) of a TIMS extract, and its late-reported and revised cases, to the raw data store and
+    update the coverage manifest
+    Args:
+        rawPaths (dict): paths to the raw csv files of the new extract ('crashes', 'parties', 'victims')
+        storeDir (str): raw data store folder
+        metadataPath (str): path to the SwitrsCoverage.json manifest
+        extractEnd (datetime): coverage end date of the new extract (e.g., the TIMS quarter end; defaults to the last collision date)
+        reingestMonths (int): trailing months of the stored coverage that are re-read (late-reported and revised crashes)
+        schema (dict): parsed schema.ini (optional)
+        schemaPath (str): path to the schema.ini file
+        batchSize (int): number of records per batch
+    Returns:
+        tuple: table name -> pandas.DataFrame with the appended records of the new and revised cases (empty dict if
+            there is nothing new), and the caseIds of the revised cases (their previous records are replaced in the
+            store, and must be retracted from any data derived from them before the appended records are added)
+    """
+    metadata, coverageStart, coverageEnd = loadCoverage(metadataPath)
+
+    # An empty store needs a full load of the extract; otherwise the trailing window and the unknown cases are read
+    if listPartitions(storeDir):
+        since = (pd.Timestamp(coverageEnd) - pd.DateOffset(months=reingestMonths)).to_pydatetime()
+        knownIds = storeCaseIds(storeDir)
+    else:
+        since, knownIds = None, np.array([], dtype=np.int64)
+    tables = readNewRecords(rawPaths, since, knownIds=knownIds if since is not None else None, schema=schema, schemaPath=schemaPath, batchSize=batchSize)
+
+    # Keep the new cases and the re-read cases whose contents differ from the stored ones
+    hashes = caseHashes(tables)
+    if since is not None:
+        stored = storeCaseHashes(storeDir)
+        caseIds, caseHash = hashes[CASE_ID].to_numpy(), hashes[CASE_HASH].to_numpy()
+        present = pd.Index(caseIds).isin(stored.index)
+        unchanged = np.zeros(len(caseIds), dtype=bool)
+        unchanged[present] = stored.loc[caseIds[present]].to_numpy() == caseHash[present]
+        hashes = hashes.loc[~unchanged].reset_index(drop=True)
+        tables = {table: df.loc[df[CASE_ID].isin(hashes[CASE_ID]).to_numpy(dtype=bool, na_value=False)].reset_index(drop=True) for table, df in tables.items()}
+    revisedIds = hashes[CASE_ID].to_numpy()[np.isin(hashes[CASE_ID].to_numpy(), knownIds)]
+    crashes = tables["crashes"]
+    if crashes.empty:
+        if since is None:
+            print("No crashes in the extract; the store is empty")
+        else:
+            print(f"No new or revised crashes after {since:%m/%d/%Y}; the store is up to date")
+        return {}, revisedIds[:0]
+
+    # Coverage of the new records
+    newStart = crashes[COLLISION_DATE].min().to_pydatetime()
+    newEnd = crashes[COLLISION_DATE].max().to_pydatetime()
+    if extractEnd is not None:
+        newEnd = max(newEnd, extractEnd)
+    key = appendPartition(storeDir, {**tables, CASE_HASHES: hashes}, newStart, newEnd)
+    print(f"Appended partition {key}: {len(crashes):,} crashes ({len(revisedIds):,} revised), {len(tables['parties']):,} parties, {len(tables['victims']):,} victims")
+
+    # Update the coverage manifest
+    if since is None:
+        saveCoverage(metadataPath, metadata, newStart, newEnd)
+    else:
+        saveCoverage(metadataPath, metadata, min(coverageStart, newStart), max(coverageEnd, newEnd))
+    return tables, revisedIds
+
+# endregion
@@ -23,6 +23,7 @@ from tqdm.notebook import trange, tqdm, tqdm_notebook
 import pandas as pd
 import numpy as np
 from arcpy import metadata as md
+from codebook import Codebook
 
 # important as it "enhances" Pandas by importing these classes (from ArcGIS API for Python)
 from arcgis.features import GeoAccessor, GeoSeriesAccessor
@@ -146,9 +147,8 @@ map = aprx.listMaps()[0]
 
 # The definitions include: Dictionary Definitions (JSON)
 
-# Load the JSON file from directory and store it in a variable
-with open(codebookPath) as json_file:
-    codebook = json.load(json_file)
+# Load the compiled codebook (cached binary form of the JSON file)
+codebook = Codebook.load(codebookPath)
 
 arcpy.env.workspace = gdbRawDataPath
 workspace = arcpy.env.workspace
@@ -207,7 +207,7 @@ print(f"Counts:\n- Crashes: {countCrashes:,}\n- Parties: {countParties:,}\n- Vic
 
 # Field aliases for the crashes geodatabase feature class
 for field in fieldsCrashes:
-    if field.name in list(codebook.keys()):
+    if field.name in codebook:
         print(f"\tMatch {codebook[field.name]['var_order']}: {field.name} ({codebook[field.name]['label']}): {codebook[field.name]['description']}")
         arcpy.management.AlterField(
             in_table = crashesFc,
@@ -221,7 +221,7 @@ print(arcpy.GetMessages())
 
 # Field aliases for the parties geodatabase feature class
 for field in fieldsParties:
-    if field.name in list(codebook.keys()):
+    if field.name in codebook:
         print(f"\tMatch {codebook[field.name]['var_order']}: {field.name} ({codebook[field.name]['label']}): {codebook[field.name]['description']}")
         arcpy.management.AlterField(
             in_table = partiesFc,
@@ -235,7 +235,7 @@ print(arcpy.GetMessages())
 
 # Field aliases for the victims geodatabase feature class
 for field in fieldsVictims:
-    if field.name in list(codebook.keys()):
+    if field.name in codebook:
         print(f"\tMatch {codebook[field.name]['var_order']}: {field.name} ({codebook[field.name]['label']}): {codebook[field.name]['description']}")
         arcpy.management.AlterField(
             in_table = victimsFc,
@@ -249,7 +249,7 @@ print(arcpy.GetMessages())
 
 # Field aliases for the collisions geodatabase feature class
 for field in fieldsCollisions:
-    if field.name in list(codebook.keys()):
+    if field.name in codebook:
         print(f"\tMatch {codebook[field.name]['var_order']}: {field.name} ({codebook[field.name]['label']}): {codebook[field.name]['description']}")
         arcpy.management.AlterField(
             in_table = collisionsFc,
@@ -263,7 +263,7 @@ print(arcpy.GetMessages())
 
 # Field aliases for the cities geodatabase feature class
 for field in fieldsCities:
-    if field.name in list(codebook.keys()):
+    if field.name in codebook:
         print(f"\tMatch {codebook[field.name]['var_order']}: {field.name} ({codebook[field.name]['label']}): {codebook[field.name]['description']}")
         arcpy.management.AlterField(
             in_table = citiesFc,
@@ -277,7 +277,7 @@ print(arcpy.GetMessages())
 
 # Field aliases for the roads geodatabase feature class
 for field in fieldsRoads:
-    if field.name in list(codebook.keys()):
+    if field.name in codebook:
         print(f"\tMatch {codebook[field.name]['var_order']}: {field.name} ({codebook[field.name]['label']}): {codebook[field.name]['description']}")
         arcpy.management.AlterField(
             in_table = roadsFc,
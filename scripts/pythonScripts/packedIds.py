@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Packed Identifiers - Integer-Packed CID, PID and VID Keys
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Packed 64-bit identifiers for the crashes (cid), parties (pid) and victims (vid). The case identifier, the party
+# number and the victim number are packed into a single int64 value (caseId << 16 | partyNumber << 8 | victimNumber),
+# so the key columns are integers (for joins and lookups) instead of concatenated strings. The formatter reproduces the
+# string identifiers of part1ImportRawData.R section 4.4 ("caseId", "caseId-partyNumber", "caseId-partyNumber-victimNumber")
+# for display and export, and the parser converts them back.
+
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Bit Layout
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Number of bits for the party and victim numbers (0 means no party or no victim)
+PARTY_BITS = 8
+VICTIM_BITS = 8
+
+# Bit shifts of the packed fields
+VICTIM_SHIFT = 0
+PARTY_SHIFT = VICTIM_BITS
+CASE_SHIFT = PARTY_BITS + VICTIM_BITS
+
+# Largest values of the packed fields (the case identifier keeps the int64 sign bit clear)
+MAX_PARTY = (1 << PARTY_BITS) - 1
+MAX_VICTIM = (1 << VICTIM_BITS) - 1
+MAX_CASE = (1 << (63 - CASE_SHIFT)) - 1
+
+# Data type of the packed identifier columns
+ID_DTYPE = "Int64"
+
+# Identifier levels and their packed fields
+ID_LEVELS = {
+    "cid": ("caseId",),
+    "pid": ("caseId", "partyNumber"),
+    "vid": ("caseId", "partyNumber", "victimNumber"),
+}
+
+# Identifier columns added to each table
+TABLE_IDS = {
+    "crashes": ["cid"],
+    "parties": ["cid", "pid"],
+    "victims": ["cid", "pid", "vid"],
+    "collisions": ["cid", "pid", "vid"],
+}
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Packing
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _field(values, maxValue, name):
+    """Return an identifier field as int64 with its missing mask, checking its range"""
+    series = pd.Series(pd.to_numeric(pd.Series(values), errors="coerce"))
+    missing = series.isna().to_numpy()
+    array = series.fillna(0).to_numpy(dtype=np.int64)
+    if ((array < 0) | (array > maxValue))[~missing].any():
+        raise ValueError(f"{name} values must be between 0 and {maxValue:,} to be packed")
+    return array, missing
+
+
+def packIds(caseId, partyNumber=None, victimNumber=None):
+    """Pack the case identifier, party number and victim number into 64-bit identifiers
+    Args:
+        caseId (array-like): case identifiers
+        partyNumber (array-like): party numbers (None for crash identifiers)
+        victimNumber (array-like): victim numbers (None for crash and party identifiers)
+    Returns:
+        pandas.arrays.IntegerArray: packed identifiers (missing if any of the given fields is missing)
+    """
+    case, missing = _field(caseId, MAX_CASE, "caseId")
+    packed = case << CASE_SHIFT
+    if partyNumber is not None:
+        party, partyMissing = _field(partyNumber, MAX_PARTY, "partyNumber")
+        packed |= party << PARTY_SHIFT
+        missing = missing | partyMissing
+    if victimNumber is not None:
+        victim, victimMissing = _field(victimNumber, MAX_VICTIM, "victimNumber")
+        packed |= victim << VICTIM_SHIFT
+        missing = missing | victimMissing
+    return pd.arrays.IntegerArray(np.where(missing, 0, packed), missing)
+
+
+def unpackIds(packed):
+    """Unpack 64-bit identifiers into their case identifier, party number and victim number arrays"""
+    series = pd.Series(packed, dtype=ID_DTYPE)
+    missing = series.isna().to_numpy()
+    values = series.fillna(0).to_numpy(dtype=np.int64)
+    fields = (
+        values >> CASE_SHIFT,
+        (values >> PARTY_SHIFT) & MAX_PARTY,
+        (values >> VICTIM_SHIFT) & MAX_VICTIM,
+    )
+    return tuple(pd.arrays.IntegerArray(f, missing.copy()) for f in fields)
+
+
+def addPackedIds(df, table):
+    """Add the packed cid, pid and vid columns of a table after its caseId column (part1ImportRawData.R section 4.4)"""
+    ids = {}
+    for level in TABLE_IDS[table]:
+        fields = ID_LEVELS[level]
+        if all(f in df.columns for f in fields):
+            ids[level] = packIds(*(df[f] for f in fields))
+    df = df.drop(columns=[c for c in ids if c in df.columns])
+    position = df.columns.get_loc("caseId") + 1 if "caseId" in df.columns else 0
+    for offset, (level, values) in enumerate(ids.items()):
+        df.insert(position + offset, level, values)
+    return df
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Formatting
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def formatIds(packed, level):
+    """Format packed identifiers as the display and export strings ('cid', 'pid' or 'vid' level)"""
+    fields = unpackIds(packed)[:len(ID_LEVELS[level])]
+    result = pd.Series(fields[0], copy=False).astype("string")
+    for field in fields[1:]:
+        result = result + "-" + pd.Series(field, copy=False).astype("string")
+    return result
+
+
+def parseIds(strings, level):
+    """Parse identifier strings ('caseId', 'caseId-partyNumber', 'caseId-partyNumber-victimNumber') into packed identifiers"""
+    count = len(ID_LEVELS[level])
+    parts = pd.Series(strings, dtype="string").str.split("-", n=count - 1, expand=True)
+    if parts.shape[1] < count:
+        raise ValueError(f"Identifier strings do not have the {count} fields of the '{level}' level")
+    return packIds(*(parts[i] for i in range(count)))
+
+# endregion
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Parallel Ingest - Process-Pool Load and Transform of the Raw Tables
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Ingest driver for the raw SWITRS data. The crashes, parties and victims tables are independent until they are merged
+# (section 14 of part1ImportRawData.R), so the parse, rename and recode stages run for each table in its own worker
+# process. The workers return their columns through shared memory blocks (only the small column descriptors are
+# pickled), and a single merge stage builds the collisions table in the main process.
+#
+# On Windows (spawn start method) the driver must be called from an importable module or under a
+# `if __name__ == "__main__":` guard.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory, resource_tracker
+import numpy as np
+import pandas as pd
+
+from rawDataReader import SCHEMA_PATH, BATCH_SIZE, parseSchemaIni, readRawBatches
+from rawDataCache import encodeColumn, decodeColumn
+from codebook import Codebook
+from codebookRecode import RecodeEngine
+from datetimeFeatures import addDatetimeColumns
+from collisionsMerge import mergeCollisions
+from packedIds import TABLE_IDS, addPackedIds
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Transform Stages
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Codebook membership flags for each of the raw data tables
+TABLE_FLAGS = {
+    "crashes": "inCrashes",
+    "parties": "inParties",
+    "victims": "inVictims",
+}
+
+
+def loadCodebook(codebookPath):
+    """Load the compiled codebook (cb.json)"""
+    return Codebook.load(codebookPath)
+
+
+def renameColumns(df, codebook, table):
+    """Rename the raw columns to their codebook names, dropping the deprecated and unused columns (part1ImportRawData.R section 4.1)"""
+    names = codebook.rawNames[table]
+    keep = [c for c in df.columns if c in names]
+    return df[keep].rename(columns=names)
+
+
+def transformTable(table, csvPath, codebook, schema, batchSize=BATCH_SIZE):
+    """Parse, rename and recode a raw data table batch by batch (adding the packed identifiers, and the date and time columns to the crashes)"""
+    engine = RecodeEngine(codebook)
+    batches = []
+    for batch in readRawBatches(csvPath, table, batchSize=batchSize, schema=schema, codebook=codebook):
+        batch = renameColumns(batch, codebook, table)
+        # Packed cid, pid and vid identifiers (part1ImportRawData.R section 4.4)
+        batch = addPackedIds(batch, table)
+        batch = engine.recode(batch, table)
+        # Date and time columns of the crashes (part1ImportRawData.R sections 6.2-6.5)
+        if table == "crashes" and "collDate" in batch.columns and "collTime" in batch.columns:
+            batch = addDatetimeColumns(batch)
+        batches.append(batch)
+    return pd.concat(batches, ignore_index=True)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Shared Memory Transfer
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Shared memory blocks created by the current worker process. The handles are kept open until the next task, because
+# on Windows a block is released as soon as its last handle is closed (before the main process can attach to it).
+_workerBlocks = []
+
+
+def toSharedMemory(df):
+    """Copy the columns of a data frame into shared memory blocks
+    Returns:
+        dict: picklable descriptor of the data frame (block names, array dtypes and shapes per column)
+    """
+    descriptor = {"rows": len(df), "columns": []}
+    for name in df.columns:
+        kind, arrays = encodeColumn(df[name])
+        parts = {}
+        for part, array in arrays.items():
+            # Small lookup arrays (text categories) are pickled with the descriptor
+            if part == "categories":
+                parts[part] = {"inline": array}
+                continue
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+            # The main process owns (and unlinks) the block, so the worker must not release it at exit
+            if os.name == "posix":
+                resource_tracker.unregister(block._name, "shared_memory")
+            _workerBlocks.append(block)
+            parts[part] = {"block": block.name, "dtype": array.dtype.str, "shape": array.shape}
+        descriptor["columns"].append({"name": name, "kind": kind, "dtype": str(df[name].dtype), "parts": parts})
+    return descriptor
+
+
+def fromSharedMemory(descriptor):
+    """Rebuild a data frame from its shared memory descriptor, copying the data out and releasing the blocks"""
+    columns = {}
+    for col in descriptor["columns"]:
+        arrays = {}
+        for part, spec in col["parts"].items():
+            if "inline" in spec:
+                arrays[part] = spec["inline"]
+                continue
+            block = shared_memory.SharedMemory(name=spec["block"])
+            try:
+                arrays[part] = np.ndarray(spec["shape"], dtype=np.dtype(spec["dtype"]), buffer=block.buf).copy()
+            finally:
+                block.close()
+                block.unlink()
+        columns[col["name"]] = decodeColumn(col["kind"], arrays, col["dtype"], asCategorical=False)
+    return pd.DataFrame(columns)
+
+
+def _releaseWorkerBlocks():
+    """Close the shared memory handles of the previous task in this worker process"""
+    while _workerBlocks:
+        _workerBlocks.pop().close()
+
+
+def _transformWorker(table, csvPath, codebookPath, schemaPath, batchSize):
+    """Worker process entry point: transform one raw data table and return its shared memory descriptor"""
+    _releaseWorkerBlocks()
+    codebook = loadCodebook(codebookPath)
+    schema = parseSchemaIni(schemaPath)
+    df = transformTable(table, csvPath, codebook, schema, batchSize=batchSize)
+    return toSharedMemory(df)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Ingest Driver
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def mergeTables(crashes, parties, victims):
+    """Merge the crashes, parties and victims tables into the collisions table (part1ImportRawData.R section 14.2)"""
+    # The packed identifiers are rebuilt from the merged keys instead of being gathered from each table
+    ids = TABLE_IDS["collisions"]
+    collisions = mergeCollisions(*(df.drop(columns=[c for c in ids if c in df.columns]) for df in (crashes, parties, victims)))
+    return addPackedIds(collisions, "collisions")
+
+
+def parallelIngest(rawPaths, codebookPath, schemaPath=SCHEMA_PATH, batchSize=BATCH_SIZE, maxWorkers=None):
+    """Load and transform the three raw data tables in parallel worker processes and merge them
+    Args:
+        rawPaths (dict): paths to the raw csv files ('crashes', 'parties', 'victims')
+        codebookPath (str): path to the JSON codebook (cb.json)
+        schemaPath (str): path to the schema.ini file
+        batchSize (int): number of records per batch
+        maxWorkers (int): number of worker processes (defaults to one per table)
+    Returns:
+        dict: table name -> pandas.DataFrame ('crashes', 'parties', 'victims', 'collisions')
+    """
+    tables = list(TABLE_FLAGS)
+    if maxWorkers is None:
+        maxWorkers = min(len(tables), os.cpu_count() or 1)
+
+    # Parse, rename and recode each table in its own worker process
+    results = {}
+    with ProcessPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = {table: executor.submit(_transformWorker, table, rawPaths[table], codebookPath, schemaPath, batchSize) for table in tables}
+        # Attach to the shared memory blocks while the workers are still alive
+        for table, future in futures.items():
+            results[table] = fromSharedMemory(future.result())
+            print(f"Transformed {table}: {len(results[table]):,} rows")
+
+    # Single merge stage in the main process
+    results["collisions"] = mergeTables(results["crashes"], results["parties"], results["victims"])
+    print(f"Merged collisions: {len(results['collisions']):,} rows")
+    return results
+
+# endregion
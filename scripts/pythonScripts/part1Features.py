@@ -26,6 +26,8 @@ import os, sys, json, math
 from datetime import date, time, datetime, timedelta, tzinfo, timezone
 import arcpy, arcgis, pytz
 from arcpy import metadata as md
+from codebook import Codebook
+from derivedFields import ArcpyWriter, deriveFields
 
 # important as it "enhances" Pandas by importing these classes (from ArcGIS API for Python)
 from arcgis.features import GeoAccessor, GeoSeriesAccessor
@@ -148,9 +150,8 @@ mdDates = (
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 print("- Codebook")
 
-# Load the JSON file from directory and store it in a variable
-with open(codebookPath) as jsonFile:
-    codebook = json.load(jsonFile)
+# Load the compiled codebook (cached binary form of the JSON file)
+codebook = Codebook.load(codebookPath)
 
 # endregion
 
@@ -425,7 +426,7 @@ print(f"Collisions: {arcpy.GetMessages()}")
 
 # Collisions field aliases
 for f in collisionsFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=collisions, field=f, new_field_alias=codebook[f]["label"]
@@ -451,7 +452,7 @@ print(f"Crashes: {arcpy.GetMessages()}")
 
 # Crashes field aliases
 for f in crashesFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=crashes, field=f, new_field_alias=codebook[f]["label"]
@@ -477,7 +478,7 @@ print(f"Parties: {arcpy.GetMessages()}")
 
 # Parties field aliases
 for f in partiesFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=parties, field=f, new_field_alias=codebook[f]["label"]
@@ -504,7 +505,7 @@ print(f"Victims: {arcpy.GetMessages()}")
 
 # Victims field aliases
 for f in victimsFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=victims, field=f, new_field_alias=codebook[f]["label"]
@@ -588,7 +589,7 @@ print(f"Roads: {arcpy.GetMessages()}")
 
 # Roads field aliases
 for f in roadsFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=roads, field=f, new_field_alias=codebook[f]["label"]
@@ -613,7 +614,7 @@ print(f"USC 2020 Census Blocks: {arcpy.GetMessages()}")
 # Adding field aliases to the census blocks feature class
 # Census Blocks field aliases
 for f in blocksFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=blocks, field=f, new_field_alias=codebook[f]["label"]
@@ -638,7 +639,7 @@ print(f"Cities: {arcpy.GetMessages()}")
 # Adding field aliases to the cities feature class
 # Cities field aliases
 for f in citiesFields:
-    if f in list(codebook.keys()):
+    if f in codebook:
         print(f"\tMatch {codebook[f]['varOrder']}: {f} ({codebook[f]['label']})")
         arcpy.management.AlterField(
             in_table=cities, field=f, new_field_alias=codebook[f]["label"]
@@ -1200,25 +1201,8 @@ print("- Crashes (Collision Severity) Exploratory Regression")
 
 # Generate a collision severity binary indicator to crashes dataset
 
-# Add collision severity binary indicator to crashes
-arcpy.management.CalculateField(
-    in_table=crashes,
-    field="severityBin",
-    expression="sevbin(!collSeverityBin!)",
-    expression_type="PYTHON3",
-    code_block="""def sevbin(x):
-    if x == "Severe or fatal":
-        return 1
-    elif x == "None, minor or pain":
-        return 0""",
-    field_type="SHORT",
-    enforce_domains="NO_ENFORCE_DOMAINS",
-)
-
-# Add a field alias for the collision severity binary indicator
-arcpy.management.AlterField(
-    in_table=crashes, field="severityBin", new_field_alias="Severity Binary"
-)
+# Add collision severity binary indicator to crashes (derivedFields.json rules, with the Severity Binary alias)
+deriveFields(ArcpyWriter(crashes), fields=["severityBin"])
 
 # Perform exploratory regression to predict the binary severity bin
 arcpy.stats.ExploratoryRegression(
@@ -25,6 +25,7 @@ print("\n1.1. Referencing Libraries and Initialization")
 import os, json, pytz, math, arcpy, arcgis
 from datetime import date, time, datetime, timedelta, tzinfo, timezone
 from arcpy import metadata as md
+from codebook import Codebook
 
 # important as it "enhances" Pandas by importing these classes (from ArcGIS API for Python)
 from arcgis.features import GeoAccessor, GeoSeriesAccessor
@@ -162,9 +163,8 @@ mdDates = (
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 print("- Codebook")
 
-# Load the JSON file from directory and store it in a variable
-with open(codebookPath) as jsonFile:
-    codebook = json.load(jsonFile)
+# Load the compiled codebook (cached binary form of the JSON file)
+codebook = Codebook.load(codebookPath)
 
 # endregion
 
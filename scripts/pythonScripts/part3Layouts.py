@@ -26,6 +26,7 @@ print("\n1.1. Referencing Libraries and Initialization")
 import os, json, pytz, math, arcpy, arcgis
 from datetime import date, time, datetime, timedelta, tzinfo, timezone
 from arcpy import metadata as md
+from codebook import Codebook
 import numpy as np
 
 # important as it "enhances" Pandas by importing these classes (from ArcGIS API for Python)
@@ -168,9 +169,8 @@ mdDates = (
 #~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
 print("- Codebook")
 
-# Load the JSON file from directory and store it in a variable
-with open(codebookPath) as json_file:
-    codebook = json.load(json_file)
+# Load the compiled codebook (cached binary form of the JSON file)
+codebook = Codebook.load(codebookPath)
 
 # endregion
 
@@ -26,6 +26,7 @@ print("\n1.1. Referencing Libraries and Initialization")
 import os, json, pytz, math, arcpy, arcgis
 from datetime import date, time, datetime, timedelta, tzinfo, timezone
 from arcpy import metadata as md
+from codebook import Codebook
 from dotenv import load_dotenv
 
 # important as it "enhances" Pandas by importing these classes (from ArcGIS API for Python)
@@ -179,9 +180,8 @@ mdDates = (
 # <h3 style="font-weight:bold; color:lime; padding-left: 50px">Codebook</h3>
 
 # %%
-# Load the JSON file from directory and store it in a variable
-with open(codebookPath) as jsonFile:
-    codebook = json.load(jsonFile)
+# Load the compiled codebook (cached binary form of the JSON file)
+codebook = Codebook.load(codebookPath)
 
 # %% [markdown]
 # <h2 style="font-weight:bold; color:dodgerblue; border-bottom: 1px solid dodgerblue; padding-left: 25px">1.3. ArcGIS Pro Workspace</h2>
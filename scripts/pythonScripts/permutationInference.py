@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Permutation Inference - Pseudo P-Values and FDR Correction of Local Statistics
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Conditional permutation inference for the local Getis-Ord Gi* and the local Anselin Moran's I of a point field, with
+# the Benjamini-Hochberg false discovery rate correction that the hot spot calls of part1Features.py leave out
+# (NO_FDR). In each permutation the value of a point is held fixed and its k - 1 neighbors (binary distance band
+# weights, self included, see hotSpots.py) are replaced by k - 1 other points drawn at random. As in the PySAL
+# conditional randomization, the draws of a permutation are shared by all the points: one random sequence of points
+# per permutation, of which a point with k neighbors takes the first k - 1 (skipping itself), so the random neighbor
+# sums of all the points are lookups in the cumulative sums of the sequence. The same sums give the permutation
+# statistics of both Gi* (the local sum) and local Moran's I (the sign of the deviation times the neighbor sum).
+# Permutations run in blocks in worker processes, and every block has its own seed (spawned from the seed of the
+# run), so the pseudo p-values do not depend on the number of workers. The FDR pass sorts the p-values once, and the
+# output has both the uncorrected and the corrected classes.
+#
+# On Windows (spawn start method) the parallel runs must be called from an importable module or under a
+# `if __name__ == "__main__":` guard.
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from scipy.spatial import cKDTree
+
+from hotSpots import CHUNK_ROWS, GI_BINS, defaultDistanceBand, distanceBandWeights, giBins, giStatistics, validPoints
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Number of permutations (as in the Cluster and Outlier Analysis tool) and number of permutations per worker task
+PERMUTATIONS = 499
+PERMUTATION_BLOCK = 50
+
+# Default seed of the permutations
+PERMUTATION_SEED = 20261017
+
+# Significance level of the cluster and outlier types
+COTYPE_ALPHA = 0.05
+
+# Output fields of the inference (Gi* and local Moran's I, uncorrected and FDR corrected classes)
+INFERENCE_FIELDS = ["GiZScore", "GiPValue", "NNeighbors", "Gi_Bin", "Gi_Bin_FDR", "LMiIndex", "LMiPValue", "COType", "COType_FDR"]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region False Discovery Rate
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def fdrThreshold(p, alpha):
+    """Benjamini-Hochberg p-value threshold: the largest p-value p(k) with p(k) <= k / n * alpha
+    Args:
+        p (numpy.ndarray): p-values (missing values are left out)
+        alpha (float): false discovery rate
+    Returns:
+        float: the threshold (-1 if no p-value passes)
+    """
+    p = np.sort(p[~np.isnan(p)])
+    passing = np.flatnonzero(p <= np.arange(1, len(p) + 1) / len(p) * alpha)
+    return float(p[passing[-1]]) if len(passing) else -1.0
+
+
+def fdrBins(z, p, bins=GI_BINS):
+    """Gi_Bin confidence classes with the FDR corrected thresholds of each confidence level (see hotSpots.giBins)"""
+    return giBins(z, p, [(fdrThreshold(p, alpha), level) for alpha, level in bins])
+
+
+def clusterTypes(index, deviations, p, threshold=COTYPE_ALPHA):
+    """Cluster and outlier types (HH, LL, HL, LH, or empty if not significant) of the local Moran's I
+    Args:
+        index (numpy.ndarray): local Moran's I
+        deviations (numpy.ndarray): deviations of the values from their mean
+        p (numpy.ndarray): p-values
+        threshold (float): largest significant p-value
+    Returns:
+        numpy.ndarray: type of each point
+    """
+    types = np.where(index > 0, np.where(deviations > 0, "HH", "LL"), np.where(deviations > 0, "HL", "LH"))
+    return np.where(p <= threshold, types, "").astype(object)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Conditional Permutations
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Arrays of the permutation workers (set by the pool initializer, or directly for serial runs)
+_workerArrays = {}
+
+
+def _initPermutations(values, draws, observed, signs):
+    """Worker process initializer: keep the arrays of the permutations"""
+    _workerArrays.update(values=values, draws=draws, observed=observed, signs=signs)
+
+
+def permutationBlock(seed, count):
+    """Run a block of conditional permutations
+    Args:
+        seed (numpy.random.SeedSequence): seed of the block
+        count (int): number of permutations
+    Returns:
+        tuple: for each point, the number of permutations with a neighbor sum at least the observed sum (Gi*), and
+            with a signed neighbor sum at least the observed signed sum (local Moran's I)
+    """
+    values, draws, observed, signs = (_workerArrays[name] for name in ["values", "draws", "observed", "signs"])
+    n, longest = len(values), int(draws.max())
+    rng = np.random.default_rng(seed)
+    points = np.arange(n)
+    position = np.full(n, longest + 1, dtype=np.int64)
+    giLarger = np.zeros(n, dtype=np.int64)
+    moranLarger = np.zeros(n, dtype=np.int64)
+    for _ in range(count):
+        # One random sequence of longest + 1 points; a point takes the first k - 1, or the first k without itself
+        sequence = rng.choice(n, size=min(longest + 1, n), replace=False)
+        sums = np.zeros(len(sequence) + 1)
+        np.cumsum(values[sequence], out=sums[1:])
+        position[sequence] = np.arange(len(sequence))
+        drawn = position[points] < draws
+        simulated = np.where(drawn, sums[np.minimum(draws + 1, len(sequence))] - values, sums[draws])
+        position[sequence] = longest + 1
+        giLarger += simulated >= observed
+        moranLarger += signs * simulated >= signs * observed
+    return giLarger, moranLarger
+
+
+def permutationCounts(values, draws, observed, signs, permutations=PERMUTATIONS, seed=PERMUTATION_SEED, maxWorkers=None):
+    """Run the conditional permutations in blocks (in worker processes if maxWorkers > 1)
+    Args:
+        values (numpy.ndarray): values of the points
+        draws (numpy.ndarray): number of random neighbors of each point (neighbors without itself)
+        observed (numpy.ndarray): observed neighbor sums (without the point itself)
+        signs (numpy.ndarray): signs of the deviations of the values from their mean
+        permutations (int): number of permutations
+        seed (int): seed of the run (each block gets a spawned seed)
+        maxWorkers (int): number of worker processes (defaults to one per CPU; 1 runs serially)
+    Returns:
+        tuple: the Gi* and local Moran's I counts of permutations at least as extreme as observed (see permutationBlock)
+    """
+    counts = [min(PERMUTATION_BLOCK, permutations - start) for start in range(0, permutations, PERMUTATION_BLOCK)]
+    seeds = np.random.SeedSequence(seed).spawn(len(counts))
+    if maxWorkers is None:
+        maxWorkers = min(len(counts), os.cpu_count() or 1)
+    if maxWorkers <= 1:
+        _initPermutations(values, draws, observed, signs)
+        results = [permutationBlock(blockSeed, count) for blockSeed, count in zip(seeds, counts)]
+        _workerArrays.clear()
+    else:
+        with ProcessPoolExecutor(max_workers=maxWorkers, initializer=_initPermutations, initargs=(values, draws, observed, signs)) as executor:
+            results = list(executor.map(permutationBlock, seeds, counts))
+    return sum(result[0] for result in results), sum(result[1] for result in results)
+
+
+def pseudoPValues(larger, permutations):
+    """Folded pseudo p-values: (min(larger, permutations - larger) + 1) / (permutations + 1)"""
+    return (np.minimum(larger, permutations - larger) + 1.0) / (permutations + 1.0)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Local Statistics Inference
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def localInference(values, weights, permutations=PERMUTATIONS, seed=PERMUTATION_SEED, maxWorkers=None):
+    """Gi* and local Moran's I with conditional permutation pseudo p-values and FDR corrected classes
+    Args:
+        values (numpy.ndarray): values of the points
+        weights (scipy.sparse.csr_matrix): (n x n) binary distance band weights (self included)
+        permutations (int): number of permutations
+        seed (int): seed of the permutations
+        maxWorkers (int): number of worker processes
+    Returns:
+        dict: output field -> values of the points (see INFERENCE_FIELDS; the p-values are the pseudo p-values)
+    """
+    values = np.asarray(values, dtype=np.float64)
+    n = len(values)
+    neighbors = np.diff(weights.indptr)
+    localSums = weights @ values
+    deviations = values - values.mean()
+
+    # Gi* z-scores, and local Moran's I over the neighbors without the point itself (row standardized weights)
+    z, _ = giStatistics(values, localSums, neighbors.astype(np.float64), neighbors.astype(np.float64))
+    draws = neighbors - 1
+    observed = localSums - values
+    with np.errstate(divide="ignore", invalid="ignore"):
+        lag = np.where(draws > 0, (observed - draws * values.mean()) / draws, 0.0)
+    index = (n - 1) * deviations * lag / (deviations * deviations).sum()
+
+    # Pseudo p-values (points without neighbors, and deviations of zero for Moran's I, are not significant)
+    signs = np.sign(deviations)
+    giLarger, moranLarger = permutationCounts(values, draws, observed, signs, permutations, seed, maxWorkers)
+    giP = np.where(draws > 0, pseudoPValues(giLarger, permutations), 1.0)
+    moranP = np.where((draws > 0) & (signs != 0), pseudoPValues(moranLarger, permutations), 1.0)
+    return {
+        "GiZScore": z, "GiPValue": giP, "NNeighbors": neighbors, "Gi_Bin": giBins(z, giP), "Gi_Bin_FDR": fdrBins(z, giP),
+        "LMiIndex": index, "LMiPValue": moranP, "COType": clusterTypes(index, deviations, moranP),
+        "COType_FDR": clusterTypes(index, deviations, moranP, fdrThreshold(moranP, COTYPE_ALPHA)),
+    }
+
+
+def hotSpotInference(points, field, distance=None, weights=None, permutations=PERMUTATIONS, seed=PERMUTATION_SEED, maxWorkers=None, xColumn="pointX", yColumn="pointY", chunkRows=CHUNK_ROWS):
+    """Permutation inference of the local Gi* and Moran's I of a point field with a fixed distance band
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the analysis field
+        field (str): analysis field (points with missing values or coordinates are left out)
+        distance (float): distance band (default: the smallest band that gives every point a neighbor)
+        weights (scipy.sparse.csr_matrix): prebuilt binary weights of the points with values (see weightsCache)
+        permutations (int): number of permutations
+        seed (int): seed of the permutations
+        maxWorkers (int): number of worker processes
+        xColumn, yColumn (str): coordinate columns of the point table
+        chunkRows (int): number of rows per chunk of the neighbor search
+    Returns:
+        tuple: the point table with the inference fields (see INFERENCE_FIELDS) and the distance band
+    """
+    values, valid, xy = validPoints(points, field, xColumn, yColumn)
+    valid = np.flatnonzero(valid)
+    if weights is None:
+        xy = xy[valid]
+        tree = cKDTree(xy)
+        if distance is None:
+            distance = defaultDistanceBand(xy, tree)
+        weights = distanceBandWeights(xy, distance, tree, chunkRows)
+    fields = localInference(values[valid], weights, permutations, seed, maxWorkers)
+
+    result = points.copy()
+    for column, data in fields.items():
+        missing = "" if data.dtype == object else (np.nan if data.dtype.kind == "f" else 0)
+        full = np.full(len(points), missing, dtype=data.dtype)
+        full[valid] = data
+        result[column] = full
+    return result, distance
+
+# endregion
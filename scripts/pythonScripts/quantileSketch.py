@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Quantile Sketch - Mergeable Quantile Sketches for the fMedian Aggregates
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Mergeable quantile sketches for the median time series aggregates (tsAggr fMedian: partyAge, victimAge). Each cell
+# (e.g. a day of the rollup cube) holds a logarithmic bucket histogram of its values (DDSketch layout): a value x > 0
+# falls in bucket ceil(log(x) / log(gamma)), with gamma = (1 + accuracy) / (1 - accuracy), so any quantile estimated
+# from the buckets is within the relative accuracy of the true value. Merging cells is a sum of their bucket counts,
+# so the weekly, monthly and yearly medians are derived from the daily cells with the same error bound. The cells of
+# a sketch share one dense (cells x buckets) count matrix, and all the operations are vectorized over the cells.
+
+import numpy as np
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Default relative accuracy of the quantile estimates (1%)
+SKETCH_ACCURACY = 0.01
+
+# Values below this threshold are counted in the zero bucket
+SKETCH_MIN_VALUE = 1e-9
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Quantile Sketch
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class QuantileSketch:
+    """Logarithmic bucket quantile sketches of a set of cells, with a shared (cells x buckets) count matrix
+    Args:
+        counts (numpy.ndarray): bucket counts (cells x buckets) for the buckets minKey, minKey + 1, ...
+        zeros (numpy.ndarray): number of zero (or near zero) values of each cell
+        minKey (int): bucket key of the first column of the count matrix
+        accuracy (float): relative accuracy of the quantile estimates
+    """
+
+    def __init__(self, counts, zeros, minKey=0, accuracy=SKETCH_ACCURACY):
+        self.counts = counts
+        self.zeros = zeros
+        self.minKey = int(minKey)
+        self.accuracy = accuracy
+        self.gamma = (1 + accuracy) / (1 - accuracy)
+
+    @property
+    def cells(self):
+        """Number of cells of the sketch"""
+        return len(self.zeros)
+
+    @classmethod
+    def fromSegments(cls, values, starts, accuracy=SKETCH_ACCURACY):
+        """Build the sketches of the segments of a sorted float array (missing values are not counted)
+        Args:
+            values (numpy.ndarray): float64 values sorted by cell
+            starts (numpy.ndarray): start positions of the cells
+            accuracy (float): relative accuracy of the quantile estimates
+        Returns:
+            QuantileSketch: one sketch per segment
+        """
+        if np.any(values < 0):
+            raise ValueError("Quantile sketches only support non-negative values")
+        lengths = np.diff(np.append(starts, len(values)))
+        cellIndex = np.repeat(np.arange(len(starts)), lengths)
+        valid = ~np.isnan(values)
+        positive = valid & (values >= SKETCH_MIN_VALUE)
+        zeros = np.bincount(cellIndex[valid & ~positive], minlength=len(starts)).astype(np.int64)
+        gamma = (1 + accuracy) / (1 - accuracy)
+        keys = np.ceil(np.log(values[positive]) / np.log(gamma)).astype(np.int64)
+        if len(keys) == 0:
+            return cls(np.zeros((len(starts), 0), dtype=np.int64), zeros, 0, accuracy)
+        minKey = int(keys.min())
+        width = int(keys.max()) - minKey + 1
+        flat = np.bincount(cellIndex[positive] * width + (keys - minKey), minlength=len(starts) * width)
+        return cls(flat.reshape((len(starts), width)).astype(np.int64), zeros, minKey, accuracy)
+
+    @classmethod
+    def empty(cls, cells, accuracy=SKETCH_ACCURACY):
+        """Sketches of cells without observations"""
+        return cls(np.zeros((cells, 0), dtype=np.int64), np.zeros(cells, dtype=np.int64), 0, accuracy)
+
+    def _aligned(self, minKey, maxKey):
+        """Count matrix expanded to the bucket keys minKey..maxKey"""
+        counts = np.zeros((self.cells, maxKey - minKey + 1), dtype=np.int64)
+        if self.counts.shape[1]:
+            offset = self.minKey - minKey
+            counts[:, offset:offset + self.counts.shape[1]] = self.counts
+        return counts
+
+    @classmethod
+    def concatenate(cls, sketches):
+        """Stack the cells of several sketches (with the same accuracy) into one sketch"""
+        accuracy = sketches[0].accuracy
+        if any(s.accuracy != accuracy for s in sketches):
+            raise ValueError("Quantile sketches with different accuracies cannot be merged")
+        used = [s for s in sketches if s.counts.shape[1]]
+        if not used:
+            return cls.empty(sum(s.cells for s in sketches), accuracy)
+        minKey = min(s.minKey for s in used)
+        maxKey = max(s.minKey + s.counts.shape[1] - 1 for s in used)
+        counts = np.concatenate([s._aligned(minKey, maxKey) for s in sketches])
+        return cls(counts, np.concatenate([s.zeros for s in sketches]), minKey, accuracy)
+
+    def take(self, index):
+        """Sketches of a selection (or reordering) of the cells"""
+        return QuantileSketch(self.counts[index], self.zeros[index], self.minKey, self.accuracy)
+
+    def mergeSegments(self, starts):
+        """Merge the consecutive cells of each segment into one sketch per segment (sum of the bucket counts)"""
+        if self.cells == 0:
+            return self
+        counts = np.add.reduceat(self.counts, starts, axis=0) if self.counts.shape[1] else np.zeros((len(starts), 0), dtype=np.int64)
+        return QuantileSketch(counts, np.add.reduceat(self.zeros, starts), self.minKey, self.accuracy)
+
+    def _rankValues(self, rank):
+        """Estimated values at a (0-based) rank of every cell"""
+        # First bucket whose cumulative count (after the zero bucket) exceeds the rank
+        cumulative = np.cumsum(self.counts, axis=1) + self.zeros[:, None]
+        bucket = (cumulative <= rank[:, None]).sum(axis=1)
+        keys = self.minKey + np.minimum(bucket, max(self.counts.shape[1] - 1, 0))
+        estimates = 2 * np.power(self.gamma, keys.astype(np.float64)) / (self.gamma + 1)
+        return np.where(rank < self.zeros, 0.0, estimates)
+
+    def quantile(self, q):
+        """Estimate a quantile of every cell (NaN for the cells without observations)
+        The quantile is interpolated between the two closest ranks (as the R quantile type 7 and median), and each rank
+        value is within the relative accuracy of the true value.
+        Args:
+            q (float): quantile (0.5 for the median)
+        Returns:
+            numpy.ndarray: one estimate per cell
+        """
+        total = self.zeros + self.counts.sum(axis=1)
+        position = q * np.maximum(total - 1, 0)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        lowerValues = self._rankValues(lower)
+        upperValues = np.where(upper == lower, lowerValues, self._rankValues(upper))
+        result = lowerValues + (position - lower) * (upperValues - lowerValues)
+        return np.where(total == 0, np.nan, result)
+
+    def median(self):
+        """Estimate the median of every cell"""
+        return self.quantile(0.5)
+
+    def arrays(self):
+        """Arrays of the sketch for persistence (see fromArrays)"""
+        return {"counts": self.counts, "zeros": self.zeros, "params": np.array([self.minKey, self.accuracy])}
+
+    @classmethod
+    def fromArrays(cls, arrays):
+        """Rebuild a sketch from its persisted arrays"""
+        minKey, accuracy = arrays["params"]
+        return cls(np.asarray(arrays["counts"]), np.asarray(arrays["zeros"]), int(minKey), float(accuracy))
+
+# endregion
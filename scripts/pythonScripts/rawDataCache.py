@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Raw Data Cache - Content-Addressed Columnar Cache of the Raw Tables
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Columnar binary cache for the parsed raw SWITRS tables. Each table is stored in its own folder (one raw binary file
+# per column part, plus a manifest), keyed by the SHA-256 hash of the source csv file, of its schema.ini section and of
+# its raw code columns. The csv file is parsed and written batch by batch (the column files are appended to, and the
+# text categories are merged across batches), so building the cache needs the memory of one batch, not of the table.
+# Subsequent runs memory-map the cached columns instead of re-parsing the csv text.
+
+import os, json, shutil, hashlib
+import numpy as np
+import pandas as pd
+
+from rawDataReader import SCHEMA_PATH, CODEBOOK_PATH, BATCH_SIZE, parseSchemaIni, schemaColumns, readRawBatches
+from codebook import Codebook
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cache Keys
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Name of the cache folder (created next to the raw data files)
+CACHE_FOLDER = "cache"
+
+# Name of the file stamp index (maps path, size and modification time to the file content hash)
+CACHE_INDEX = "index.json"
+
+# Version of the cache layout (part of every cache key)
+CACHE_VERSION = 2
+
+
+def defaultCacheDir(csvPath):
+    """Return the default cache folder for a raw data file (a 'cache' folder in the raw data folder)"""
+    return os.path.join(os.path.dirname(os.path.abspath(csvPath)), CACHE_FOLDER)
+
+
+def fileHash(path, blockSize=1 << 20):
+    """Compute the SHA-256 hash of a file, reading it in blocks"""
+    sha = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(blockSize), b""):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def cachedFileHash(path, cacheDir):
+    """Return the file content hash, reusing the stored hash when the file size and modification time are unchanged"""
+    indexPath = os.path.join(cacheDir, CACHE_INDEX)
+    index = {}
+    if os.path.exists(indexPath):
+        with open(indexPath, "r") as f:
+            index = json.load(f)
+    stat = os.stat(path)
+    stamp = f"{stat.st_size}:{stat.st_mtime_ns}"
+    entry = index.get(os.path.abspath(path))
+    if entry and entry["stamp"] == stamp:
+        return entry["hash"]
+    # Hash the file contents and update the index
+    digest = fileHash(path)
+    index[os.path.abspath(path)] = {"stamp": stamp, "hash": digest}
+    os.makedirs(cacheDir, exist_ok=True)
+    with open(indexPath, "w") as f:
+        json.dump(index, f, indent=4)
+    return digest
+
+
+def schemaHash(columns):
+    """Compute the SHA-256 hash of a schema.ini section (its column definitions)"""
+    return hashlib.sha256(json.dumps(columns, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def cacheKey(sourceHash, columns, codeColumns=()):
+    """Combine the source file hash, the schema section hash and the raw code columns (read as text) into a single cache key"""
+    codes = ",".join(sorted(col["name"] for col in columns if col["name"] in codeColumns))
+    return hashlib.sha256(f"{CACHE_VERSION}:{sourceHash}:{schemaHash(columns)}:{codes}".encode("utf-8")).hexdigest()
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cache Storage
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def encodeColumn(series):
+    """Encode a pandas column into NumPy arrays (values, mask, categories) and its storage kind"""
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return "datetime", {"values": series.to_numpy(dtype="datetime64[ns]")}
+    if pd.api.types.is_bool_dtype(series) or pd.api.types.is_numeric_dtype(series):
+        mask = series.isna().to_numpy()
+        if isinstance(series.dtype, pd.api.extensions.ExtensionDtype):
+            numpyType = series.dtype.numpy_dtype
+            values = series.to_numpy(dtype=numpyType, na_value=0 if numpyType.kind in "biu" else np.nan)
+        else:
+            values = series.to_numpy()
+        return "numeric", {"values": values, "mask": mask}
+    # Text columns are dictionary encoded (int32 codes and fixed-width unicode categories)
+    codes, categories = pd.factorize(series, use_na_sentinel=True)
+    categories = np.asarray(categories, dtype=str) if len(categories) else np.array([], dtype="U1")
+    return "text", {"codes": codes.astype(np.int32), "categories": categories}
+
+
+def decodeColumn(kind, arrays, dtype, asCategorical):
+    """Rebuild a pandas column from its (memory-mapped) NumPy arrays"""
+    if kind == "datetime":
+        return pd.Series(arrays["values"], copy=False)
+    if kind == "numeric":
+        values, mask = arrays["values"], arrays["mask"]
+        pandasType = pd.api.types.pandas_dtype(dtype)
+        if isinstance(pandasType, pd.api.extensions.ExtensionDtype):
+            arrayType = pandasType.construct_array_type()
+            return pd.Series(arrayType(np.asarray(values), np.asarray(mask)), copy=False)
+        return pd.Series(values, copy=False)
+    categorical = pd.Categorical.from_codes(arrays["codes"], categories=pd.Index(arrays["categories"], dtype="string"))
+    series = pd.Series(categorical, copy=False)
+    return series if asCategorical else series.astype(dtype)
+
+
+def mergeCategories(codes, batchCategories, categories):
+    """Map the text codes of a batch to the codes of the whole table (categories: value -> code, extended in place)"""
+    lookup = np.array([categories.setdefault(value, len(categories)) for value in batchCategories.tolist()], dtype=np.int32)
+    # Missing values (code -1) pick the appended -1
+    return np.append(lookup, np.int32(-1))[codes]
+
+
+def writeCache(batches, cacheDir, key, table):
+    """Write a parsed raw data table to the columnar cache, appending its record batches to the column files
+    Args:
+        batches (iterable): record batches of the parsed raw data table (pandas.DataFrame, same columns and data types)
+        cacheDir (str): cache folder
+        key (str): cache key (see cacheKey)
+        table (str): raw data table name
+    Returns:
+        str: path to the table cache folder
+    """
+    tableDir = os.path.join(cacheDir, f"{table}-{key}")
+    tempDir = tableDir + ".tmp"
+    shutil.rmtree(tempDir, ignore_errors=True)
+    os.makedirs(tempDir)
+    manifest = {"version": CACHE_VERSION, "table": table, "key": key, "rows": 0, "columns": []}
+    handles = {}
+    categories = {}
+    try:
+        for batch in batches:
+            if not manifest["columns"]:
+                manifest["columns"] = [{"name": name, "kind": None, "dtype": str(batch[name].dtype), "files": {}, "types": {}} for name in batch.columns]
+            if list(batch.columns) != [col["name"] for col in manifest["columns"]]:
+                raise ValueError(f"The columns of {table} change between batches")
+            for i, col in enumerate(manifest["columns"]):
+                series = batch[col["name"]]
+                if str(series.dtype) != col["dtype"]:
+                    raise ValueError(f"Column {col['name']} of {table} changes data type between batches ({col['dtype']}, {series.dtype})")
+                col["kind"], arrays = encodeColumn(series)
+                if col["kind"] == "text":
+                    arrays["codes"] = mergeCategories(arrays["codes"], arrays.pop("categories"), categories.setdefault(i, {}))
+                for part, array in arrays.items():
+                    if part not in col["files"]:
+                        col["files"][part] = f"c{i:04d}.{part}.bin"
+                        col["types"][part] = array.dtype.str
+                        handles[(i, part)] = open(os.path.join(tempDir, col["files"][part]), "wb")
+                    np.ascontiguousarray(array, dtype=col["types"][part]).tofile(handles[(i, part)])
+            manifest["rows"] += len(batch)
+    except BaseException:
+        for handle in handles.values():
+            handle.close()
+        shutil.rmtree(tempDir, ignore_errors=True)
+        raise
+    for handle in handles.values():
+        handle.close()
+
+    # The categories of the text columns (small) are saved once, after the last batch
+    for i, values in categories.items():
+        fileName = f"c{i:04d}.categories.npy"
+        np.save(os.path.join(tempDir, fileName), np.array(list(values), dtype=str) if values else np.array([], dtype="U1"), allow_pickle=False)
+        manifest["columns"][i]["files"]["categories"] = fileName
+    with open(os.path.join(tempDir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=4)
+    # Swap the completed cache folder into place (partial writes are never visible)
+    shutil.rmtree(tableDir, ignore_errors=True)
+    os.replace(tempDir, tableDir)
+    return tableDir
+
+
+def loadCache(cacheDir, key, table, asCategorical=False, columns=None):
+    """Load a cached raw data table by memory-mapping its columns (all, or only the listed columns), or return None if
+    the cache entry does not exist"""
+    tableDir = os.path.join(cacheDir, f"{table}-{key}")
+    manifestPath = os.path.join(tableDir, "manifest.json")
+    if not os.path.exists(manifestPath):
+        return None
+    with open(manifestPath, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != CACHE_VERSION:
+        return None
+    rows = manifest["rows"]
+    selected = manifest["columns"] if columns is None else [col for col in manifest["columns"] if col["name"] in columns]
+    columns = {}
+    for col in selected:
+        arrays = {}
+        for part, fileName in col["files"].items():
+            path = os.path.join(tableDir, fileName)
+            if part == "categories":
+                arrays[part] = np.load(path, allow_pickle=False)
+            else:
+                # Raw column files (an empty file cannot be memory-mapped)
+                dtype = np.dtype(col["types"][part])
+                arrays[part] = np.memmap(path, dtype=dtype, mode="r", shape=(rows,)) if rows else np.zeros(0, dtype=dtype)
+        columns[col["name"]] = decodeColumn(col["kind"], arrays, col["dtype"], asCategorical)
+    return pd.DataFrame(columns, copy=False)
+
+
+def pruneCache(cacheDir, table, keepKey):
+    """Remove all the older cache entries of a table, keeping only the entry with keepKey"""
+    if not os.path.isdir(cacheDir):
+        return
+    for name in os.listdir(cacheDir):
+        if name.startswith(f"{table}-") and name != f"{table}-{keepKey}":
+            shutil.rmtree(os.path.join(cacheDir, name), ignore_errors=True)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cached Raw Data Loader
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def loadRawTable(csvPath, table, cacheDir=None, schema=None, schemaPath=SCHEMA_PATH, batchSize=BATCH_SIZE, asCategorical=False, prune=True, codebook=None, codebookPath=CODEBOOK_PATH):
+    """Load a raw SWITRS table from the columnar cache, parsing the csv file (and caching it) only when needed
+    Args:
+        csvPath (str): path to the raw csv file (e.g., Crashes.csv)
+        table (str): raw data table ('crashes', 'parties', 'victims', 'collisions')
+        cacheDir (str): cache folder (defaults to a 'cache' folder next to the raw data file)
+        schema (dict): parsed schema.ini (optional)
+        schemaPath (str): path to the schema.ini file
+        batchSize (int): number of records per batch when parsing the csv file
+        asCategorical (bool): return text columns as categoricals (no string materialization)
+        prune (bool): remove older cache entries of the same table after writing a new one
+        codebook (Codebook): compiled codebook with the raw code columns (optional, loaded from codebookPath if None)
+        codebookPath (str): path to the JSON codebook
+    Returns:
+        pandas.DataFrame: the parsed raw data table
+    """
+    if cacheDir is None:
+        cacheDir = defaultCacheDir(csvPath)
+    if schema is None:
+        schema = parseSchemaIni(schemaPath)
+    if codebook is None:
+        codebook = Codebook.load(codebookPath)
+    key = cacheKey(cachedFileHash(csvPath, cacheDir), schemaColumns(table, schema=schema), codebook.rawCodes)
+
+    # Cache hit: memory-map the cached columns
+    df = loadCache(cacheDir, key, table, asCategorical=asCategorical)
+    if df is not None:
+        print(f"Loaded {table} from cache ({len(df):,} rows)")
+        return df
+
+    # Cache miss: parse the csv file and write the cache batch by batch
+    print(f"Parsing {table} from {csvPath}...")
+    writeCache(readRawBatches(csvPath, table, batchSize=batchSize, schema=schema, codebook=codebook), cacheDir, key, table)
+    if prune:
+        pruneCache(cacheDir, table, key)
+    return loadCache(cacheDir, key, table, asCategorical=asCategorical)
+
+# endregion
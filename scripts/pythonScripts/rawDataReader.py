@@ -0,0 +1,237 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Raw Data Reader - Chunked CSV Ingest with schema.ini Data Types
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Streaming reader for the raw SWITRS data files (crashes, parties, victims). The column definitions in schema.ini
+# (Long, Double, Text Width, Date M/d/yyyy H:mm:ss) are compiled into exact pandas data types, and the raw files are
+# read in fixed-size record batches so that statewide extracts can be processed in bounded memory. The schema.ini types
+# describe the exported tables, where the factor variables are already recoded: in the raw files the labeled factor
+# columns of the codebook hold raw codes (e.g., '-' for a missing SPECIAL_COND), so they are read as text and left to
+# the codebook recode.
+
+import os, re
+import pandas as pd
+
+from codebook import Codebook
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Schema Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Default path to the schema.ini file (same folder as this script)
+SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "schema.ini")
+
+# Default path to the JSON codebook (codebook folder)
+CODEBOOK_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "codebook", "cb.json")
+
+# Default number of records per batch
+BATCH_SIZE = 100_000
+
+# Schema.ini sections used for each of the raw data tables
+SCHEMA_SECTIONS = {
+    "crashes": "dfCrashesExport.csv",
+    "parties": "dfPartiesExport.csv",
+    "victims": "dfVictimsExport.csv",
+    "collisions": "dfCollisionsExport.csv",
+}
+
+# Pandas data types for the schema.ini column types (nullable, matching the geodatabase field types)
+SCHEMA_DTYPES = {
+    "Byte": "UInt8",
+    "Short": "Int16",
+    "Integer": "Int16",
+    "Long": "Int32",
+    "Currency": "Float64",
+    "Single": "Float32",
+    "Double": "Float64",
+    "Text": "string",
+    "Memo": "string",
+    "Char": "string",
+    "Bit": "boolean",
+    "Date": "datetime64[ns]",
+}
+
+# Data type of the raw code columns (labeled factor variables of the codebook)
+RAW_CODE_DTYPE = "string"
+
+# Data type of the parsed date columns (the same in every batch)
+DATE_DTYPE = SCHEMA_DTYPES["Date"]
+
+# Number of unparseable date values shown in the error message
+DATE_ERROR_SAMPLES = 5
+
+# Conversion of the schema.ini (.NET style) date format tokens to strftime directives (longest tokens first)
+DATE_TOKENS = [
+    ("yyyy", "%Y"), ("yy", "%y"),
+    ("MM", "%m"), ("M", "%m"),
+    ("dd", "%d"), ("d", "%d"),
+    ("HH", "%H"), ("H", "%H"),
+    ("hh", "%I"), ("h", "%I"),
+    ("mm", "%M"), ("ss", "%S"),
+    ("tt", "%p"),
+]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Schema Parsing
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def convertDateFormat(schemaFormat):
+    """Convert a schema.ini date format (e.g., 'M/d/yyyy H:mm:ss') to a strftime format string"""
+    pattern = re.compile("|".join(token for token, _ in DATE_TOKENS))
+    tokens = dict(DATE_TOKENS)
+    return pattern.sub(lambda m: tokens[m.group(0)], schemaFormat)
+
+
+def parseSchemaIni(schemaPath=SCHEMA_PATH):
+    """Parse the schema.ini file into column definitions for each section
+    Args:
+        schemaPath (str): path to the schema.ini file
+    Returns:
+        dict: section name -> list of column definitions (name, type, width, format)
+    """
+    schema = {}
+    section = None
+    # Pattern for the column definition lines (e.g., Col8=COLLISION_DATETIME Date M/d/yyyy H:mm:ss)
+    colPattern = re.compile(r"^Col(\d+)=(\S+)\s+(\w+)(?:\s+Width\s+(\d+))?(?:\s+(.+))?$", re.IGNORECASE)
+    with open(schemaPath, "r") as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith(";"):
+                continue
+            # New section header
+            if line.startswith("[") and line.endswith("]"):
+                section = line[1:-1]
+                schema[section] = []
+                continue
+            match = colPattern.match(line)
+            if section is None or match is None:
+                continue
+            colNumber, name, colType, width, dateFormat = match.groups()
+            colType = colType.title()
+            if colType not in SCHEMA_DTYPES:
+                raise ValueError(f"Unsupported schema.ini type '{colType}' for column {name} in section [{section}]")
+            schema[section].append({
+                "order": int(colNumber),
+                "name": name,
+                "type": colType,
+                "width": int(width) if width else None,
+                "format": convertDateFormat(dateFormat) if colType == "Date" and dateFormat else None,
+            })
+    # Keep the columns in their schema order
+    for columns in schema.values():
+        columns.sort(key=lambda c: c["order"])
+    return schema
+
+
+def schemaColumns(table, schema=None, schemaPath=SCHEMA_PATH):
+    """Return the column definitions for a raw data table ('crashes', 'parties', 'victims', 'collisions') or a schema.ini section name"""
+    if schema is None:
+        schema = parseSchemaIni(schemaPath)
+    section = SCHEMA_SECTIONS.get(table, table)
+    if section not in schema:
+        raise KeyError(f"Section [{section}] not found in schema.ini")
+    return schema[section]
+
+
+def schemaDtypes(columns, codeColumns=()):
+    """Split the column definitions into pandas read dtypes and date columns (with their strftime formats)
+    Args:
+        columns (list): column definitions (see schemaColumns)
+        codeColumns (set): raw code columns, read as text whatever their schema.ini type
+    Returns:
+        tuple: column -> pandas read dtype, and date column -> strftime format
+    """
+    dtypes = {}
+    dateColumns = {}
+    for col in columns:
+        if col["type"] == "Date":
+            # Dates are read as strings and parsed with their explicit format
+            dtypes[col["name"]] = "string"
+            dateColumns[col["name"]] = col["format"]
+        elif col["name"] in codeColumns:
+            dtypes[col["name"]] = RAW_CODE_DTYPE
+        else:
+            dtypes[col["name"]] = SCHEMA_DTYPES[col["type"]]
+    return dtypes, dateColumns
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Batch Reader
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def readRawBatches(csvPath, table, batchSize=BATCH_SIZE, schema=None, schemaPath=SCHEMA_PATH, usecols=None, codebook=None, codebookPath=CODEBOOK_PATH):
+    """Read a raw SWITRS csv file in fixed-size record batches with schema.ini data types (raw code columns as text)
+    Args:
+        csvPath (str): path to the raw csv file (e.g., Crashes.csv)
+        table (str): raw data table ('crashes', 'parties', 'victims', 'collisions') or schema.ini section name
+        batchSize (int): number of records per batch
+        schema (dict): parsed schema.ini (optional, parsed from schemaPath if None)
+        schemaPath (str): path to the schema.ini file
+        usecols (list): optional subset of columns to read
+        codebook (Codebook): compiled codebook with the raw code columns (optional, loaded from codebookPath if None)
+        codebookPath (str): path to the JSON codebook
+    Yields:
+        pandas.DataFrame: record batches of at most batchSize rows
+    Raises:
+        ValueError: if a date value matches neither its schema.ini format nor ISO 8601
+    """
+    if codebook is None:
+        codebook = Codebook.load(codebookPath)
+    columns = schemaColumns(table, schema=schema, schemaPath=schemaPath)
+    dtypes, dateColumns = schemaDtypes(columns, codebook.rawCodes)
+
+    # Read the header only, so that columns missing from the schema get a stable (string) data type across batches
+    header = pd.read_csv(csvPath, nrows=0).columns.tolist()
+    if usecols is not None:
+        header = [c for c in header if c in usecols]
+    readTypes = {c: dtypes.get(c, "string") for c in header}
+
+    # Stream the records in batches, converting the date columns with their exact formats
+    reader = pd.read_csv(csvPath, usecols=header, dtype=readTypes, chunksize=batchSize, keep_default_na=True)
+    for batch in reader:
+        for name, dateFormat in dateColumns.items():
+            if name in batch.columns:
+                batch[name] = parseDates(batch[name], dateFormat, name)
+        yield batch
+
+
+def parseDates(values, dateFormat, name=None):
+    """Parse a string column with its schema.ini date format, falling back to ISO 8601 (raw TIMS extracts use yyyy-mm-dd dates)
+    Args:
+        values (pandas.Series): date strings
+        dateFormat (str): strftime format of the column
+        name (str): column name (for the error message)
+    Returns:
+        pandas.Series: the parsed dates (DATE_DTYPE in every batch)
+    Raises:
+        ValueError: if a value matches neither format
+    """
+    parsed = pd.to_datetime(values, format=dateFormat, errors="coerce").astype(DATE_DTYPE)
+    failed = parsed.isna() & values.notna()
+    if failed.any():
+        parsed[failed] = pd.to_datetime(values[failed], format="ISO8601", errors="coerce").astype(DATE_DTYPE)
+        failed = parsed.isna() & values.notna()
+    if failed.any():
+        samples = values[failed].unique()[:DATE_ERROR_SAMPLES].tolist()
+        raise ValueError(f"{int(failed.sum())} unparseable date values in column {name} (format {dateFormat} or ISO 8601): {samples}")
+    return parsed
+
+
+def readRawTable(csvPath, table, batchSize=BATCH_SIZE, schema=None, schemaPath=SCHEMA_PATH, usecols=None, codebook=None, codebookPath=CODEBOOK_PATH):
+    """Read a full raw SWITRS csv file by concatenating its record batches"""
+    batches = list(readRawBatches(csvPath, table, batchSize=batchSize, schema=schema, schemaPath=schemaPath, usecols=usecols, codebook=codebook, codebookPath=codebookPath))
+    if not batches:
+        return pd.DataFrame()
+    return pd.concat(batches, ignore_index=True)
+
+# endregion
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Road Distance - Point to Polyline Distances of the Crashes to the Major Roads
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Vectorized distances from the crash points to the nearest major road segment, replacing the SelectLayerByLocation
+# (search_distance = "500 Feet") and ExportFeatures pass of the crashes500ftFromMajorRoads feature class
+# (part1Features.py section 2.4). The road polylines are split into straight segments, and a uniform grid lists the
+# segments whose bounding box overlaps each cell (CSR layout). The distance of a point is the exact perpendicular (or
+# end point) distance to the closest segment, in the projected units of the coordinates (feet). The search window
+# around each point starts at half a grid cell and grows until the closest segment found lies within the window, so
+# the result is exact for every point. The distances are kept as the distToMajorRoad column, so any distance
+# threshold can be selected afterwards without another geoprocessing pass. Crashes without coordinates (null geometry
+# or missing pointX / pointY) have no nearest segment, and a missing distance.
+
+import numpy as np
+import pandas as pd
+
+from spatialJoin import expandRanges
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Average number of road segments per grid cell (sets the default grid cell size)
+GRID_SEGMENTS_PER_CELL = 1.0
+
+# Number of points per chunk of the distance computations
+CHUNK_POINTS = 100_000
+
+# Search distance of the crashes near the major roads (feet)
+SEARCH_DISTANCE = 500.0
+
+# Name of the distance column
+DISTANCE_COLUMN = "distToMajorRoad"
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Segment Index
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class SegmentIndex:
+    """Uniform grid index of the straight segments of a set of polylines for nearest distance queries
+    Args:
+        polylines (list): one list of parts per polyline, each part an (n x 2) array of x, y vertices
+        cellSize (float): grid cell size (default: about GRID_SEGMENTS_PER_CELL segments per cell)
+    """
+
+    def __init__(self, polylines, cellSize=None):
+        self.count = len(polylines)
+
+        # Segments of all the parts (in vertex order), with their polyline and part (numbered over all the polylines)
+        starts, ends, owners, partOwners = [], [], [], []
+        for i, parts in enumerate(polylines):
+            for part in parts:
+                part = np.asarray(part, dtype=np.float64).reshape(-1, 2)
+                if len(part) < 2:
+                    continue
+                starts.append(part[:-1])
+                ends.append(part[1:])
+                owners.append(np.full(len(part) - 1, i, dtype=np.int64))
+                partOwners.append(np.full(len(part) - 1, len(partOwners), dtype=np.int64))
+        if not starts:
+            raise ValueError("The polylines have no segments")
+        start = np.concatenate(starts)
+        end = np.concatenate(ends)
+        self.polyline = np.concatenate(owners)
+        self.part = np.concatenate(partOwners)
+        self.x1, self.y1 = start[:, 0], start[:, 1]
+        self.x2, self.y2 = end[:, 0], end[:, 1]
+        xmin, xmax = np.minimum(self.x1, self.x2), np.maximum(self.x1, self.x2)
+        ymin, ymax = np.minimum(self.y1, self.y2), np.maximum(self.y1, self.y2)
+        self.extent = (xmin.min(), ymin.min(), xmax.max(), ymax.max())
+
+        # Grid cell size and dimensions
+        width = max(self.extent[2] - self.extent[0], 1e-9)
+        height = max(self.extent[3] - self.extent[1], 1e-9)
+        if cellSize is None:
+            cellSize = np.sqrt(width * height * GRID_SEGMENTS_PER_CELL / len(self.polyline))
+        self.cellSize = float(cellSize)
+        self.columns = int(np.floor(width / self.cellSize)) + 1
+        self.rows = int(np.floor(height / self.cellSize)) + 1
+
+        # Segments of each grid cell (CSR: cellStarts offsets into cellSegments)
+        c0, r0 = self._columns(xmin), self._rows(ymin)
+        c1, r1 = self._columns(xmax), self._rows(ymax)
+        spanC = c1 - c0 + 1
+        owner, local = expandRanges(spanC * (r1 - r0 + 1))
+        cell = (r0[owner] + local // spanC[owner]) * self.columns + c0[owner] + local % spanC[owner]
+        order = np.argsort(cell, kind="stable")
+        self.cellSegments = owner[order]
+        self.cellStarts = np.searchsorted(cell[order], np.arange(self.rows * self.columns + 1))
+
+    def _columns(self, x):
+        """Grid column of x coordinates (clipped to the grid)"""
+        return np.clip(np.floor((x - self.extent[0]) / self.cellSize), 0, self.columns - 1).astype(np.int64)
+
+    def _rows(self, y):
+        """Grid row of y coordinates (clipped to the grid)"""
+        return np.clip(np.floor((y - self.extent[1]) / self.cellSize), 0, self.rows - 1).astype(np.int64)
+
+    def segmentDistances(self, x, y, segment):
+        """Distances from points to segments (perpendicular, or to the closest end point)
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            segment (numpy.ndarray): segment index of each point
+        Returns:
+            numpy.ndarray: distance of each point to its segment
+        """
+        x1, y1 = self.x1[segment], self.y1[segment]
+        dx, dy = self.x2[segment] - x1, self.y2[segment] - y1
+        length2 = dx * dx + dy * dy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.clip(((x - x1) * dx + (y - y1) * dy) / length2, 0.0, 1.0)
+        t = np.where(length2 > 0, t, 0.0)
+        return np.hypot(x1 + t * dx - x, y1 + t * dy - y)
+
+    def _windowNearest(self, x, y, radius):
+        """Closest segment of each point among the segments of the grid cells within a radius (a square window)
+        Returns:
+            tuple: distance (inf if no segment) and segment index (-1) of each point
+        """
+        c0, c1 = self._columns(x - radius), self._columns(x + radius)
+        r0, r1 = self._rows(y - radius), self._rows(y + radius)
+
+        # The cells of a window row are contiguous, so their segments are one range of cellSegments
+        rowPoint, local = expandRanges(r1 - r0 + 1)
+        rowCell = (r0[rowPoint] + local) * self.columns
+        first = self.cellStarts[rowCell + c0[rowPoint]]
+        counts = self.cellStarts[rowCell + c1[rowPoint] + 1] - first
+        entry, local = expandRanges(counts)
+        point = rowPoint[entry]
+        segment = self.cellSegments[first[entry] + local]
+        distance = self.segmentDistances(x[point], y[point], segment)
+
+        # Minimum per point (the pairs are grouped by point) and the first segment at the minimum distance
+        nearest = np.full(len(x), np.inf)
+        nearestSegment = np.full(len(x), -1, dtype=np.int64)
+        if len(distance):
+            starts = np.flatnonzero(np.diff(point, prepend=-1) != 0)
+            nearest[point[starts]] = np.minimum.reduceat(distance, starts)
+            closest = np.flatnonzero(distance == nearest[point])
+            closest = closest[np.diff(point[closest], prepend=-1) != 0]
+            nearestSegment[point[closest]] = segment[closest]
+        return nearest, nearestSegment
+
+    def nearest(self, x, y, maxDistance=None):
+        """Distance to the closest segment and closest polyline of each point
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            maxDistance (float): search limit (the points farther than the limit get an infinite distance and -1)
+        Returns:
+            tuple: distance and polyline index of each point
+        """
+        distance, segment = self.nearestSegment(x, y, maxDistance)
+        return distance, np.where(segment >= 0, self.polyline[np.maximum(segment, 0)], -1)
+
+    def nearestSegment(self, x, y, maxDistance=None):
+        """Distance to the closest segment and closest segment of each point
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            maxDistance (float): search limit (the points farther than the limit get an infinite distance and -1)
+        Returns:
+            tuple: distance and segment index of each point (infinite distance and -1 for the points without finite
+                coordinates)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        distance = np.full(len(x), np.inf)
+        segment = np.full(len(x), -1, dtype=np.int64)
+        located = np.isfinite(x) & np.isfinite(y)
+        for chunk in range(0, len(x), CHUNK_POINTS):
+            points = np.arange(chunk, min(chunk + CHUNK_POINTS, len(x)))
+            points = points[located[points]]
+            radius = np.full(len(points), self.cellSize / 2 if maxDistance is None else min(self.cellSize / 2, maxDistance))
+            while len(points):
+                found, foundSegment = self._windowNearest(x[points], y[points], radius)
+                distance[points] = found
+                segment[points] = foundSegment
+
+                # A segment found within the window radius is the closest one (any closer segment overlaps the window)
+                covers = (x[points] - radius <= self.extent[0]) & (x[points] + radius >= self.extent[2])
+                covers &= (y[points] - radius <= self.extent[1]) & (y[points] + radius >= self.extent[3])
+                done = (found <= radius) | covers
+                if maxDistance is not None:
+                    done |= radius >= maxDistance
+
+                # The distance found bounds the closest one, so a window of that radius is the last one (the window
+                # doubles while no segment is found)
+                radius = np.where(np.isfinite(found), found, 2 * radius)[~done]
+                if maxDistance is not None:
+                    radius = np.minimum(radius, maxDistance)
+                points = points[~done]
+
+        if maxDistance is not None:
+            beyond = distance > maxDistance
+            distance[beyond] = np.inf
+            segment[beyond] = -1
+        return distance, segment
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Proximity Selection
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def roadDistances(points, polylines, xColumn="pointX", yColumn="pointY", column=DISTANCE_COLUMN, index=None):
+    """Add the distance from each point to the nearest road as a column
+    Args:
+        points (pandas.DataFrame): point table with the x and y coordinate columns
+        polylines (list): road polylines (see SegmentIndex)
+        xColumn, yColumn (str): coordinate columns of the point table
+        column (str): name of the distance column
+        index (SegmentIndex): prebuilt index of the road segments (built if None)
+    Returns:
+        pandas.DataFrame: the point table with the distance column (in the units of the coordinates; missing for the
+            points without coordinates)
+    """
+    if index is None:
+        index = SegmentIndex(polylines)
+    x = points[xColumn].to_numpy(dtype=np.float64, na_value=np.nan)
+    y = points[yColumn].to_numpy(dtype=np.float64, na_value=np.nan)
+    distance, _ = index.nearest(x, y)
+    distance[~(np.isfinite(x) & np.isfinite(y))] = np.nan
+    result = points.copy()
+    result[column] = distance
+    return result
+
+
+def selectNearRoads(points, polylines, searchDistance=SEARCH_DISTANCE, xColumn="pointX", yColumn="pointY", column=DISTANCE_COLUMN, index=None):
+    """Select the points within a distance of the roads (SelectLayerByLocation WITHIN_A_DISTANCE equivalent)
+    Args:
+        points (pandas.DataFrame): point table; an existing distance column is reused
+        polylines (list): road polylines (see SegmentIndex)
+        searchDistance (float): search distance (in the units of the coordinates)
+        xColumn, yColumn (str): coordinate columns of the point table
+        column (str): name of the distance column
+        index (SegmentIndex): prebuilt index of the road segments (built if None)
+    Returns:
+        tuple: selection mask (numpy.ndarray) and the point table with the distance column
+    """
+    if column not in points.columns:
+        points = roadDistances(points, polylines, xColumn, yColumn, column, index)
+    return (points[column] <= searchDistance).to_numpy(), points
+
+
+def readPolylines(featureClass, fields):
+    """Read the polylines and attributes of a feature class (requires arcpy)
+    Args:
+        featureClass (str): path to the polyline feature class
+        fields (list): attribute fields to read
+    Returns:
+        tuple: polyline parts (see SegmentIndex) and attribute table (pandas.DataFrame)
+    """
+    import arcpy
+    polylines, rows = [], []
+    with arcpy.da.SearchCursor(featureClass, ["SHAPE@"] + list(fields)) as cursor:
+        for row in cursor:
+            parts = [] if row[0] is None else [np.array([(p.X, p.Y) for p in part if p is not None]) for part in row[0]]
+            polylines.append(parts)
+            rows.append(row[1:])
+    return polylines, pd.DataFrame.from_records(rows, columns=list(fields))
+
+# endregion
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Road Segments - Linear Referencing Segmentation and Crash Summaries of the Major Roads
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# In memory equivalent of the road segment chain of part1Features.py section 2.4 (GeneratePointsAlongLines every
+# 1,000 feet, SplitLineAtPoint, Buffer 500 feet and SummarizeWithin into roadsMajorSplitBufferSum), without the
+# intermediate feature classes. Each part of the roadsMajor polylines is measured from its first vertex and cut into
+# pieces of a fixed length (the last piece of a part is the remainder). Each crash is projected once on its closest
+# road segment (roadDistance.SegmentIndex), which gives its distance to the road and its measure along the part, and
+# it is assigned to the piece containing that measure if it is within the buffer width (and not beyond the flat end
+# of the part). The piece summaries are then bincount reductions, and since the projections do not depend on the
+# segment length or the buffer width, a sweep of several lengths and widths reuses them.
+#
+# Unlike the overlapping buffers of the arcpy chain (where a crash near a bend can fall in the buffers of two pieces),
+# each crash is counted once, in the piece of its closest road segment.
+
+import numpy as np
+import pandas as pd
+
+from roadDistance import SegmentIndex
+from spatialJoin import expandRanges
+from summarizeWithin import SUM_FIELDS, summaryStatistics
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Length of the road pieces (feet, GeneratePointsAlongLines distance)
+SEGMENT_LENGTH = 1000.0
+
+# Buffer width around the road pieces (feet, on each side)
+BUFFER_WIDTH = 500.0
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Linear Referencing
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class RoadMeasures:
+    """Linear referencing of the parts of a set of polylines (segment measures along their part)
+    Args:
+        polylines (list): one list of parts per polyline, each part an (n x 2) array of x, y vertices
+        index (SegmentIndex): prebuilt segment index of the polylines (built if None)
+    """
+
+    def __init__(self, polylines, index=None):
+        self.index = SegmentIndex(polylines) if index is None else index
+        index = self.index
+
+        # Segment lengths and start measures (cumulative length along the part)
+        self.segmentLength = np.hypot(index.x2 - index.x1, index.y2 - index.y1)
+        self.partStarts = np.searchsorted(index.part, np.arange(index.part[-1] + 2))
+        cumulative = np.cumsum(self.segmentLength)
+        partOffset = np.append(0.0, cumulative)[self.partStarts[:-1]]
+        self.segmentMeasure = cumulative - self.segmentLength - partOffset[index.part]
+        self.partLength = np.append(0.0, cumulative)[self.partStarts[1:]] - partOffset
+        self.partRoad = index.polyline[self.partStarts[:-1]]
+
+    def pieceCounts(self, segmentLength=SEGMENT_LENGTH):
+        """Number of pieces of a fixed length of each part (at least one)"""
+        return np.maximum(np.ceil(self.partLength / segmentLength).astype(np.int64), 1)
+
+    def pieces(self, segmentLength=SEGMENT_LENGTH):
+        """Table of the pieces of a fixed length of all the parts (the last piece of a part is the remainder)
+        Args:
+            segmentLength (float): piece length
+        Returns:
+            pandas.DataFrame: road, part, piece (within the part), from and to measures and length of each piece
+        """
+        counts = self.pieceCounts(segmentLength)
+        part, piece = expandRanges(counts)
+        fromMeasure = piece * segmentLength
+        toMeasure = np.minimum(fromMeasure + segmentLength, self.partLength[part])
+        return pd.DataFrame({
+            "roadIndex": self.partRoad[part],
+            "partIndex": part,
+            "pieceIndex": piece,
+            "fromMeasure": fromMeasure,
+            "toMeasure": toMeasure,
+            "pieceLength": toMeasure - fromMeasure,
+        })
+
+    def project(self, x, y, maxDistance=None):
+        """Project points on their closest road segment
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            maxDistance (float): search limit (the points farther than the limit, and the points without finite
+                coordinates, are not projected)
+        Returns:
+            pandas.DataFrame: distance, part (-1 if not projected), measure along the part, and whether the point is
+                beyond the flat end of its part (its projection falls before the first or after the last vertex)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        distance, segment = self.index.nearestSegment(x, y, maxDistance)
+        found = segment >= 0
+        s = segment[found]
+        index = self.index
+        dx, dy = index.x2[s] - index.x1[s], index.y2[s] - index.y1[s]
+        length2 = dx * dx + dy * dy
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(length2 > 0, ((x[found] - index.x1[s]) * dx + (y[found] - index.y1[s]) * dy) / length2, 0.0)
+        part = index.part[s]
+        beyondEnd = ((t < 0) & (s == self.partStarts[part])) | ((t > 1) & (s == self.partStarts[part + 1] - 1))
+
+        projection = pd.DataFrame({"distance": distance, "part": -1, "measure": np.nan, "beyondEnd": False})
+        projection.loc[found, "part"] = part
+        projection.loc[found, "measure"] = self.segmentMeasure[s] + np.clip(t, 0.0, 1.0) * self.segmentLength[s]
+        projection.loc[found, "beyondEnd"] = beyondEnd
+        return projection
+
+    def assign(self, projection, segmentLength=SEGMENT_LENGTH, bufferWidth=BUFFER_WIDTH, flatEnds=True):
+        """Piece of each projected point within the buffer width of the roads
+        Args:
+            projection (pandas.DataFrame): point projections (see project)
+            segmentLength (float): piece length
+            bufferWidth (float): buffer width on each side of the roads
+            flatEnds (bool): exclude the points beyond the ends of the parts (Buffer line_end_type FLAT)
+        Returns:
+            numpy.ndarray: piece row (in the pieces table of the segment length) of each point, -1 if outside
+        """
+        counts = self.pieceCounts(segmentLength)
+        pieceOffset = np.cumsum(counts) - counts
+        part = projection["part"].to_numpy()
+        inside = (part >= 0) & (projection["distance"].to_numpy() <= bufferWidth)
+        if flatEnds:
+            inside &= ~projection["beyondEnd"].to_numpy(dtype=bool)
+        piece = np.full(len(part), -1, dtype=np.int64)
+        p = part[inside]
+        local = np.minimum(np.floor(projection["measure"].to_numpy()[inside] / segmentLength).astype(np.int64), counts[p] - 1)
+        piece[inside] = pieceOffset[p] + local
+        return piece
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Road Segment Summaries
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def summarizeSegments(points, polylines, attributes=None, segmentLength=SEGMENT_LENGTH, bufferWidth=BUFFER_WIDTH, sumFields=SUM_FIELDS, xColumn="pointX", yColumn="pointY", flatEnds=True, measures=None, projection=None):
+    """Crash summaries of the fixed length pieces of the roads (roadsMajorSplitBufferSum equivalent)
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the summary fields
+        polylines (list): road polylines (see SegmentIndex)
+        attributes (pandas.DataFrame): road attribute table (joined to the pieces by road row, optional)
+        segmentLength (float): piece length
+        bufferWidth (float): buffer width on each side of the roads
+        sumFields (list): [field, statistic] pairs (statistics: Sum, Mean)
+        xColumn, yColumn (str): coordinate columns of the point table
+        flatEnds (bool): exclude the points beyond the ends of the road parts
+        measures (RoadMeasures): prebuilt linear referencing of the roads (built if None)
+        projection (pandas.DataFrame): point projections (see RoadMeasures.project, computed if None)
+    Returns:
+        pandas.DataFrame: piece table with the road attributes, the Point_Count and the summary statistic columns
+    """
+    if measures is None:
+        measures = RoadMeasures(polylines)
+    if projection is None:
+        projection = measures.project(points[xColumn].to_numpy(dtype=np.float64, na_value=np.nan), points[yColumn].to_numpy(dtype=np.float64, na_value=np.nan), bufferWidth)
+    pieces = measures.pieces(segmentLength)
+    piece = measures.assign(projection, segmentLength, bufferWidth, flatEnds)
+    assigned = np.flatnonzero(piece >= 0)
+    statistics = summaryStatistics(points, assigned, piece[assigned], len(pieces), sumFields)
+    if attributes is not None:
+        roadAttributes = attributes.reset_index(drop=True).iloc[pieces["roadIndex"].to_numpy()].reset_index(drop=True)
+        pieces = pd.concat([pieces, roadAttributes[[c for c in roadAttributes.columns if c not in pieces.columns]]], axis=1)
+    for column, values in statistics.items():
+        pieces[column] = values
+    return pieces
+
+
+def sweepSegments(points, polylines, segmentLengths, bufferWidths, attributes=None, sumFields=SUM_FIELDS, xColumn="pointX", yColumn="pointY", flatEnds=True):
+    """Road piece summaries for every combination of segment lengths and buffer widths (one projection of the points)
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the summary fields
+        polylines (list): road polylines (see SegmentIndex)
+        segmentLengths (list): piece lengths
+        bufferWidths (list): buffer widths
+        attributes (pandas.DataFrame): road attribute table (optional)
+        sumFields (list): [field, statistic] pairs
+        xColumn, yColumn (str): coordinate columns of the point table
+        flatEnds (bool): exclude the points beyond the ends of the road parts
+    Returns:
+        dict: (segment length, buffer width) -> piece summary table (see summarizeSegments)
+    """
+    measures = RoadMeasures(polylines)
+    projection = measures.project(points[xColumn].to_numpy(dtype=np.float64, na_value=np.nan), points[yColumn].to_numpy(dtype=np.float64, na_value=np.nan), max(bufferWidths))
+    return {
+        (length, width): summarizeSegments(points, polylines, attributes, length, width, sumFields, xColumn, yColumn, flatEnds, measures, projection)
+        for length in segmentLengths
+        for width in bufferWidths
+    }
+
+
+def pieceLines(measures, pieces):
+    """Vertices of the road pieces (for writing the pieces as polylines)
+    Args:
+        measures (RoadMeasures): linear referencing of the roads
+        pieces (pandas.DataFrame): piece table (see RoadMeasures.pieces)
+    Returns:
+        list: (n x 2) vertex array of each piece
+    """
+    index = measures.index
+    lines = []
+    for part, fromMeasure, toMeasure in zip(pieces["partIndex"], pieces["fromMeasure"], pieces["toMeasure"]):
+        segments = slice(measures.partStarts[part], measures.partStarts[part + 1])
+        vertexMeasure = np.append(measures.segmentMeasure[segments], measures.partLength[part])
+        x = np.append(index.x1[segments], index.x2[segments][-1])
+        y = np.append(index.y1[segments], index.y2[segments][-1])
+        inner = (vertexMeasure > fromMeasure) & (vertexMeasure < toMeasure)
+        cut = np.concatenate([[fromMeasure], vertexMeasure[inner], [toMeasure]])
+        lines.append(np.column_stack([np.interp(cut, vertexMeasure, x), np.interp(cut, vertexMeasure, y)]))
+    return lines
+
+# endregion
@@ -0,0 +1,338 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Rollup Cube - Daily Mergeable Aggregates with Derived Time Series
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Persisted daily aggregate cube for the time series. Each (day, variable) cell holds a mergeable partial state: the
+# number of observations, the sum, the minimum and maximum, and the Welford mean and sum of squared deviations (M2).
+# The weekly, monthly, quarterly and yearly series are derived by merging the daily cells of each period (Chan's
+# parallel variance formula), without reading the raw records again. Appending a new quarter of data merges its daily
+# cells into the cube, so only the cells of the new (or overlapping) days change.
+#
+# The cube covers the mergeable statistics (fSum, fMin, fMax, fMean, fSd, fVar, fNobs), and the medians (fMedian) from
+# mergeable quantile sketches stored per day cell (quantileSketch.py). The other tsAggr functions, and the exact
+# medians used for validation, are computed from the raw rows (timeSeriesAggr.aggregateTable).
+
+import os, json, shutil
+import numpy as np
+import pandas as pd
+
+from timeSeriesAggr import TS_RESOLUTIONS, TS_SUFFIXES, TS_TABLES, aggregateTable, aggregationLists, mergeAggregates, periodStarts, segmentStarts, sortedDays, tableRows
+from quantileSketch import SKETCH_ACCURACY, QuantileSketch
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Partial state arrays of each cube variable
+STATE_FIELDS = ["count", "sum", "min", "max", "mean", "m2"]
+
+# Aggregation functions computed from the partial states
+CUBE_FUNCTIONS = ["fSum", "fMin", "fMax", "fMean", "fSd", "fVar", "fNobs"]
+
+# Aggregation functions computed from the quantile sketches
+SKETCH_FUNCTIONS = ["fMedian"]
+
+# Version of the persisted cube layout
+CUBE_VERSION = 1
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region State Merges
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def segmentStates(values, starts):
+    """Partial states of the segments of a sorted float array (missing values are not counted)"""
+    if len(starts) == 0:
+        return _emptyStates(0)
+    valid = ~np.isnan(values)
+    lengths = np.diff(np.append(starts, len(values)))
+    count = np.add.reduceat(valid.astype(np.int64), starts)
+    total = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, total / count, 0.0)
+    deviations = np.where(valid, values - np.repeat(mean, lengths), 0.0)
+    return {
+        "count": count,
+        "sum": total,
+        "min": np.minimum.reduceat(np.where(valid, values, np.inf), starts),
+        "max": np.maximum.reduceat(np.where(valid, values, -np.inf), starts),
+        "mean": mean,
+        "m2": np.add.reduceat(deviations * deviations, starts),
+    }
+
+
+def mergeSegmentStates(states, starts):
+    """Merge the partial states of the consecutive cells of each segment into one state per segment"""
+    count = np.add.reduceat(states["count"], starts)
+    total = np.add.reduceat(states["sum"], starts)
+    lengths = np.diff(np.append(starts, len(states["count"])))
+    single = lengths == 1
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(count > 0, np.add.reduceat(states["mean"] * states["count"], starts) / count, 0.0)
+    # Segments of a single cell keep their state unchanged (no rounding of the cells that are not merged)
+    mean = np.where(single, states["mean"][starts], mean)
+    # Chan's formula: M2 = sum(M2_i) + sum(n_i * (mean_i - mean)^2)
+    delta = states["mean"] - np.repeat(mean, lengths)
+    m2 = np.add.reduceat(states["m2"] + states["count"] * delta * delta, starts)
+    return {
+        "count": count,
+        "sum": total,
+        "min": np.minimum.reduceat(states["min"], starts),
+        "max": np.maximum.reduceat(states["max"], starts),
+        "mean": mean,
+        "m2": m2,
+    }
+
+
+def stateStatistic(states, func):
+    """Compute an aggregation function from the partial states (NaN where a cell has no observations)"""
+    count = states["count"]
+    empty = count == 0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        if func == "fNobs":
+            return count.astype(np.float64)
+        if func == "fSum":
+            return np.where(empty, np.nan, states["sum"])
+        if func == "fMin":
+            return np.where(empty, np.nan, states["min"])
+        if func == "fMax":
+            return np.where(empty, np.nan, states["max"])
+        if func == "fMean":
+            return np.where(empty, np.nan, states["mean"])
+        if func in ("fSd", "fVar"):
+            variance = np.where(count > 1, states["m2"] / (count - 1), np.nan)
+            return np.sqrt(variance) if func == "fSd" else variance
+    raise ValueError(f"Aggregation function {func} cannot be computed from the cube states")
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Rollup Cube
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class RollupCube:
+    """Daily aggregate cube of mergeable partial states
+    Args:
+        days (numpy.ndarray): sorted unique datetime64[D] days of the cells
+        states (dict): variable -> {state field -> array (one value per day)}
+        sketches (dict): variable -> QuantileSketch (one sketch per day) for the median aggregates
+    """
+
+    def __init__(self, days, states, sketches=None):
+        self.days = np.asarray(days, dtype="datetime64[D]")
+        self.states = states
+        self.sketches = sketches or {}
+
+    @property
+    def variables(self):
+        """Variables of the cube"""
+        return list(self.states)
+
+    @classmethod
+    def fromTable(cls, df, variables, dateColumn="dateDay", sketchVariables=(), accuracy=SKETCH_ACCURACY):
+        """Build the daily cube of a table (one sort by day, segment reductions per variable)
+        Args:
+            df (pandas.DataFrame): table with the collision day column
+            variables (list): variables with partial states
+            dateColumn (str): collision day column
+            sketchVariables (list): variables with quantile sketches (median aggregates)
+            accuracy (float): relative accuracy of the quantile sketches
+        Returns:
+            RollupCube: the daily cube
+        """
+        order, days = sortedDays(df, dateColumn)
+        starts = segmentStarts(days)
+        states, sketches = {}, {}
+        for name in dict.fromkeys(list(variables) + list(sketchVariables)):
+            values = pd.to_numeric(df[name], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[order]
+            if name in variables:
+                states[name] = segmentStates(values, starts)
+            if name in sketchVariables:
+                sketches[name] = QuantileSketch.fromSegments(values, starts, accuracy)
+        return cls(days[starts], states, sketches)
+
+    def merge(self, other):
+        """Merge another daily cube into this one (cells of the same day are combined, the others are carried over)"""
+        variables = self.variables + [v for v in other.variables if v not in self.states]
+        days = np.concatenate([self.days, other.days])
+        order = np.argsort(days, kind="stable")
+        mergedDays = days[order]
+        starts = segmentStarts(mergedDays)
+        states = {}
+        for name in variables:
+            parts = [cube.states.get(name) or _emptyStates(len(cube.days)) for cube in (self, other)]
+            stacked = {f: np.concatenate([p[f] for p in parts])[order] for f in STATE_FIELDS}
+            states[name] = mergeSegmentStates(stacked, starts)
+        sketches = {}
+        for name in dict.fromkeys(list(self.sketches) + list(other.sketches)):
+            parts = [cube.sketches.get(name) or QuantileSketch.empty(len(cube.days)) for cube in (self, other)]
+            sketches[name] = QuantileSketch.concatenate(parts).take(order).mergeSegments(starts)
+        return RollupCube(mergedDays[starts], states, sketches)
+
+    def append(self, df, dateColumn="dateDay"):
+        """Append new records (e.g. a new quarter of data) to the cube, updating only the cells of their days"""
+        accuracy = next(iter(self.sketches.values())).accuracy if self.sketches else SKETCH_ACCURACY
+        return self.merge(RollupCube.fromTable(df, self.variables, dateColumn=dateColumn, sketchVariables=list(self.sketches), accuracy=accuracy))
+
+    def rollup(self, periodColumn):
+        """Derive the cube of a coarser resolution ('dateWeek', 'dateMonth', 'dateQuarter', 'dateYear') from the daily cells"""
+        periods = periodStarts(self.days, periodColumn)
+        starts = segmentStarts(periods)
+        if periodColumn == "dateDay" or len(starts) == len(self.days):
+            return RollupCube(periods, self.states, self.sketches)
+        states = {name: mergeSegmentStates(states, starts) for name, states in self.states.items()}
+        sketches = {name: sketch.mergeSegments(starts) for name, sketch in self.sketches.items()}
+        return RollupCube(periods[starts], states, sketches)
+
+    def statistics(self, lists, periodColumn="dateDay"):
+        """Time series of a resolution from the cube states
+        Args:
+            lists (dict): aggregation function -> list of variables (functions outside CUBE_FUNCTIONS and SKETCH_FUNCTIONS are skipped)
+            periodColumn (str): period column of the resolution
+        Returns:
+            pandas.DataFrame: one row per period (period column first)
+        """
+        cube = self.rollup(periodColumn)
+        columns = {periodColumn: cube.days.astype("datetime64[ns]")}
+        for func, names in lists.items():
+            for name in names:
+                if func in CUBE_FUNCTIONS:
+                    columns[name + TS_SUFFIXES[func]] = stateStatistic(cube.states[name], func)
+                elif func == "fMedian" and name in cube.sketches:
+                    columns[name + TS_SUFFIXES[func]] = cube.sketches[name].median()
+        return pd.DataFrame(columns)
+
+    def save(self, cubePath):
+        """Save the cube to a folder of npy files (written to a temporary folder, then swapped into place)"""
+        tempDir = cubePath + ".tmp"
+        shutil.rmtree(tempDir, ignore_errors=True)
+        os.makedirs(tempDir)
+        manifest = {"version": CUBE_VERSION, "cells": len(self.days), "variables": self.variables, "sketches": list(self.sketches)}
+        np.save(os.path.join(tempDir, "days.npy"), self.days, allow_pickle=False)
+        for i, name in enumerate(self.variables):
+            for field in STATE_FIELDS:
+                np.save(os.path.join(tempDir, f"v{i:04d}.{field}.npy"), self.states[name][field], allow_pickle=False)
+        for i, name in enumerate(self.sketches):
+            for part, array in self.sketches[name].arrays().items():
+                np.save(os.path.join(tempDir, f"s{i:04d}.{part}.npy"), array, allow_pickle=False)
+        with open(os.path.join(tempDir, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=4)
+        shutil.rmtree(cubePath, ignore_errors=True)
+        os.replace(tempDir, cubePath)
+        return cubePath
+
+    @classmethod
+    def load(cls, cubePath):
+        """Load a saved cube, or return None if it does not exist or has an older layout"""
+        manifestPath = os.path.join(cubePath, "manifest.json")
+        if not os.path.exists(manifestPath):
+            return None
+        with open(manifestPath, "r") as f:
+            manifest = json.load(f)
+        if manifest.get("version") != CUBE_VERSION:
+            return None
+        days = np.load(os.path.join(cubePath, "days.npy"), allow_pickle=False)
+        states = {}
+        for i, name in enumerate(manifest["variables"]):
+            states[name] = {field: np.load(os.path.join(cubePath, f"v{i:04d}.{field}.npy"), allow_pickle=False) for field in STATE_FIELDS}
+        sketches = {}
+        for i, name in enumerate(manifest.get("sketches", [])):
+            sketches[name] = QuantileSketch.fromArrays({part: np.load(os.path.join(cubePath, f"s{i:04d}.{part}.npy"), allow_pickle=False) for part in ("counts", "zeros", "params")})
+        return cls(days, states, sketches)
+
+
+def _emptyStates(size):
+    """Partial states without observations (for variables missing from one of the merged cubes)"""
+    return {
+        "count": np.zeros(size, dtype=np.int64),
+        "sum": np.zeros(size),
+        "min": np.full(size, np.inf),
+        "max": np.full(size, -np.inf),
+        "mean": np.zeros(size),
+        "m2": np.zeros(size),
+    }
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cube Time Series
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def cubeLists(codebook, table, columns):
+    """Aggregation lists of a table restricted to the functions computed from the cube states and sketches"""
+    return {func: names for func, names in aggregationLists(codebook, table, columns).items() if func in CUBE_FUNCTIONS + SKETCH_FUNCTIONS}
+
+
+def buildCubes(tables, codebook, dateColumn="dateDay", accuracy=SKETCH_ACCURACY):
+    """Build the daily cubes of the time series tables (crashes, parties, victims, cities, roads)"""
+    cubes = {}
+    for table in TS_TABLES:
+        df = tableRows(tables, table)
+        lists = cubeLists(codebook, table, df.columns)
+        variables = list(dict.fromkeys(n for func, names in lists.items() if func in CUBE_FUNCTIONS for n in names))
+        sketchVariables = list(dict.fromkeys(n for func, names in lists.items() if func in SKETCH_FUNCTIONS for n in names))
+        cubes[table] = RollupCube.fromTable(df, variables, dateColumn=dateColumn, sketchVariables=sketchVariables, accuracy=accuracy)
+    return cubes
+
+
+def appendCubes(cubes, tables, dateColumn="dateDay"):
+    """Append the records of new tables (e.g. a new quarter) to the daily cubes"""
+    return {table: cube.append(tableRows(tables, table), dateColumn=dateColumn) for table, cube in cubes.items()}
+
+
+def saveCubes(cubes, cubeDir):
+    """Save the daily cubes of the tables to a folder (one cube folder per table)"""
+    os.makedirs(cubeDir, exist_ok=True)
+    for table, cube in cubes.items():
+        cube.save(os.path.join(cubeDir, table))
+
+
+def loadCubes(cubeDir):
+    """Load the daily cubes of the tables (missing tables are left out)"""
+    cubes = {}
+    for table in TS_TABLES:
+        cube = RollupCube.load(os.path.join(cubeDir, table))
+        if cube is not None:
+            cubes[table] = cube
+    return cubes
+
+
+def cubeTimeSeries(cubes, codebook, resolutions=None, exactTables=None, dateColumn="dateDay"):
+    """Derive the tsDay, tsWeek, tsMonth, tsQuarter and tsYear series from the daily cubes
+    Args:
+        cubes (dict): table name -> RollupCube
+        codebook (Codebook): compiled codebook
+        resolutions (dict): time series name -> period column (defaults to TS_RESOLUTIONS)
+        exactTables (dict): optional raw tables (see createTimeSeries); the medians are then computed exactly from the
+            raw rows instead of the quantile sketches (validation mode)
+        dateColumn (str): collision day column of the raw tables (exact mode)
+    Returns:
+        dict: time series name -> pandas.DataFrame
+    """
+    if resolutions is None:
+        resolutions = TS_RESOLUTIONS
+    aggregates = []
+    for table in TS_TABLES:
+        cube = cubes[table]
+        lists = cubeLists(codebook, table, cube.variables + list(cube.sketches))
+        aggregate = {tsName: cube.statistics(lists, periodColumn) for tsName, periodColumn in resolutions.items()}
+        # Exact medians from the raw rows (the periods are the same, as both are sorted by day)
+        if exactTables is not None and "fMedian" in lists:
+            exact = aggregateTable(tableRows(exactTables, table), {"fMedian": lists["fMedian"]}, dateColumn=dateColumn, resolutions=resolutions)
+            for tsName, periodColumn in resolutions.items():
+                ts = aggregate[tsName].set_index(periodColumn)
+                ts.update(exact[tsName].set_index(periodColumn))
+                aggregate[tsName] = ts.reset_index()
+        aggregates.append(aggregate)
+    return mergeAggregates(aggregates, resolutions)
+
+# endregion
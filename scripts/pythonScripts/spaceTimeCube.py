@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Space Time Cube - Monthly Crash Cube and Emerging Hot Spot Analysis
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Space time cube of the crashes (square bins x months, the monthly time step of the time-enabled layers of
+# part2Maps.py), and emerging hot spot analysis of the cube (the FindHotSpots calls of part1Features.py run without a
+# time step). The crashes are counted in one bincount over (location, month) pairs; the locations of the cube are the
+# bins with at least one crash over the whole period, so every month has a count (zero included) at every location.
+# The locations share one spatial neighbor structure (binary distance band weights of the bin centers), and the Gi*
+# local sums of all the months are one sparse matrix product of the weights with the (locations x months) counts. A
+# Mann-Kendall test of the Gi* z-scores of each location (vectorized over the locations, one pass per time lag) gives
+# the trends, and the emerging hot spot patterns follow the definitions of the Emerging Hot Spot Analysis tool.
+
+import numpy as np
+import pandas as pd
+from scipy.special import ndtr
+
+from hotSpots import distanceBandWeights, giBins, giStatistics
+from findHotSpots import FEET_PER_METER, SCALE_TOLERANCE
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# First and last months of the cube (the 2013-2024 crash data)
+CUBE_START = "2013-01"
+CUBE_END = "2024-12"
+
+# Bin size and neighborhood radius of the cube (feet)
+CUBE_BIN_SIZE = 500 * FEET_PER_METER
+CUBE_NEIGHBORHOOD = 2000 * FEET_PER_METER
+
+# Share of the time steps that makes a location a persistent (intensifying, diminishing or historical) hot spot
+PERSISTENT_SHARE = 0.9
+
+# Significance level of the Mann-Kendall trends
+TREND_ALPHA = 0.05
+
+# Emerging hot spot patterns (CATEGORY codes of the Emerging Hot Spot Analysis tool; cold spots are negative)
+PATTERNS = {
+    0: "No Pattern Detected",
+    1: "New Hot Spot",
+    2: "Consecutive Hot Spot",
+    3: "Intensifying Hot Spot",
+    4: "Persistent Hot Spot",
+    5: "Diminishing Hot Spot",
+    6: "Sporadic Hot Spot",
+    7: "Oscillating Hot Spot",
+    8: "Historical Hot Spot",
+}
+PATTERNS.update({-code: name.replace("Hot Spot", "Cold Spot") for code, name in PATTERNS.items() if code > 0})
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Space Time Cube
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+class SpaceTimeCube:
+    """Crash counts of square bins by month
+    Args:
+        x, y (numpy.ndarray): point coordinates
+        times (pandas.Series): point date times
+        binSize (float): bin size
+        start, end (str): first and last months of the cube
+    """
+
+    def __init__(self, x, y, times, binSize=CUBE_BIN_SIZE, start=CUBE_START, end=CUBE_END):
+        self.binSize = binSize
+        self.months = pd.period_range(start, end, freq="M")
+        first = self.months[0]
+        times = pd.to_datetime(pd.Series(times).reset_index(drop=True))
+        month = ((times.dt.year - first.year) * 12 + times.dt.month - first.month).to_numpy(dtype=np.float64, na_value=np.nan)
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        keep = np.isfinite(x) & np.isfinite(y) & (month >= 0) & (month < len(self.months))
+        column = np.floor(x[keep] / binSize).astype(np.int64)
+        row = np.floor(y[keep] / binSize).astype(np.int64)
+        month = month[keep].astype(np.int64)
+
+        # Locations: the bins with at least one point (sorted bin keys), and the location of each point
+        if keep.any():
+            column0, row0 = column.min(), row.min()
+            width = int(column.max() - column0) + 1
+            key = (row - row0) * width + (column - column0)
+            order = np.argsort(key, kind="stable")
+            starts = np.diff(key[order], prepend=-1) != 0
+            location = np.empty(len(key), dtype=np.int64)
+            location[order] = np.cumsum(starts) - 1
+            locationKeys = key[order][starts]
+            self.column, self.row = column0 + locationKeys % width, row0 + locationKeys // width
+        else:
+            location = np.zeros(0, dtype=np.int64)
+            self.column = self.row = np.zeros(0, dtype=np.int64)
+        shape = (len(self.column), len(self.months))
+        self.counts = np.bincount(location * shape[1] + month, minlength=shape[0] * shape[1]).reshape(shape)
+
+    def centers(self):
+        """Coordinates of the centers of the locations"""
+        return (self.column + 0.5) * self.binSize, (self.row + 0.5) * self.binSize
+
+    def sliceHotSpots(self, radius=CUBE_NEIGHBORHOOD):
+        """Gi* of the counts of every month, with the shared distance band neighbors of the locations
+        Args:
+            radius (float): neighborhood radius (distance between the bin centers)
+        Returns:
+            tuple: (locations x months) z-scores, p-values and Gi_Bin classes, and the number of neighbors of each
+                location
+        """
+        # A cube without locations (no points within the extent and months) has no neighbors
+        if len(self.column) == 0:
+            empty = np.zeros(self.counts.shape)
+            return empty, np.ones(self.counts.shape), np.zeros(self.counts.shape, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        weights = distanceBandWeights(np.column_stack(self.centers()), radius * (1 + SCALE_TOLERANCE))
+        neighbors = np.diff(weights.indptr)
+        counts = self.counts.astype(np.float64)
+        column = neighbors.astype(np.float64)[:, None]
+        z, p = giStatistics(counts, weights @ counts, column, column)
+        # Months without variation (no crashes) have no z-scores
+        z = np.where(np.isnan(z), 0.0, z)
+        p = np.where(np.isnan(p), 1.0, p)
+        return z, p, giBins(z.ravel(), p.ravel()).reshape(z.shape), neighbors
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Emerging Hot Spots
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def mannKendall(series):
+    """Mann-Kendall trend test of each row of a matrix of time series (with the tie correction of the variance)
+    Args:
+        series (numpy.ndarray): (n x t) time series
+    Returns:
+        tuple: trend z-scores (continuity corrected) and two-sided p-values of the rows
+    """
+    n, t = series.shape
+    s = np.zeros(n)
+    for lag in range(1, t):
+        s += np.sign(series[:, lag:] - series[:, :-lag]).sum(axis=1)
+
+    # Tie groups of each row: runs of equal values in the sorted rows
+    ordered = np.sort(series, axis=1).ravel()
+    starts = np.flatnonzero((np.diff(ordered, prepend=np.nan) != 0) | (np.arange(n * t) % t == 0))
+    sizes = np.diff(np.append(starts, n * t)).astype(np.float64)
+    ties = np.bincount(starts // t, weights=sizes * (sizes - 1) * (2 * sizes + 5), minlength=n)
+    variance = (t * (t - 1) * (2 * t + 5) - ties) / 18.0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = np.where(variance > 0, (s - np.sign(s)) / np.sqrt(variance), 0.0)
+    return z, 2.0 * ndtr(-np.abs(z))
+
+
+def emergingPatterns(bins, trendZ, trendP, share=PERSISTENT_SHARE, alpha=TREND_ALPHA):
+    """Emerging hot and cold spot pattern of each location (see PATTERNS)
+    Args:
+        bins (numpy.ndarray): (locations x months) Gi_Bin classes (hot and cold spots at 90% confidence or more)
+        trendZ, trendP (numpy.ndarray): Mann-Kendall trend of the Gi* z-scores of each location
+        share (float): share of the months that makes a persistent hot spot
+        alpha (float): significance level of the trends
+    Returns:
+        numpy.ndarray: pattern code of each location
+    """
+    patterns = np.zeros(len(bins), dtype=np.int64)
+    t = bins.shape[1]
+    for sign in [1, -1]:
+        spot, opposite = bins * sign > 0, bins * sign < 0
+        count = spot.sum(axis=1)
+        last = spot[:, -1]
+        # Length of the final run of spots
+        misses = np.where(~spot, np.arange(t), -1).max(axis=1)
+        run = t - 1 - misses
+        persistent = count >= share * t
+        rising, falling = (trendP <= alpha) & (trendZ * sign > 0), (trendP <= alpha) & (trendZ * sign < 0)
+        conditions = [
+            (last & (count == 1), 1),
+            (last & ~persistent & (run >= 2) & (count == run), 2),
+            (last & persistent & rising, 3),
+            (last & persistent & ~rising & ~falling, 4),
+            (last & persistent & falling, 5),
+            (last & ~persistent & (count > run) & ~opposite.any(axis=1), 6),
+            (last & ~persistent & (count > run) & opposite.any(axis=1), 7),
+            (~last & persistent, 8),
+        ]
+        # The patterns of a sign are exclusive, and the hot spot patterns come first
+        for mask, code in conditions:
+            patterns[mask & (patterns == 0)] = sign * code
+    return patterns
+
+
+def emergingHotSpots(points, binSize=CUBE_BIN_SIZE, radius=CUBE_NEIGHBORHOOD, start=CUBE_START, end=CUBE_END, timeColumn="dateDatetime", xColumn="pointX", yColumn="pointY"):
+    """Emerging hot spot analysis of the monthly crash counts of square bins
+    Args:
+        points (pandas.DataFrame): point table with the coordinate and date time columns
+        binSize (float): bin size
+        radius (float): neighborhood radius
+        start, end (str): first and last months of the cube
+        timeColumn (str): date time column of the point table
+        xColumn, yColumn (str): coordinate columns of the point table
+    Returns:
+        tuple: the location table (binX, binY, pointCount, NNeighbors, HotMonths, ColdMonths, TrendZScore,
+            TrendPValue, CATEGORY, PATTERN) and the cube
+    """
+    cube = SpaceTimeCube(points[xColumn].to_numpy(dtype=np.float64, na_value=np.nan), points[yColumn].to_numpy(dtype=np.float64, na_value=np.nan), points[timeColumn], binSize, start, end)
+    z, _, bins, neighbors = cube.sliceHotSpots(radius)
+    trendZ, trendP = mannKendall(z)
+    categories = emergingPatterns(bins, trendZ, trendP)
+    x, y = cube.centers()
+    locations = pd.DataFrame({
+        "binX": x, "binY": y, "pointCount": cube.counts.sum(axis=1), "NNeighbors": neighbors,
+        "HotMonths": (bins > 0).sum(axis=1), "ColdMonths": (bins < 0).sum(axis=1),
+        "TrendZScore": trendZ, "TrendPValue": trendP, "CATEGORY": categories,
+        "PATTERN": pd.Series(categories).map(PATTERNS).to_numpy(),
+    })
+    return locations, cube
+
+# endregion
@@ -0,0 +1,393 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Spatial Join - Grid Indexed Point in Polygon Join of the Collisions and Census Blocks
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# NumPy point in polygon spatial join, equivalent to the arcpy.analysis.SpatialJoin of the collisions with the census
+# blocks (part1Features.py section 2.3: JOIN_ONE_TO_ONE, KEEP_ALL, INTERSECT), that runs without ArcGIS. The polygon
+# rings (outer rings, holes and multipart polygons) are flattened into one edge array, and a uniform grid over the
+# polygon extent lists the polygons whose bounding box overlaps each cell. Every point is tested only against the
+# candidate polygons of its cell, with a vectorized even-odd ray casting over the edges of the candidates (processed
+# in chunks, so millions of points run in bounded memory). Points on a polygon boundary (within the XY tolerance of an
+# edge) intersect the polygon, as in the INTERSECT match option, and a point matching several polygons (e.g. on a
+# shared block boundary) is joined to the first one, as the one to one join keeps the first join feature.
+
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Average number of polygons and of polygon edges per grid cell (the default grid cell size meets both)
+GRID_POLYGONS_PER_CELL = 2.0
+GRID_EDGES_PER_CELL = 8.0
+
+# Maximum number of point x edge tests per chunk of the ray casting
+CHUNK_TESTS = 4_000_000
+
+# Name of the join count column (as in the SpatialJoin output)
+JOIN_COUNT = "Join_Count"
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Polygon Index
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def expandRanges(counts):
+    """Expand ranges of lengths counts: the range of each element and the position of each element within its range"""
+    owner = np.repeat(np.arange(len(counts)), counts)
+    return owner, np.arange(len(owner)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+
+class PolygonIndex:
+    """Uniform grid index of a set of polygons for vectorized point in polygon queries
+    Args:
+        polygons (list): one list of rings per polygon, each ring an (n x 2) array of x, y vertices (outer rings and
+            holes of all the parts; the rings do not need to be closed)
+        cellSize (float): grid cell size (default: about GRID_POLYGONS_PER_CELL polygons per cell)
+    """
+
+    def __init__(self, polygons, cellSize=None):
+        self.count = len(polygons)
+
+        # Edges of all the rings, grouped by polygon (edgeStarts: CSR offsets of the edges of each polygon)
+        starts, ends, owners = [], [], []
+        for i, rings in enumerate(polygons):
+            for ring in rings:
+                ring = np.asarray(ring, dtype=np.float64).reshape(-1, 2)
+                if len(ring) > 1 and np.array_equal(ring[0], ring[-1]):
+                    ring = ring[:-1]
+                if len(ring) < 2:
+                    continue
+                starts.append(ring)
+                ends.append(np.roll(ring, -1, axis=0))
+                owners.append(np.full(len(ring), i, dtype=np.int64))
+        if not starts:
+            raise ValueError("The polygons have no edges")
+        start = np.concatenate(starts)
+        end = np.concatenate(ends)
+        edgePolygon = np.concatenate(owners)
+        self.x1, self.y1 = start[:, 0], start[:, 1]
+        self.x2, self.y2 = end[:, 0], end[:, 1]
+        self.edgeStarts = np.searchsorted(edgePolygon, np.arange(self.count + 1))
+
+        # Bounding boxes of the polygons (empty polygons get an inverted box that matches no cell)
+        lengths = np.diff(self.edgeStarts)
+        nonEmpty = lengths > 0
+        xmin = np.full(self.count, np.inf)
+        ymin = np.full(self.count, np.inf)
+        xmax = np.full(self.count, -np.inf)
+        ymax = np.full(self.count, -np.inf)
+        offsets = self.edgeStarts[:-1][nonEmpty]
+        xmin[nonEmpty] = np.minimum.reduceat(self.x1, offsets)
+        ymin[nonEmpty] = np.minimum.reduceat(self.y1, offsets)
+        xmax[nonEmpty] = np.maximum.reduceat(self.x1, offsets)
+        ymax[nonEmpty] = np.maximum.reduceat(self.y1, offsets)
+        self.xmin, self.ymin, self.xmax, self.ymax = xmin, ymin, xmax, ymax
+        self.extent = (xmin[nonEmpty].min(), ymin[nonEmpty].min(), xmax[nonEmpty].max(), ymax[nonEmpty].max())
+
+        # Grid cell size and dimensions
+        width = max(self.extent[2] - self.extent[0], 1e-9)
+        height = max(self.extent[3] - self.extent[1], 1e-9)
+        if cellSize is None:
+            cells = max(nonEmpty.sum() / GRID_POLYGONS_PER_CELL, len(edgePolygon) / GRID_EDGES_PER_CELL, 1.0)
+            cellSize = np.sqrt(width * height / cells)
+        self.cellSize = float(cellSize)
+        self.columns = int(np.floor(width / self.cellSize)) + 1
+        self.rows = int(np.floor(height / self.cellSize)) + 1
+
+        # Polygons of each grid cell (CSR: cellStarts offsets into cellPolygons, polygons in increasing order)
+        c0, r0 = self._cells(xmin[nonEmpty], ymin[nonEmpty])
+        c1, r1 = self._cells(xmax[nonEmpty], ymax[nonEmpty])
+        ids = np.flatnonzero(nonEmpty)
+        spanC = c1 - c0 + 1
+        spanR = r1 - r0 + 1
+        repeats = spanC * spanR
+        owner, local = expandRanges(repeats)
+        pairPolygon = ids[owner]
+        pairCell = (r0[owner] + local // spanC[owner]) * self.columns + c0[owner] + local % spanC[owner]
+        order = np.lexsort((pairPolygon, pairCell))
+        self.cellPolygons = pairPolygon[order]
+        self.cellStarts = np.searchsorted(pairCell[order], np.arange(self.rows * self.columns + 1))
+
+        # Edges of each polygon in each grid row spanned by the edge, keyed by (polygon, row, grid column of the right
+        # end of the edge) and sorted by key: the edges that can cross the ray of a point towards +x (or touch the point)
+        # are the contiguous range from the column of the point to the end of its (polygon, row)
+        r0 = self._rows(np.minimum(self.y1, self.y2))
+        r1 = self._rows(np.maximum(self.y1, self.y2))
+        right = self._columns(np.maximum(self.x1, self.x2))
+        owner, local = expandRanges(r1 - r0 + 1)
+        keys = (edgePolygon[owner] * self.rows + r0[owner] + local) * self.columns + right[owner]
+        order = np.argsort(keys, kind="stable")
+        self.rowEdges = owner[order]
+        self.rowKeys = keys[order]
+
+    def _cells(self, x, y):
+        """Grid column and row of coordinates (clipped to the grid)"""
+        return self._columns(x), self._rows(y)
+
+    def _columns(self, x):
+        """Grid column of x coordinates (clipped to the grid)"""
+        return np.clip(np.floor((x - self.extent[0]) / self.cellSize), 0, self.columns - 1).astype(np.int64)
+
+    def _rows(self, y):
+        """Grid row of y coordinates (clipped to the grid)"""
+        return np.clip(np.floor((y - self.extent[1]) / self.cellSize), 0, self.rows - 1).astype(np.int64)
+
+    def candidates(self, x, y, tolerance=0.0):
+        """Candidate (point, polygon) pairs: the polygons of the grid cells within the tolerance of each point, whose
+        bounding box (expanded by the tolerance) contains the point
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            tolerance (float): search tolerance around the points
+        Returns:
+            tuple: point and polygon index arrays of the pairs (sorted by point, then polygon)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        inside = (x >= self.extent[0] - tolerance) & (x <= self.extent[2] + tolerance) & (y >= self.extent[1] - tolerance) & (y <= self.extent[3] + tolerance)
+        points = np.flatnonzero(inside)
+        px, py = x[points], y[points]
+
+        # Grid cells of the tolerance box of each point (a single cell for most points)
+        c0, r0 = self._cells(px - tolerance, py - tolerance)
+        c1, r1 = self._cells(px + tolerance, py + tolerance)
+        spanC = c1 - c0 + 1
+        spans = spanC * (r1 - r0 + 1)
+        owner, local = expandRanges(spans)
+        cellPoint = points[owner]
+        cell = (r0[owner] + local // spanC[owner]) * self.columns + c0[owner] + local % spanC[owner]
+
+        # Polygons listed in the cells
+        counts = self.cellStarts[cell + 1] - self.cellStarts[cell]
+        owner, local = expandRanges(counts)
+        pairPoint = cellPoint[owner]
+        pairPolygon = self.cellPolygons[self.cellStarts[cell][owner] + local]
+        if np.any(spans > 1):
+            # A polygon can be listed in several cells of a point
+            pairs = np.sort(pairPoint * self.count + pairPolygon)
+            pairs = pairs[np.diff(pairs, prepend=-1) != 0]
+            pairPoint, pairPolygon = pairs // self.count, pairs % self.count
+
+        # Bounding box filter
+        px, py = x[pairPoint], y[pairPoint]
+        keep = (px >= self.xmin[pairPolygon] - tolerance) & (px <= self.xmax[pairPolygon] + tolerance)
+        keep &= (py >= self.ymin[pairPolygon] - tolerance) & (py <= self.ymax[pairPolygon] + tolerance)
+        return pairPoint[keep], pairPolygon[keep]
+
+    def _pairRows(self, pairPolygon, px, py, tolerance):
+        """Grid rows of the (point, polygon) pairs, with the ranges of the polygon edges to test in each row
+        Args:
+            pairPolygon (numpy.ndarray): polygon index of the pairs
+            px, py (numpy.ndarray): coordinates of the point of the pairs
+            tolerance (float): XY tolerance (the rows and columns within the tolerance of the point are included)
+        Returns:
+            tuple: pair of each entry, start and count of its edges in rowEdges, and whether the entry is the row of
+                the point (whose edges are counted in the ray casting)
+        """
+        column = self._columns(px - tolerance)
+        r0 = self._rows(py - tolerance)
+        r1 = self._rows(py + tolerance)
+        entryPair, local = expandRanges(r1 - r0 + 1)
+        row = r0[entryPair] + local
+        rowKey = pairPolygon[entryPair] * self.rows + row
+        start = np.searchsorted(self.rowKeys, rowKey * self.columns + column[entryPair])
+        count = np.searchsorted(self.rowKeys, (rowKey + 1) * self.columns) - start
+        return entryPair, start, count, row == self._rows(py)[entryPair]
+
+    def _testPairs(self, px, py, pairs, entryPair, start, count, pointRow, tolerance):
+        """Even-odd ray casting and boundary test of (point, polygon) pairs over the edges of their grid rows
+        Returns:
+            numpy.ndarray: True for the pairs whose point is inside or on the boundary of the polygon
+        """
+        entry, local = expandRanges(count)
+        edge = self.rowEdges[start[entry] + local]
+        pairIndex = entryPair[entry]
+        x, y = px[pairIndex], py[pairIndex]
+        x1, y1, x2, y2 = self.x1[edge], self.y1[edge], self.x2[edge], self.y2[edge]
+
+        # Crossings of the ray from the point towards +x (half open rule on the edge end points), counted once per edge
+        # from the row of the point
+        straddle = ((y1 > y) != (y2 > y)) & pointRow[entry]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            crossX = x1 + (y - y1) * (x2 - x1) / (y2 - y1)
+        crossings = np.bincount(pairIndex[straddle & (x < crossX)], minlength=pairs)
+        inside = (crossings % 2) == 1
+
+        # Points on an edge: zero (or within tolerance) distance to the segment
+        dx, dy = x2 - x1, y2 - y1
+        length2 = dx * dx + dy * dy
+        if tolerance > 0:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                t = np.clip(((x - x1) * dx + (y - y1) * dy) / length2, 0.0, 1.0)
+            t = np.where(length2 > 0, t, 0.0)
+            ex, ey = x1 + t * dx - x, y1 + t * dy - y
+            onEdge = ex * ex + ey * ey <= tolerance * tolerance
+        else:
+            cross = (x - x1) * dy - (y - y1) * dx
+            onEdge = (cross == 0) & (x >= np.minimum(x1, x2)) & (x <= np.maximum(x1, x2)) & (y >= np.minimum(y1, y2)) & (y <= np.maximum(y1, y2))
+        boundary = np.bincount(pairIndex[onEdge], minlength=pairs) > 0
+        return inside | boundary
+
+    def locate(self, x, y, tolerance=0.0):
+        """All the (point, polygon) pairs where the point intersects the polygon (inside or on its boundary)
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            tolerance (float): XY tolerance of the boundary test (0: exact on the edge)
+        Returns:
+            tuple: point and polygon index arrays of the matches (sorted by point, then polygon)
+        """
+        x = np.asarray(x, dtype=np.float64)
+        y = np.asarray(y, dtype=np.float64)
+        pairPoint, pairPolygon = self.candidates(x, y, tolerance)
+        px, py = x[pairPoint], y[pairPoint]
+        entryPair, start, count, pointRow = self._pairRows(pairPolygon, px, py, tolerance)
+
+        # Chunks of pairs with a bounded number of edge tests
+        cumulative = np.cumsum(np.bincount(entryPair, weights=count, minlength=len(pairPoint)))
+        total = int(cumulative[-1]) if len(cumulative) else 0
+        breaks = np.searchsorted(cumulative, np.arange(CHUNK_TESTS, total, CHUNK_TESTS), side="right")
+        bounds = np.unique(np.concatenate([[0], breaks, [len(pairPoint)]]))
+        entries = np.searchsorted(entryPair, bounds)
+        keep = np.zeros(len(pairPoint), dtype=bool)
+        for first, last, e0, e1 in zip(bounds[:-1], bounds[1:], entries[:-1], entries[1:]):
+            keep[first:last] = self._testPairs(
+                px[first:last], py[first:last], last - first, entryPair[e0:e1] - first, start[e0:e1], count[e0:e1], pointRow[e0:e1], tolerance
+            )
+        return pairPoint[keep], pairPolygon[keep]
+
+    def firstMatch(self, x, y, tolerance=0.0):
+        """First matching polygon (lowest index) and number of matching polygons of each point
+        Args:
+            x, y (numpy.ndarray): point coordinates
+            tolerance (float): XY tolerance of the boundary test
+        Returns:
+            tuple: polygon index of each point (-1 if none) and join count of each point
+        """
+        pairPoint, pairPolygon = self.locate(x, y, tolerance)
+        matches = np.bincount(pairPoint, minlength=len(x))
+        polygon = np.full(len(x), -1, dtype=np.int64)
+        if len(pairPoint):
+            first = np.flatnonzero(np.diff(pairPoint, prepend=-1) != 0)
+            polygon[pairPoint[first]] = pairPolygon[first]
+        return polygon, matches
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Spatial Join
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def spatialJoin(points, polygons, attributes, xColumn="pointX", yColumn="pointY", columns=None, tolerance=0.0, index=None):
+    """One to one INTERSECT spatial join of points with polygons, keeping all the points (KEEP_ALL)
+    Args:
+        points (pandas.DataFrame): point table with the x and y coordinate columns
+        polygons (list): polygon rings (see PolygonIndex), in the row order of the attributes table
+        attributes (pandas.DataFrame): polygon attribute table
+        xColumn, yColumn (str): coordinate columns of the point table
+        columns (list): polygon attribute columns to join (default: all, except those already in the point table)
+        tolerance (float): XY tolerance of the boundary test
+        index (PolygonIndex): prebuilt index of the polygons (built if None)
+    Returns:
+        pandas.DataFrame: the point table with the Join_Count and the joined polygon attribute columns (missing values
+            for the points outside all the polygons)
+    """
+    if index is None:
+        index = PolygonIndex(polygons)
+    if columns is None:
+        columns = [c for c in attributes.columns if c not in points.columns]
+    polygon, matches = index.firstMatch(points[xColumn].to_numpy(), points[yColumn].to_numpy(), tolerance)
+
+    # Gather the attributes of the matched polygons (a missing row for the unmatched points)
+    joined = attributes[columns].reset_index(drop=True).reindex(np.where(polygon < 0, len(attributes), polygon))
+    joined.index = points.index
+    result = points.copy()
+    result.insert(0, JOIN_COUNT, matches.astype(np.int64))
+    return pd.concat([result, joined], axis=1)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Feature Class Reading
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def polygonRings(geometry):
+    """Rings of an arcpy polygon geometry (the interior rings of a part follow a None separator)"""
+    rings = []
+    for part in geometry:
+        ring = []
+        for point in part:
+            if point is None:
+                if ring:
+                    rings.append(np.array(ring))
+                ring = []
+            else:
+                ring.append((point.X, point.Y))
+        if ring:
+            rings.append(np.array(ring))
+    return rings
+
+
+def readPolygons(featureClass, fields):
+    """Read the polygons and attributes of a feature class (requires arcpy)
+    Args:
+        featureClass (str): path to the polygon feature class
+        fields (list): attribute fields to read
+    Returns:
+        tuple: polygon rings (see PolygonIndex) and attribute table (pandas.DataFrame)
+    """
+    import arcpy
+    polygons, rows = [], []
+    with arcpy.da.SearchCursor(featureClass, ["SHAPE@"] + list(fields)) as cursor:
+        for row in cursor:
+            polygons.append([] if row[0] is None else polygonRings(row[0]))
+            rows.append(row[1:])
+    return polygons, pd.DataFrame.from_records(rows, columns=list(fields))
+
+
+def readPoints(featureClass, fields, xColumn="pointX", yColumn="pointY"):
+    """Read the coordinates and attributes of a point feature class (requires arcpy)
+    Args:
+        featureClass (str): path to the point feature class
+        fields (list): attribute fields to read
+        xColumn, yColumn (str): names of the coordinate columns
+    Returns:
+        pandas.DataFrame: the point table
+    """
+    import arcpy
+    rows = []
+    with arcpy.da.SearchCursor(featureClass, ["SHAPE@X", "SHAPE@Y"] + list(fields)) as cursor:
+        for row in cursor:
+            rows.append(row)
+    return pd.DataFrame.from_records(rows, columns=[xColumn, yColumn] + list(fields))
+
+
+def geoJsonPolygons(features):
+    """Polygon rings of GeoJSON features (Polygon and MultiPolygon geometries), for reading exports without arcpy
+    Args:
+        features (list): GeoJSON features (the "features" list of a FeatureCollection)
+    Returns:
+        tuple: polygon rings (see PolygonIndex) and attribute table (pandas.DataFrame) of the feature properties
+    """
+    polygons = []
+    for feature in features:
+        geometry = feature.get("geometry") or {}
+        if geometry.get("type") == "Polygon":
+            parts = [geometry["coordinates"]]
+        elif geometry.get("type") == "MultiPolygon":
+            parts = geometry["coordinates"]
+        else:
+            parts = []
+        polygons.append([np.asarray(ring, dtype=np.float64)[:, :2] for part in parts for ring in part])
+    return polygons, pd.DataFrame([feature.get("properties") or {} for feature in features])
+
+# endregion
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# STL Batch - Vectorized Seasonal-Trend Decomposition of Many Series
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Seasonal-trend decomposition by LOESS (STL, Cleveland et al. 1990, as the R stl function used by createStlPlot in
+# createProjectFunctions.R) of a 2-D array of series (e.g. every city x every metric of the weekly time series). All
+# the series share the same time positions, so each LOESS smoother has the same neighbor windows and tricube distance
+# weights for every series: the neighbors are gathered once into a (series x points x window) block, and the local
+# fits of all the series are computed with array operations (the robustness weights, when used, differ per series).
+
+import numpy as np
+import pandas as pd
+
+from timeSeriesAggr import periodStarts
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Frequency of the weekly time series (part2CreateTimeSeries.R: ts(..., frequency = 53))
+WEEK_PERIOD = 53
+
+# Frequency of the monthly time series
+MONTH_PERIOD = 12
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region LOESS Smoothing
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _nextOdd(x):
+    """Smallest odd integer not less than x"""
+    x = int(np.ceil(x))
+    return x if x % 2 == 1 else x + 1
+
+
+def loessNeighbors(n, window, xEval):
+    """Neighbor windows and tricube weights of a LOESS smoother on the positions 0..n-1 (as the STL stless routine)
+    Args:
+        n (int): number of data points
+        window (int): LOESS window (number of neighbors)
+        xEval (numpy.ndarray): evaluation positions (may extend beyond the data)
+    Returns:
+        tuple: (neighbor indexes (points x q), tricube weights (points x q))
+    """
+    q = min(window, n)
+    xEval = np.asarray(xEval, dtype=np.float64)
+    left = np.clip(np.ceil(xEval - (q - 1) / 2).astype(np.int64), 0, n - q)
+    index = left[:, None] + np.arange(q)
+    h = np.maximum(xEval - left, left + q - 1 - xEval)
+    if window > n:
+        h += (window - n) // 2
+    distance = np.abs(index - xEval[:, None])
+    h = h[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        weights = np.where(distance <= 0.001 * h, 1.0, np.where(distance <= 0.999 * h, (1 - (distance / h) ** 3) ** 3, 0.0))
+    return index, weights
+
+
+def loessSmooth(y, window, degree, xEval=None, rho=None):
+    """LOESS smoothing of all the series of a 2-D array at once
+    Args:
+        y (numpy.ndarray): series (series x points)
+        window (int): LOESS window
+        degree (int): local polynomial degree (0 or 1)
+        xEval (numpy.ndarray): evaluation positions (defaults to the data positions)
+        rho (numpy.ndarray): optional robustness weights (series x points)
+    Returns:
+        numpy.ndarray: smoothed values (series x evaluation points)
+    """
+    n = y.shape[1]
+    if xEval is None:
+        xEval = np.arange(n, dtype=np.float64)
+    index, weights = loessNeighbors(n, window, xEval)
+    values = y[:, index]
+    w = weights[None, :, :] if rho is None else weights[None, :, :] * rho[:, index]
+    total = w.sum(axis=2, keepdims=True)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        a = w / total
+        if degree >= 1:
+            # Local linear fit (skipped where the neighbor positions have no spread)
+            xs = index[None, :, :].astype(np.float64)
+            center = (a * xs).sum(axis=2, keepdims=True)
+            spread = (a * (xs - center) ** 2).sum(axis=2, keepdims=True)
+            slope = np.where(np.sqrt(spread) > 0.001 * (n - 1), (np.asarray(xEval)[None, :, None] - center) / spread, 0.0)
+            a = a * (slope * (xs - center) + 1)
+        fitted = (a * values).sum(axis=2)
+    # Points without positive weights fall back to the unweighted mean of their neighbors
+    return np.where(total[:, :, 0] > 0, fitted, values.mean(axis=2))
+
+
+def _movingAverage(y, width):
+    """Moving average of the series of a 2-D array (length n - width + 1)"""
+    cumulative = np.concatenate([np.zeros((y.shape[0], 1)), np.cumsum(y, axis=1)], axis=1)
+    return (cumulative[:, width:] - cumulative[:, :-width]) / width
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region STL Decomposition
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _cycleSubseries(y, period, window, degree, rho):
+    """Smooth the cycle-subseries of all the series, extended by one period at each end (series x n + 2 * period)"""
+    count, n = y.shape
+    result = np.empty((count, n + 2 * period))
+    full, extra = divmod(n, period)
+    # Subseries of the same length are smoothed together (positions k < extra have one more cycle)
+    for positions, length in ((np.arange(extra), full + 1), (np.arange(extra, period), full)):
+        if len(positions) == 0 or length == 0:
+            continue
+        take = positions[None, :] + period * np.arange(length)[:, None]
+        sub = y[:, take].transpose(0, 2, 1).reshape(count * len(positions), length)
+        subRho = None if rho is None else rho[:, take].transpose(0, 2, 1).reshape(count * len(positions), length)
+        smoothed = loessSmooth(sub, window, degree, np.arange(-1, length + 1, dtype=np.float64), subRho)
+        smoothed = smoothed.reshape(count, len(positions), length + 2)
+        result[:, positions[None, :] + period * np.arange(length + 2)[:, None]] = smoothed.transpose(0, 2, 1)
+    return result
+
+
+def stlBatch(y, period, seasonalWindow="periodic", seasonalDegree=0, trendWindow=None, trendDegree=1, lowpassWindow=None, lowpassDegree=None, robust=False, inner=None, outer=None):
+    """STL decomposition of many series at once (same defaults as the R stl function)
+    Args:
+        y (numpy.ndarray): series (series x points), without missing values
+        period (int): frequency of the series (e.g. 53 for the weekly series)
+        seasonalWindow (int or str): seasonal LOESS window, or 'periodic' (constant seasonal pattern)
+        seasonalDegree (int): seasonal LOESS degree
+        trendWindow (int): trend LOESS window (defaults to the R stl default)
+        trendDegree (int): trend LOESS degree
+        lowpassWindow (int): low-pass LOESS window (defaults to the next odd integer of the period)
+        lowpassDegree (int): low-pass LOESS degree (defaults to the trend degree)
+        robust (bool): use robustness weights (outer iterations)
+        inner (int): number of inner iterations (defaults to 1 if robust, 2 otherwise)
+        outer (int): number of outer (robustness) iterations (defaults to 15 if robust, 0 otherwise)
+    Returns:
+        dict: 'seasonal', 'trend' and 'remainder' arrays (series x points)
+    """
+    y = np.atleast_2d(np.asarray(y, dtype=np.float64))
+    count, n = y.shape
+    if not np.isfinite(y).all():
+        raise ValueError("STL series cannot have missing values")
+    if n <= 2 * period:
+        raise ValueError(f"STL series must span more than two periods ({2 * period} points)")
+
+    # Window defaults (R stl)
+    periodic = isinstance(seasonalWindow, str)
+    if periodic:
+        seasonalWindow, seasonalDegree = 10 * n + 1, 0
+    seasonalWindow = _nextOdd(seasonalWindow)
+    if trendWindow is None:
+        trendWindow = _nextOdd(1.5 * period / (1 - 1.5 / seasonalWindow))
+    if lowpassWindow is None:
+        lowpassWindow = _nextOdd(period)
+    if lowpassDegree is None:
+        lowpassDegree = trendDegree
+    if inner is None:
+        inner = 1 if robust else 2
+    if outer is None:
+        outer = 15 if robust else 0
+
+    trend = np.zeros_like(y)
+    rho = None
+    for iteration in range(outer + 1):
+        for _ in range(inner):
+            # Cycle-subseries smoothing of the detrended series, then removal of its low-frequency part
+            cycle = _cycleSubseries(y - trend, period, seasonalWindow, seasonalDegree, rho)
+            lowpass = _movingAverage(_movingAverage(_movingAverage(cycle, period), period), 3)
+            lowpass = loessSmooth(lowpass, lowpassWindow, lowpassDegree)
+            seasonal = cycle[:, period:period + n] - lowpass
+            # Trend smoothing of the deseasonalized series
+            trend = loessSmooth(y - seasonal, trendWindow, trendDegree, rho=rho)
+        if iteration < outer:
+            # Bisquare robustness weights from the remainders (6 times their median absolute value)
+            residual = np.abs(y - seasonal - trend)
+            scale = 6 * np.median(residual, axis=1, keepdims=True)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                u = residual / scale
+            rho = np.where(u <= 0.001, 1.0, np.where(u <= 0.999, (1 - u ** 2) ** 2, 0.0))
+
+    # Periodic seasonal components are averaged by cycle position (as R stl)
+    if periodic:
+        cyclePosition = np.arange(n) % period
+        means = np.stack([seasonal[:, cyclePosition == k].mean(axis=1) for k in range(period)], axis=1)
+        seasonal = means[:, cyclePosition]
+    return {"seasonal": seasonal, "trend": trend, "remainder": y - seasonal - trend}
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Series Panels
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def seriesPanel(df, metrics, groupColumn="city", periodColumn="dateWeek", dateColumn="dateDay"):
+    """Sum the metrics of every group by period into a 2-D panel of series (missing periods are zero)
+    Args:
+        df (pandas.DataFrame): rows to aggregate (e.g. the collisions rows with crashTag == 1)
+        metrics (list): metric columns (summed by group and period)
+        groupColumn (str): group column (e.g. 'city')
+        periodColumn (str): period of the series ('dateWeek', 'dateMonth', ...)
+        dateColumn (str): collision day column
+    Returns:
+        tuple: (pandas.MultiIndex of (group, metric) series, period start dates, numpy.ndarray (series x periods))
+    """
+    days = pd.to_datetime(df[dateColumn]).to_numpy(dtype="datetime64[D]")
+    valid = ~np.isnat(days)
+    periods = periodStarts(days[valid], periodColumn)
+    groupCodes, groups = pd.factorize(df[groupColumn].to_numpy()[valid], sort=True)
+    keep = groupCodes >= 0
+
+    # Complete range of periods (every day mapped to its period, so the empty periods are included)
+    allDays = np.arange(periods.min(), periods.max() + 1, dtype="datetime64[D]")
+    allPeriods = np.unique(periodStarts(allDays, periodColumn))
+    periodCodes = np.searchsorted(allPeriods, periods)
+
+    flat = groupCodes[keep] * len(allPeriods) + periodCodes[keep]
+    panels = []
+    for metric in metrics:
+        values = pd.to_numeric(df[metric], errors="coerce").to_numpy(dtype=np.float64, na_value=0.0)[valid][keep]
+        sums = np.bincount(flat, weights=np.nan_to_num(values), minlength=len(groups) * len(allPeriods))
+        panels.append(sums.reshape(len(groups), len(allPeriods)))
+    # Series ordered by group, then by metric
+    panel = np.stack(panels, axis=1).reshape(len(groups) * len(metrics), len(allPeriods))
+    index = pd.MultiIndex.from_product([groups, metrics], names=[groupColumn, "metric"])
+    return index, allPeriods.astype("datetime64[ns]"), panel
+
+
+def stlPanel(df, metrics, groupColumn="city", periodColumn="dateWeek", period=WEEK_PERIOD, **kwargs):
+    """STL decomposition of every group x metric series of a table in one batch (see seriesPanel and stlBatch)
+    Returns:
+        dict: 'index' (group, metric), 'periods', and the 'raw', 'seasonal', 'trend' and 'remainder' arrays
+    """
+    index, periods, panel = seriesPanel(df, metrics, groupColumn=groupColumn, periodColumn=periodColumn)
+    result = stlBatch(panel, period, **kwargs)
+    return {"index": index, "periods": periods, "raw": panel, **result}
+
+# endregion
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Summarize Within - One Pass Crash Summaries of Multiple Polygon Layers
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# One pass equivalent of the four arcpy.analysis.SummarizeWithin calls of part1Features.py (roadsMajorBuffers,
+# roadsMajorSplitBuffer, blocks and cities, with the same sum_fields list). The polygons of all the layers are indexed
+# together (spatialJoin.PolygonIndex, with the polygon ids of each layer offset after the previous layers), so the
+# crash points are located once, and every (point, polygon) match is kept: a point in overlapping buffers counts in
+# each of them (many to many membership). The Sum and Mean statistics of all the layers are then bincount reductions
+# over the matches, and the output columns follow the SummarizeWithin names (Point_Count, SUM_field, MEAN_field).
+
+import numpy as np
+import pandas as pd
+
+from spatialJoin import PolygonIndex
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Crash summary fields and statistics of the SummarizeWithin calls (part1Features.py)
+SUM_FIELDS = [
+    ["crashTag", "Sum"],
+    ["partyCount", "Sum"],
+    ["victimCount", "Sum"],
+    ["numberKilled", "Sum"],
+    ["numberInj", "Sum"],
+    ["countSevereInj", "Sum"],
+    ["countVisibleInj", "Sum"],
+    ["countComplaintPain", "Sum"],
+    ["countCarKilled", "Sum"],
+    ["countCarInj", "Sum"],
+    ["countPedKilled", "Sum"],
+    ["countPedInj", "Sum"],
+    ["countBicKilled", "Sum"],
+    ["countBicInj", "Sum"],
+    ["countMcKilled", "Sum"],
+    ["countMcInj", "Sum"],
+    ["collSeverityNum", "Mean"],
+    ["collSeverityRankNum", "Mean"],
+]
+
+# Output field prefixes of the summary statistics (as in the SummarizeWithin output)
+STAT_PREFIXES = {"Sum": "SUM", "Mean": "MEAN"}
+
+# Name of the point count column
+POINT_COUNT = "Point_Count"
+
+# Polygon layers of the crash summaries (part1Features.py)
+SUMMARY_LAYERS = ["roadsMajorBuffers", "roadsMajorSplitBuffer", "blocks", "cities"]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Summarize Within
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def layerIndex(layers):
+    """Build one polygon index over the polygons of several layers
+    Args:
+        layers (dict): layer name -> (polygon rings, attribute table), see spatialJoin.readPolygons
+    Returns:
+        tuple: the PolygonIndex and the offsets of the polygon ids of each layer (layer name -> first polygon id)
+    """
+    polygons, offsets = [], {}
+    for name, (rings, _) in layers.items():
+        offsets[name] = len(polygons)
+        polygons.extend(rings)
+    return PolygonIndex(polygons), offsets
+
+
+def summaryStatistics(points, pairPoint, pairGroup, groups, sumFields=SUM_FIELDS):
+    """Point count and summary statistics of groups of points (bincount reductions over the (point, group) matches)
+    Args:
+        points (pandas.DataFrame): point table with the summary fields
+        pairPoint (numpy.ndarray): point row of each match
+        pairGroup (numpy.ndarray): group (polygon) of each match
+        groups (int): number of groups
+        sumFields (list): [field, statistic] pairs (statistics: Sum, Mean)
+    Returns:
+        dict: output column (Point_Count, SUM_field, MEAN_field) -> values of the groups (missing values are skipped,
+            and the mean of a group without values is NaN)
+    """
+    for field, stat in sumFields:
+        if stat not in STAT_PREFIXES:
+            raise ValueError(f"Unsupported summary statistic {stat} for {field}")
+    statistics = {POINT_COUNT: np.bincount(pairGroup, minlength=groups).astype(np.int64)}
+    for field, stat in sumFields:
+        values = pd.to_numeric(points[field], errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)[pairPoint]
+        valid = ~np.isnan(values)
+        sums = np.bincount(pairGroup[valid], weights=values[valid], minlength=groups)
+        if stat == "Mean":
+            n = np.bincount(pairGroup[valid], minlength=groups)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                sums = np.where(n > 0, sums / n, np.nan)
+        statistics[f"{STAT_PREFIXES[stat]}_{field}"] = sums
+    return statistics
+
+
+def summarizeWithin(points, layers, sumFields=SUM_FIELDS, xColumn="pointX", yColumn="pointY", keepAll=True, tolerance=0.0, index=None):
+    """Summarize the points within the polygons of several layers in one pass
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the summary fields
+        layers (dict): layer name -> (polygon rings, attribute table), see spatialJoin.readPolygons
+        sumFields (list): [field, statistic] pairs (statistics: Sum, Mean)
+        xColumn, yColumn (str): coordinate columns of the point table
+        keepAll (bool): keep the polygons without points (KEEP_ALL), or only the polygons with points (ONLY_INTERSECTING)
+        tolerance (float): XY tolerance of the polygon boundaries
+        index (tuple): prebuilt (PolygonIndex, offsets) of the layers (see layerIndex)
+    Returns:
+        dict: layer name -> attribute table with the Point_Count and the summary statistic columns
+    """
+    if index is None:
+        index = layerIndex(layers)
+    polygonIndex, offsets = index
+
+    # Locate the points once in the polygons of all the layers (all the matches), and summarize the matches of the
+    # polygons of all the layers together
+    pairPoint, pairPolygon = polygonIndex.locate(points[xColumn].to_numpy(), points[yColumn].to_numpy(), tolerance)
+    statistics = summaryStatistics(points, pairPoint, pairPolygon, polygonIndex.count, sumFields)
+
+    # Split the statistics by layer
+    summaries = {}
+    for name, (rings, attributes) in layers.items():
+        layer = slice(offsets[name], offsets[name] + len(rings))
+        summary = attributes.reset_index(drop=True).copy()
+        for column, values in statistics.items():
+            summary[column] = values[layer]
+        summaries[name] = summary if keepAll else summary[summary[POINT_COUNT] > 0].reset_index(drop=True)
+    return summaries
+
+# endregion
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+# Regression checks of the road distances (crashes without coordinates)
+
+import os, sys
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from roadDistance import SegmentIndex, roadDistances
+
+
+ROADS = [[np.array([[0.0, 0.0], [1000.0, 0.0]])], [np.array([[0.0, 800.0], [0.0, 2000.0]])]]
+
+
+def test_nearestSegmentMissingCoordinates():
+    index = SegmentIndex(ROADS)
+    x = np.array([100.0, np.nan, 50.0, np.inf])
+    y = np.array([30.0, 10.0, np.nan, 5.0])
+    for maxDistance in (None, 500.0):
+        distance, segment = index.nearestSegment(x, y, maxDistance)
+        assert distance[0] == 30.0 and segment[0] == 0
+        assert np.isinf(distance[1:]).all() and (segment[1:] == -1).all()
+
+
+def test_roadDistancesMissingCoordinates():
+    points = pd.DataFrame({"pointX": [100.0, None, 10.0], "pointY": [30.0, None, 900.0]})
+    result = roadDistances(points, ROADS)
+    assert result["distToMajorRoad"].iloc[0] == 30.0
+    assert np.isnan(result["distToMajorRoad"].iloc[1])
+    assert result["distToMajorRoad"].iloc[2] == 10.0
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Time Series Aggregation - Codebook-Driven Daily to Yearly Time Series
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Time series aggregation engine (part2CreateTimeSeries.R). The aggregation lists of each table are read from the
+# tsAggr flags of the codebook, and the tsDay, tsWeek, tsMonth, tsQuarter and tsYear series are computed in a single
+# grouped pass per table: the rows are sorted once by day, and since the week, month, quarter and year periods are
+# monotonic in the day, every resolution is a set of contiguous segments of the same sorted arrays. The statistics
+# are segment reductions (numpy reduceat) over these segments.
+
+import numpy as np
+import pandas as pd
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Definitions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Temporal resolutions: time series name -> period column
+TS_RESOLUTIONS = {
+    "tsYear": "dateYear",
+    "tsQuarter": "dateQuarter",
+    "tsMonth": "dateMonth",
+    "tsWeek": "dateWeek",
+    "tsDay": "dateDay",
+}
+
+# Aggregation functions (tsAggr flags) and the suffixes of their output columns
+TS_SUFFIXES = {
+    "fSum": "Sum",
+    "fMin": "Min",
+    "fMax": "Max",
+    "fMean": "Mean",
+    "fSd": "Sd",
+    "fVar": "Var",
+    "fMedian": "Median",
+    "fFirst": "First",
+    "fLast": "Last",
+    "fNobs": "Nobs",
+    "fNdistinct": "Ndistinct",
+}
+
+# Aggregations excluded from the victims table (part2CreateTimeSeries.R section 2.8)
+TS_EXCLUDE = {
+    "victims": {"fMax": ["partyNumber"], "fMean": ["partyNumber"], "fSd": ["partyNumber"]},
+}
+
+# Tables aggregated from the collisions rows of each crash (crashTag == 1) rather than from their own rows
+TS_FROM_COLLISIONS = ["cities", "roads"]
+
+# Order of the tables in the merged time series (the first table wins for duplicated column names)
+TS_TABLES = ["crashes", "parties", "victims", "cities", "roads"]
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Aggregation Lists
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def aggregationLists(codebook, table, columns):
+    """Aggregation lists of a table from the codebook tsAggr flags (part2CreateTimeSeries.R sections 2.1-2.8)
+    Args:
+        codebook (Codebook): compiled codebook
+        table (str): table name ('crashes', 'parties', 'victims', 'cities', 'roads')
+        columns (list): columns available in the aggregated data frame
+    Returns:
+        dict: aggregation function -> list of columns (only the non-empty lists)
+    """
+    fields = set(codebook.fields[table]) & set(columns)
+    exclude = TS_EXCLUDE.get(table, {})
+    lists = {}
+    for func in TS_SUFFIXES:
+        names = [n for n in codebook.aggregations[func] if n in fields and n not in exclude.get(func, [])]
+        if names:
+            lists[func] = names
+    return lists
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Segment Reductions
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def periodStarts(days, column):
+    """Start days of the periods of a resolution for datetime64[D] values (weeks start on Sunday, as dateWeek)"""
+    if column == "dateDay":
+        return days
+    if column == "dateWeek":
+        # Day of the week (0 = Sunday); 01/01/1970 was a Thursday
+        return days - (days.astype(np.int64) + 4) % 7
+    if column == "dateMonth":
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if column == "dateQuarter":
+        months = days.astype("datetime64[M]").astype(np.int64)
+        return (months - months % 3).astype("datetime64[M]").astype("datetime64[D]")
+    if column == "dateYear":
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    raise ValueError(f"Unknown time series period column: {column}")
+
+
+def segmentStarts(keys):
+    """Start positions of the runs of equal values in a sorted array"""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([[0], np.flatnonzero(keys[1:] != keys[:-1]) + 1])
+
+
+def segmentOrder(groups, valueOrder):
+    """Order of the values within their segments, from the global value order (stable sort by segment)
+    The segment numbers are cast to the smallest unsigned type, so the stable sort is a radix sort for up to 65,536 segments.
+    """
+    dtype = np.uint16 if len(groups) == 0 or groups[-1] < 2 ** 16 else np.int64
+    return valueOrder[np.argsort(groups[valueOrder].astype(dtype), kind="stable")]
+
+
+def segmentReduce(values, starts, func, valueOrder=None):
+    """Reduce a sorted float array over its segments, ignoring missing values (NaN)
+    Args:
+        values (numpy.ndarray): float64 values sorted by period
+        starts (numpy.ndarray): start positions of the segments
+        func (str): aggregation function (tsAggr flag)
+        valueOrder (numpy.ndarray): optional sort order of the values (reused across resolutions for the order statistics)
+    Returns:
+        numpy.ndarray: one value per segment (NaN where a segment has no observations)
+    """
+    if len(starts) == 0:
+        return np.zeros(0, dtype=np.float64)
+    valid = ~np.isnan(values)
+    counts = np.add.reduceat(valid.astype(np.int64), starts)
+    empty = counts == 0
+    if func == "fNobs":
+        return counts.astype(np.float64)
+    sums = np.add.reduceat(np.where(valid, values, 0.0), starts)
+    if func == "fSum":
+        return np.where(empty, np.nan, sums)
+    if func == "fMin":
+        return np.where(empty, np.nan, np.minimum.reduceat(np.where(valid, values, np.inf), starts))
+    if func == "fMax":
+        return np.where(empty, np.nan, np.maximum.reduceat(np.where(valid, values, -np.inf), starts))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums / counts
+        if func == "fMean":
+            return means
+        if func in ("fSd", "fVar"):
+            # Two-pass sample variance (deviations from the segment means)
+            lengths = np.diff(np.append(starts, len(values)))
+            deviations = np.where(valid, values - np.repeat(means, lengths), 0.0)
+            variance = np.add.reduceat(deviations * deviations, starts) / (counts - 1)
+            variance = np.where(counts > 1, variance, np.nan)
+            return np.sqrt(variance) if func == "fSd" else variance
+    lengths = np.diff(np.append(starts, len(values)))
+    groups = np.repeat(np.arange(len(starts)), lengths)
+    if func in ("fFirst", "fLast"):
+        positions = np.flatnonzero(valid)
+        result = np.full(len(starts), np.nan)
+        target = groups[positions]
+        if func == "fFirst":
+            # Reverse-order scatter: the first valid position of each segment is written last
+            result[target[::-1]] = values[positions[::-1]]
+        else:
+            result[target] = values[positions]
+        return result
+    # Order statistics: sort within the segments (NaN values sort last, after the valid observations)
+    if valueOrder is None:
+        valueOrder = np.argsort(values, kind="stable")
+    ordered = values[segmentOrder(groups, valueOrder)]
+    if func == "fMedian":
+        lower = starts + np.maximum(counts - 1, 0) // 2
+        upper = starts + counts // 2
+        return np.where(empty, np.nan, (ordered[lower] + ordered[np.minimum(upper, len(ordered) - 1)]) / 2)
+    if func == "fNdistinct":
+        changes = np.ones(len(ordered), dtype=np.int64)
+        changes[1:] = (ordered[1:] != ordered[:-1]) | (groups[1:] != groups[:-1])
+        return np.add.reduceat(np.where(np.isnan(ordered), 0, changes), starts).astype(np.float64)
+    raise ValueError(f"Unsupported aggregation function: {func}")
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Time Series Engine
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def _numericValues(series):
+    """Return the values of a column as float64, with missing values as NaN"""
+    return pd.to_numeric(series, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def sortedDays(df, dateColumn="dateDay"):
+    """Sort the rows of a table once by day (rows without a date are dropped, as in part2CreateTimeSeries.R)
+    Returns:
+        tuple: (row order, sorted datetime64[D] days)
+    """
+    days = pd.to_datetime(df[dateColumn]).to_numpy(dtype="datetime64[D]")
+    keep = np.flatnonzero(~np.isnat(days))
+    order = keep[np.argsort(days[keep], kind="stable")]
+    return order, days[order]
+
+
+def aggregateTable(df, lists, dateColumn="dateDay", resolutions=None):
+    """Aggregate a table to all the temporal resolutions in a single sorted pass
+    Args:
+        df (pandas.DataFrame): table with the collision day column
+        lists (dict): aggregation function -> list of columns (see aggregationLists)
+        dateColumn (str): collision day column (the coarser periods are derived from it)
+        resolutions (dict): time series name -> period column (defaults to TS_RESOLUTIONS)
+    Returns:
+        dict: time series name -> pandas.DataFrame (one row per period, period column first)
+    """
+    if resolutions is None:
+        resolutions = TS_RESOLUTIONS
+
+    order, days = sortedDays(df, dateColumn)
+    values = {name: _numericValues(df[name])[order] for name in {n for names in lists.values() for n in names}}
+
+    # Value orders of the order statistics columns (sorted once, reused by all the resolutions)
+    orderStats = {n for func in ("fMedian", "fNdistinct") for n in lists.get(func, [])}
+    valueOrders = {name: np.argsort(values[name], kind="stable") for name in orderStats}
+
+    results = {}
+    for tsName, periodColumn in resolutions.items():
+        periods = periodStarts(days, periodColumn)
+        starts = segmentStarts(periods)
+        columns = {periodColumn: periods[starts].astype("datetime64[ns]")}
+        for func, names in lists.items():
+            for name in names:
+                columns[name + TS_SUFFIXES[func]] = segmentReduce(values[name], starts, func, valueOrders.get(name))
+        results[tsName] = pd.DataFrame(columns)
+    return results
+
+
+def addCombinedCounts(ts):
+    """Add the combined fatal and severe, and minor and pain counts (part2CreateTimeSeries.R section 3.3)"""
+    for combined, (first, second) in {"countFatalSevere": ("numberKilled", "countSevereInj"), "countMinorPain": ("countVisibleInj", "countComplaintPain")}.items():
+        for suffix in ("Sum", "Mean", "Sd"):
+            a, b = first + suffix, second + suffix
+            if a in ts.columns and b in ts.columns:
+                ts.insert(ts.columns.get_loc(b) + 1, combined + suffix, ts[a] + ts[b])
+    return ts
+
+
+def tableRows(tables, table):
+    """Rows aggregated for a table (the cities and roads aggregates use the first collisions row of each crash)"""
+    if table in TS_FROM_COLLISIONS:
+        collisions = tables["collisions"]
+        return collisions[collisions["crashTag"] == 1]
+    return tables[table]
+
+
+def createTimeSeries(tables, codebook, dateColumn="dateDay", resolutions=None):
+    """Create the tsDay, tsWeek, tsMonth, tsQuarter and tsYear time series from the codebook tsAggr flags
+    Args:
+        tables (dict): data frames 'crashes', 'parties', 'victims' and 'collisions' (cities and roads are aggregated from the collisions)
+        codebook (Codebook): compiled codebook
+        dateColumn (str): collision day column
+        resolutions (dict): time series name -> period column (defaults to TS_RESOLUTIONS)
+    Returns:
+        dict: time series name -> pandas.DataFrame
+    """
+    if resolutions is None:
+        resolutions = TS_RESOLUTIONS
+
+    # Aggregate every table to all the resolutions
+    aggregates = []
+    for table in TS_TABLES:
+        df = tableRows(tables, table)
+        lists = aggregationLists(codebook, table, df.columns)
+        aggregates.append(aggregateTable(df, lists, dateColumn=dateColumn, resolutions=resolutions))
+
+    return mergeAggregates(aggregates, resolutions)
+
+
+def mergeAggregates(aggregates, resolutions=None):
+    """Merge the aggregates of the tables on the period (inner join, the first table wins for duplicated columns)
+    Args:
+        aggregates (list): time series name -> pandas.DataFrame dictionaries of the tables (in TS_TABLES order)
+        resolutions (dict): time series name -> period column (defaults to TS_RESOLUTIONS)
+    Returns:
+        dict: time series name -> pandas.DataFrame
+    """
+    if resolutions is None:
+        resolutions = TS_RESOLUTIONS
+    series = {}
+    for tsName, periodColumn in resolutions.items():
+        merged = None
+        for aggregate in aggregates:
+            ts = aggregate[tsName].set_index(periodColumn)
+            if merged is None:
+                merged = ts
+            else:
+                merged = merged.join(ts[[c for c in ts.columns if c not in merged.columns]], how="inner")
+        series[tsName] = addCombinedCounts(merged.reset_index())
+    return series
+
+# endregion
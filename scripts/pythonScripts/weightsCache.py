@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# OC SWITRS GIS Data Processing
+# Weights Cache - Persistent Memory-Mapped Spatial Weights Matrices
+# v 1.0, October 2026
+# Dr. Kostas Alexandridis, GISP
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Persistent store of the distance band spatial weights of the hot spot analyses (the arcpy.stats.HotSpots calls of
+# part1Features.py rebuild the neighbors on every run, with Weights_Matrix_File=None). Each weights matrix is stored in
+# its own folder as the three CSR arrays (indptr, indices, data as NumPy .npy files, memory-mapped when loaded) and a
+# manifest, keyed by the SHA-256 hash of the point coordinates, the distance band and the standardization. When the
+# points are the points of a cached matrix with new points appended (a quarterly refresh), the cached matrix is patched
+# with the neighbors of the new points only: the new rows, and the new columns appended to the rows of the old points.
+# The patched matrix replaces its base entry; the matrices of other point sets (e.g., the crashes and the crashes near
+# major roads at the same distance band) are kept side by side.
+
+import os, json, shutil, hashlib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from scipy.spatial import cKDTree
+
+from hotSpots import CHUNK_ROWS, distanceBandWeights, hotSpots, validPoints
+from spatialJoin import expandRanges
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cache Keys
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+# Version of the weights cache layout (part of every cache key)
+WEIGHTS_VERSION = 1
+
+# Weights standardizations: NONE (binary weights) or ROW (weights 1/k of the k neighbors of a point)
+WEIGHTS_STANDARDIZATIONS = ["NONE", "ROW"]
+
+
+def coordinateHash(xy):
+    """Compute the SHA-256 hash of the point coordinates (float64, in point order)"""
+    return hashlib.sha256(np.ascontiguousarray(xy, dtype=np.float64).tobytes()).hexdigest()
+
+
+def weightsKey(xyHash, distance, standardization):
+    """Combine the coordinate hash, the distance band and the standardization into a single cache key"""
+    return hashlib.sha256(f"{WEIGHTS_VERSION}:{xyHash}:{float(distance)!r}:{standardization}".encode("utf-8")).hexdigest()
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cache Storage
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def standardize(indptr, indices, standardization):
+    """Weights of a CSR neighbor structure: ones (NONE) or 1/k in the rows of k neighbors (ROW)"""
+    if standardization not in WEIGHTS_STANDARDIZATIONS:
+        raise ValueError(f"Unsupported standardization {standardization}")
+    if standardization == "NONE":
+        return np.ones(len(indices))
+    counts = np.diff(indptr)
+    return np.repeat(1.0 / np.maximum(counts, 1), counts)
+
+
+def writeWeights(weights, cacheDir, key, manifest):
+    """Write a weights matrix to the cache
+    Args:
+        weights (scipy.sparse.csr_matrix): (n x n) weights
+        cacheDir (str): cache folder
+        key (str): cache key (see weightsKey)
+        manifest (dict): manifest entries of the matrix (rows, xyHash, distance, standardization)
+    Returns:
+        str: path to the weights cache folder
+    """
+    weightsDir = os.path.join(cacheDir, f"weights-{key}")
+    tempDir = weightsDir + ".tmp"
+    shutil.rmtree(tempDir, ignore_errors=True)
+    os.makedirs(tempDir)
+    for part in ["indptr", "indices", "data"]:
+        np.save(os.path.join(tempDir, f"{part}.npy"), np.asarray(getattr(weights, part)), allow_pickle=False)
+    with open(os.path.join(tempDir, "manifest.json"), "w") as f:
+        json.dump({"version": WEIGHTS_VERSION, "key": key, **manifest}, f, indent=4)
+    # Swap the completed cache folder into place (partial writes are never visible)
+    shutil.rmtree(weightsDir, ignore_errors=True)
+    os.replace(tempDir, weightsDir)
+    return weightsDir
+
+
+def readManifests(cacheDir):
+    """Return the manifests of all the cached weights matrices"""
+    manifests = []
+    if not os.path.isdir(cacheDir):
+        return manifests
+    for name in os.listdir(cacheDir):
+        manifestPath = os.path.join(cacheDir, name, "manifest.json")
+        if name.startswith("weights-") and not name.endswith(".tmp") and os.path.exists(manifestPath):
+            with open(manifestPath, "r") as f:
+                manifest = json.load(f)
+            if manifest.get("version") == WEIGHTS_VERSION:
+                manifests.append(manifest)
+    return manifests
+
+
+def loadWeights(cacheDir, key):
+    """Load a cached weights matrix by memory-mapping its CSR arrays, or return None if the cache entry does not exist"""
+    weightsDir = os.path.join(cacheDir, f"weights-{key}")
+    manifestPath = os.path.join(weightsDir, "manifest.json")
+    if not os.path.exists(manifestPath):
+        return None
+    with open(manifestPath, "r") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != WEIGHTS_VERSION:
+        return None
+    arrays = {part: np.load(os.path.join(weightsDir, f"{part}.npy"), mmap_mode="r", allow_pickle=False) for part in ["indptr", "indices", "data"]}
+    rows = manifest["rows"]
+    return sparse.csr_matrix((arrays["data"], arrays["indices"], arrays["indptr"]), shape=(rows, rows), copy=False)
+
+
+def pruneWeights(cacheDir, key):
+    """Remove a cache entry (the base matrix of a patched matrix)"""
+    shutil.rmtree(os.path.join(cacheDir, f"weights-{key}"), ignore_errors=True)
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Incremental Patch
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def patchWeights(weights, xy, distance, standardization="NONE", tree=None):
+    """Extend the weights matrix of the first points with the points appended after them
+    Args:
+        weights (scipy.sparse.csr_matrix): (m x m) weights of the first m points
+        xy (numpy.ndarray): (n x 2) coordinates of all the points (the first m unchanged)
+        distance (float): distance band
+        standardization (str): NONE or ROW
+        tree (cKDTree): prebuilt KD-tree of all the points (built if None)
+    Returns:
+        scipy.sparse.csr_matrix: (n x n) weights of all the points
+    """
+    m, n = weights.shape[0], len(xy)
+    tree = cKDTree(xy) if tree is None else tree
+
+    # Neighbors of the new points (self included): rows of the new points, and new columns of the rows of the old points
+    pairs = cKDTree(xy[m:]).sparse_distance_matrix(tree, distance, output_type="ndarray")
+    newRow, newColumn = pairs["i"] + m, pairs["j"]
+    old = newColumn < m
+    addRow = np.concatenate([newRow, newColumn[old]])
+    addColumn = np.concatenate([newColumn, newRow[old]])
+    order = np.lexsort((addColumn, addRow))
+    addRow, addColumn = addRow[order], addColumn[order]
+
+    # The appended columns (>= m) follow the existing columns of the old rows, so every row keeps its sorted columns
+    oldCounts = np.zeros(n, dtype=np.int64)
+    oldCounts[:m] = np.diff(weights.indptr)
+    addCounts = np.bincount(addRow, minlength=n)
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(oldCounts + addCounts, out=indptr[1:])
+    indices = np.empty(indptr[-1], dtype=np.int64)
+    owner, local = expandRanges(oldCounts)
+    indices[indptr[owner] + local] = weights.indices
+    owner, local = expandRanges(addCounts)
+    indices[indptr[owner] + oldCounts[owner] + local] = addColumn
+    return sparse.csr_matrix((standardize(indptr, indices, standardization), indices, indptr), shape=(n, n))
+
+# endregion
+
+
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+# region Cached Weights
+#~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+def cachedWeights(xy, distance, cacheDir, standardization="NONE", chunkRows=CHUNK_ROWS, prune=True):
+    """Load the distance band weights of the points from the cache, patching or building (and caching) them only when
+    needed
+    Args:
+        xy (numpy.ndarray): (n x 2) point coordinates
+        distance (float): distance band
+        cacheDir (str): cache folder
+        standardization (str): NONE (binary weights) or ROW
+        chunkRows (int): number of rows per chunk of the neighbor search
+        prune (bool): remove the cached matrix of the leading points after patching it (other entries are kept)
+    Returns:
+        scipy.sparse.csr_matrix: (n x n) weights (self included)
+    """
+    xy = np.ascontiguousarray(xy, dtype=np.float64)
+    distance = float(distance)
+    xyHash = coordinateHash(xy)
+    key = weightsKey(xyHash, distance, standardization)
+
+    # Cache hit: memory-map the cached matrix
+    weights = loadWeights(cacheDir, key)
+    if weights is not None:
+        print(f"Loaded the {distance:g} weights of {len(xy):,} points from cache")
+        return weights
+
+    # Cache miss: patch the largest cached matrix of the leading points, or build the matrix
+    tree = cKDTree(xy)
+    previous = [manifest for manifest in readManifests(cacheDir) if manifest["distance"] == distance and manifest["standardization"] == standardization and manifest["rows"] < len(xy)]
+    base = next((manifest for manifest in sorted(previous, key=lambda manifest: -manifest["rows"]) if coordinateHash(xy[:manifest["rows"]]) == manifest["xyHash"]), None)
+    if base is not None:
+        print(f"Patching the {distance:g} weights of {base['rows']:,} points with {len(xy) - base['rows']:,} new points...")
+        weights = patchWeights(loadWeights(cacheDir, base["key"]), xy, distance, standardization, tree)
+    else:
+        print(f"Building the {distance:g} weights of {len(xy):,} points...")
+        weights = distanceBandWeights(xy, distance, tree, chunkRows)
+        weights.sort_indices()
+        weights.data = standardize(weights.indptr, weights.indices, standardization)
+    writeWeights(weights, cacheDir, key, {"rows": len(xy), "xyHash": xyHash, "distance": distance, "standardization": standardization})
+    if prune and base is not None:
+        pruneWeights(cacheDir, base["key"])
+    return loadWeights(cacheDir, key)
+
+
+def cachedHotSpots(points, field, distance, cacheDir, xColumn="pointX", yColumn="pointY", chunkRows=CHUNK_ROWS):
+    """Gi* hot spot analysis with the cached distance band weights of the points (see hotSpots.hotSpots)
+    Args:
+        points (pandas.DataFrame): point table with the coordinate columns and the analysis field
+        field (str): analysis field (points with missing values or coordinates are left out)
+        distance (float): distance band
+        cacheDir (str): weights cache folder
+        xColumn, yColumn (str): coordinate columns of the point table
+        chunkRows (int): number of rows per chunk of the neighbor search (cache misses only)
+    Returns:
+        tuple: the point table with the Gi* columns and the distance band
+    """
+    _, valid, xy = validPoints(points, field, xColumn, yColumn)
+    xy = xy[valid]
+    return hotSpots(points, field, distance, xColumn, yColumn, chunkRows, weights=cachedWeights(xy, distance, cacheDir, chunkRows=chunkRows))
+
+# endregion